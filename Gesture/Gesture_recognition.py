@@ -1,22 +1,77 @@
-import cv2
-import mediapipe as mp
-import numpy as np
+import argparse
+import os
 import time
 
 # 导入自定义模块
 from model_loader import ModelLoader
 from gesture_stabilizer import GestureStabilizer
 from utils.network import NetworkManager
-from recognizers import SingleHandRecognizer, TwoHandsRecognizer
+from utils.udp_transport import UdpTransport
+from utils.state_sync import StateSyncSender
+from recognizers import (SingleHandRecognizer, TwoHandsRecognizer, PrototypeRecognizer, DynamicGestureRecognizer,
+                         CascadeRecognizer)
+from utils.landmark_filter import LandmarkFilter, landmarks_to_array
+from utils.hand_id_tracker import HandIdentityTracker
+from utils.profiler import profiler
+from utils.landmark_stream import LandmarkRecorder
+from utils.landmark_bus import LandmarkBus
+from utils.hand_detector import create_hand_detector
+from utils.frame_source import open_source
+from utils.metrics import RecognitionMetrics, MetricsServer, UdpStatsReporter
+from utils.log import get_logger, log_event
+from utils.startup import LazyModule, run_startup_tasks
 # 导入位置跟踪模块
 from HandPosition import HandPositionTracker
 
+# cv2 和 mediapipe 在第一次使用时才导入，见 prepare
+cv2 = LazyModule("cv2")
+mp_hands = LazyModule("mediapipe.python.solutions.hands")
+mp_drawing = LazyModule("mediapipe.python.solutions.drawing_utils")
+
+log = get_logger("recognition")
+
 class GestureRecognition:
     def __init__(self, gesture_host='127.0.0.1', gesture_port=8000, 
-                 position_host='127.0.0.1', position_port=5000, auto_connect=True):
-        """初始化手势识别器"""
+                 position_host='127.0.0.1', position_port=5000, auto_connect=True,
+                 filter_landmarks=True, min_cutoff=1.0, beta=5.0, position_send_rate=None,
+                 profile=False, trace_path=None, record_path=None,
+                 metrics_port=None, stats_port=None, stats_host='127.0.0.1',
+                 prototype_file="gesture_prototypes.npz", sequence_dir="gesture_sequences", cascade=True,
+                 bus_name=None, detector="legacy", task_model=None, mirror_hosts=None, state_sync=True):
+        """
+        初始化手势识别器
+        
+        参数:
+            filter_landmarks: 是否在分类和位置发送前对关键点做 One-Euro 滤波
+            min_cutoff, beta: One-Euro 滤波参数
+            position_send_rate: 位置的固定发送频率(Hz)，None 表示随摄像头帧发送
+            profile: 是否启用分阶段计时（也可用环境变量 GESTURE_PROFILE=1 启用）
+            trace_path: 识别结束时导出 Chrome trace 的路径，None 表示不导出
+            record_path: 录制检测结果的保存路径，可用 replay.py 回放，None 表示不录制
+            metrics_port: 以 Prometheus 格式提供运行时指标的本地 HTTP 端口，None 表示不启动
+            stats_port, stats_host: 每秒发送 UDP 统计包的目标，stats_port 为 None 表示不发送
+            prototype_file: 录入手势的原型文件（相对路径以本文件所在目录为准），None 表示不使用原型识别
+            sequence_dir: 动态手势模板目录（见 GestureDataCollector.collect_sequence_data），None 表示不识别动态手势
+            cascade: 是否在随机森林之前运行手指状态级联（查找表见 GestureTrainer.fit_cascade）
+            bus_name: 把每帧的关键点、手势和概率发布到该名称的共享内存总线（见 utils.landmark_bus），
+                      本地其他进程可直接读取；None 表示不发布
+            detector: 手部检测后端，"legacy"（Hands.process，同步）或 "tasks"（HandLandmarker LIVE_STREAM，
+                      异步检测，忙时丢帧），见 utils.hand_detector
+            task_model: tasks 后端的 hand_landmarker.task 路径，None 时见 LiveStreamHandDetector
+            mirror_hosts: 额外接收手势和位置的主机列表（端口与主目的地相同），如另一台机器上的 Unity
+            state_sync: 是否在手势端口上同时发送带版本号的状态快照（稳定手势和是否检测到手），
+                        变化后冗余重发并以心跳持续发送，见 utils.state_sync（Unity 端由 GestureReceiver 解析并确认）；
+                        原有的变化消息照常发送
+        """
+        # 手势和位置共用一个非阻塞 UDP 发送服务，摄像头循环只把消息放入队列
+        self.transport = UdpTransport()
+        self.mirror_hosts = list(mirror_hosts or [])
+        
         # 创建网络管理器
-        self.network = NetworkManager(gesture_host, gesture_port)
+        self.network = NetworkManager(gesture_host, gesture_port, transport=self.transport)
+        
+        # 状态同步: 丢失一个手势变化包不会让 Unity 一直停留在旧手势
+        self.state_sync = StateSyncSender(self.transport, "gesture") if state_sync else None
         self.cap = None
         
         # 创建模型加载器
@@ -26,13 +81,88 @@ class GestureRecognition:
         self.single_hand_recognizer = SingleHandRecognizer()
         self.two_hands_recognizer = TwoHandsRecognizer()
         
+        # 级联: 手指状态查找表直接接受或拒识的帧不调用随机森林（查找表随模型加载）
+        self.use_cascade = cascade
+        self.single_hand_cascade = CascadeRecognizer(self.single_hand_recognizer)
+        self.two_hands_cascade = CascadeRecognizer(self.two_hands_recognizer)
+        
+        # 原型识别器: 运行中录入的新手势，优先于随机森林模型匹配
+        self.prototype_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), prototype_file) \
+            if prototype_file else None
+        self.prototype_recognizer = PrototypeRecognizer() if prototype_file else None
+        
+        # 动态手势识别器: 与静态手势并行，识别到的动作以 motion|名称 单独发送
+        self.sequence_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), sequence_dir) \
+            if sequence_dir else None
+        self.dynamic_recognizer = DynamicGestureRecognizer() if sequence_dir else None
+        
         # 创建手势稳定器
         self.gesture_stabilizer = GestureStabilizer(time_window=1.0, threshold=0.9)
         
         # 创建位置跟踪器
-        self.position_tracker = HandPositionTracker(host=position_host, port=position_port, auto_connect=False)
+        self.position_tracker = HandPositionTracker(host=position_host, port=position_port, auto_connect=False,
+                                                    send_rate=position_send_rate, transport=self.transport)
         self.enable_position_tracking = False
         
+        # 创建关键点滤波器，分类和位置发送共用滤波后的结果
+        self.landmark_filter = LandmarkFilter(min_cutoff=min_cutoff, beta=beta) if filter_landmarks else None
+        
+        # 手部ID跟踪器，滤波、位置发送和双手识别共用同一组稳定ID
+        self.hand_id_tracker = HandIdentityTracker()
+        
+        # 逐帧状态，见 reset_state
+        self.last_sent_gesture = None
+        self.last_raw_gesture = None
+        self.last_probabilities = None
+        self.last_hand_detected_time = time.time()
+        self.hands_present = False
+        
+        # 分阶段计时
+        if profile:
+            profiler.enable()
+        self.trace_path = trace_path
+        
+        # 检测结果录制
+        self.record_path = record_path
+        self.recorder = LandmarkRecorder() if record_path else None
+        
+        # 手部检测后端
+        self.detector_backend = detector
+        self.task_model = task_model
+        
+        # 共享内存总线
+        self.landmark_bus = LandmarkBus(bus_name) if bus_name else None
+        
+        # 运行时指标，数据包和丢帧数在抓取时读取
+        self.metrics = RecognitionMetrics()
+        self.metrics.watch("udp_packets_sent_total", "发送的 UDP 数据包数",
+                           lambda: self.transport.packets_sent, counter=True)
+        self.metrics.watch("udp_bytes_sent_total", "发送的 UDP 字节数",
+                           lambda: self.transport.bytes_sent, counter=True)
+        self.metrics.watch("udp_send_queue_depth", "UDP 发送队列中的消息数",
+                           lambda: self.transport.queue_depth)
+        self.metrics.watch("udp_send_dropped_total", "发送队列满时丢弃的消息数",
+                           lambda: self.transport.dropped, counter=True)
+        self.metrics.watch("udp_send_coalesced_total", "被同一只手的新位置替换的未发送消息数",
+                           lambda: self.transport.coalesced, counter=True)
+        if self.state_sync:
+            self.metrics.watch("state_sync_version", "当前状态快照的版本号", lambda: self.state_sync.version)
+            self.metrics.watch("state_sync_snapshots_sent_total", "发送的状态快照数",
+                               lambda: self.state_sync.snapshots_sent, counter=True)
+            self.metrics.watch("state_sync_acks_total", "收到的状态确认数",
+                               lambda: self.state_sync.acks_received, counter=True)
+        self.metrics.watch("dropped_frames_total", "帧来源丢弃的帧数",
+                           lambda: getattr(self.cap, "frames_dropped", 0), counter=True)
+        self.metrics.watch("hand_id_reordered_frames_total", "手的ID与 MediaPipe 检测顺序不一致的帧数",
+                           lambda: self.hand_id_tracker.reordered_frames, counter=True)
+        self.hands = None
+        self.metrics.watch("detector_dropped_frames_total", "检测后端忙时丢弃的帧数",
+                           lambda: getattr(self.hands, "frames_dropped", 0), counter=True)
+        self.metrics_server = MetricsServer(self.metrics.registry, port=metrics_port).start() \
+            if metrics_port is not None else None
+        self.stats_reporter = UdpStatsReporter(self.metrics.registry, stats_host, stats_port).start() \
+            if stats_port is not None else None
+        
         # 自动连接
         if auto_connect:
             self.connect()
@@ -43,16 +173,34 @@ class GestureRecognition:
         
         # 只有当启用位置跟踪时才连接
         if self.enable_position_tracking:
-            position_connected = self.position_tracker.connect()
-            return gesture_connected and position_connected
+            gesture_connected = self.position_tracker.connect() and gesture_connected
         
+        self._add_mirrors()
         return gesture_connected
     
+    def _add_mirrors(self):
+        """把镜像主机加入已连接的目的地"""
+        for host in self.mirror_hosts:
+            if self.network.is_connected:
+                self.transport.add_destination("gesture", host, self.network.port)
+            if self.position_tracker.is_connected:
+                self.transport.add_destination("position", host, self.position_tracker.port)
+    
     def disconnect(self):
         """断开连接并释放资源"""
+        if self.metrics_server:
+            self.metrics_server.stop()
+            self.metrics_server = None
+        if self.stats_reporter:
+            self.stats_reporter.stop()
+            self.stats_reporter = None
+        if self.landmark_bus:
+            self.landmark_bus.close()
+            self.landmark_bus = None
         self.network.disconnect()
         if self.enable_position_tracking:
             self.position_tracker.disconnect()
+        self.transport.stop()
         if self.cap:
             self.cap.release()
             cv2.destroyAllWindows()
@@ -62,165 +210,419 @@ class GestureRecognition:
         self.enable_position_tracking = enable
         if enable and not self.position_tracker.is_connected:
             self.position_tracker.connect()
+            self._add_mirrors()
     
     def load_models(self):
         """加载手势识别模型"""
-        if self.model_loader.load_gesture_models():
+        loaded = self.model_loader.load_gesture_models()
+        if loaded:
             # 使用加载的模型更新识别器
             self.single_hand_recognizer.model = self.model_loader.single_hand_model
             self.two_hands_recognizer.model = self.model_loader.two_hands_model
-            return True
-        return False
+            if self.use_cascade:
+                self.single_hand_cascade.cascade = self.model_loader.cascades.get("single")
+                self.two_hands_cascade.cascade = self.model_loader.cascades.get("two_hands")
+            if self.landmark_bus:
+                for hands, model in ((1, self.single_hand_recognizer.model), (2, self.two_hands_recognizer.model)):
+                    if model is not None:
+                        self.landmark_bus.set_classes(hands, model.classes_)
+        if self.prototype_recognizer:
+            self.prototype_recognizer.path = self.prototype_file
+            if os.path.exists(self.prototype_file):
+                self.prototype_recognizer.load(self.prototype_file)
+                loaded = True
+        if self.dynamic_recognizer and self.dynamic_recognizer.template_count() == 0:
+            loaded = self.dynamic_recognizer.load(self.sequence_dir) > 0 or loaded
+        return loaded
     
-    def recognize_gestures(self):
-        """执行手势识别任务"""
-        if not self.network.is_connected:
-            print("GestureRecognition: 未连接，请先调用 connect() 方法")
-            return
+    def enroll_gesture(self, name, duration=3.0):
+        """
+        在运行中录入新手势（可在其他线程中调用）: 从下一帧检测到手开始采集 duration 秒，
+        完成后立即可以识别并保存到原型文件
+        """
+        if self.prototype_recognizer is None:
+            print("GestureRecognition: 未启用原型识别，无法录入手势")
+            return False
+        return self.prototype_recognizer.start_enrollment(name, duration)
+    
+    def recognize_hands(self, *landmarks):
+        """
+        识别一只或两只手的像素坐标: 先匹配录入的原型手势，没有匹配时经过手指状态级联和随机森林模型
         
-        # 加载模型
-        self.load_models()
+        调用了随机森林时，模型输出的概率保存在 last_probabilities，否则为 None
+        """
+        self.last_probabilities = None
+        if self.prototype_recognizer:
+            gesture = self.prototype_recognizer.recognize(*landmarks)
+            if gesture != "Unknown":
+                return gesture
+        cascade = self.two_hands_cascade if len(landmarks) == 2 else self.single_hand_cascade
+        cascade.recognizer.last_probabilities = None
+        gesture = cascade.recognize(*landmarks)
+        self.last_probabilities = cascade.recognizer.last_probabilities
+        return gesture
+    
+    def create_hands(self, image_shape=(480, 640, 3)):
+        """创建手部检测后端，并在一帧空白图像上预热（首次检测比之后慢数倍）"""
+        hands = create_hand_detector(self.detector_backend, self.task_model, max_num_hands=2,
+                                     min_detection_confidence=0.5, min_tracking_confidence=0.5)
+        hands.warm_up(image_shape)
+        return hands
+    
+    def prepare(self, source=0, realtime=None, parallel=True):
+        """
+        启动准备: 打开帧来源、创建并预热 MediaPipe、加载并预热模型，完成后向 Unity 发送识别端状态:
+        加载了模型时为 status|Ready，没有任何模型（只能输出 Unknown）时为 status|NoModels
+        
+        参数:
+            source, realtime: 帧来源，见 recognize_gestures
+            parallel: 三项初始化是否在后台线程中并行执行
+        
+        返回:
+            预热后的 MediaPipe Hands，帧来源打开失败时返回 None
+        """
+        created = {}  # 已创建的资源，任一任务出错时释放
+        
+        def open_frames():
+            cap = created["source"] = open_source(source, realtime=realtime)
+            cap.start()
+            return cap
+        
+        def create_hands():
+            created["mediapipe"] = self.create_hands()
+            return created["mediapipe"]
+        
+        def load_and_warm_up():
+            loaded = self.load_models()
+            self.single_hand_recognizer.warm_up()
+            self.two_hands_recognizer.warm_up()
+            if self.prototype_recognizer:
+                self.prototype_recognizer.warm_up()
+            return loaded
         
-        # 打开摄像头
-        self.cap = cv2.VideoCapture(0)
+        start = time.perf_counter()
+        try:
+            results, durations = run_startup_tasks(
+                {"source": open_frames, "mediapipe": create_hands, "models": load_and_warm_up}, parallel)
+        except Exception:
+            # run_startup_tasks 在全部任务结束后才抛出异常，其他任务已创建的资源要在这里释放
+            if "mediapipe" in created:
+                created["mediapipe"].close()
+            if "source" in created:
+                created["source"].release()
+            raise
+        self.cap = results["source"]
+        hands = results["mediapipe"]
         if not self.cap.isOpened():
-            print("错误：无法打开摄像头")
-            return
+            hands.close()
+            return None
         
-        # 设置MediaPipe参数
-        mp_hands = mp.solutions.hands
-        mp_drawing = mp.solutions.drawing_utils
-        with mp_hands.Hands(
-                static_image_mode=False,
-                max_num_hands=2,
-                min_detection_confidence=0.5,
-                min_tracking_confidence=0.5) as hands:
-            
-            last_sent_gesture = None
-            last_hand_detected_time = time.time()
+        if results["models"]:
+            self.network.send_status("Ready")
+        else:
+            print("GestureRecognition: 没有可用的手势模型，识别结果将始终为 Unknown")
+            self.network.send_status("NoModels")
+        log_event(log, "startup.ready",
+                  "启动完成, 用时 %(total).2f 秒 (帧来源 %(source).2f, MediaPipe %(mediapipe).2f, 模型 %(models).2f)",
+                  total=time.perf_counter() - start, parallel=parallel, models_loaded=results["models"], **durations)
+        return hands
+    
+    def reset_state(self, timestamp=None):
+        """清除逐帧状态（稳定器、ID、滤波和已发送的手势），开始新的识别或回放前调用"""
+        self.last_sent_gesture = None
+        self.last_hand_detected_time = time.time() if timestamp is None else timestamp
+        self.hands_present = False
+        self.gesture_stabilizer.reset()
+        self.hand_id_tracker.reset()
+        if self.landmark_filter:
+            self.landmark_filter.reset()
+        if self.dynamic_recognizer:
+            self.dynamic_recognizer.reset()
+    
+    def process_results(self, results, image_shape, image=None, timestamp=None):
+        """
+        处理一帧的检测结果: 分配ID、滤波、发送位置、识别并稳定手势、发送手势
+        
+        实时识别和回放录制数据共用这一流程。
+        
+        参数:
+            results: MediaPipe 手部检测结果
+            image_shape: 图像尺寸 (高, 宽, 通道)
+            image: 用于绘制的图像，None 表示不绘制
+            timestamp: 帧时间(秒)，默认为当前时间，回放时传入录制时间
+        
+        返回:
+            (当前稳定手势, 绘制后的图像)
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        
+        # 为每只手分配跨帧稳定的ID
+        hand_ids = self.hand_id_tracker.assign(results, timestamp)
+        
+        # 关键点滤波，抑制 MediaPipe 的抖动
+        if self.landmark_filter:
+            self.landmark_filter.filter_results(results, timestamp, keys=hand_ids)
+        profiler.lap("filter")
+        
+        # 检测到手的数量
+        hand_count = 0 if results.multi_hand_landmarks is None else len(results.multi_hand_landmarks)
+        self.metrics.record_frame(timestamp, hand_count)
+        
+        # 如果启用了位置跟踪，处理位置信息
+        hands_info = {}
+        if self.enable_position_tracking:
+            hands_info = self.position_tracker.process_frame(results, image_shape, timestamp=timestamp,
+                                                             hand_ids=hand_ids)
+            # 在图像上绘制位置标记
+            if hands_info and image is not None:
+                image = self.position_tracker.draw_position_markers(image, hands_info)
+            profiler.lap("position")
+        
+        current_gesture = "Unknown"
+        raw_gesture = "Unknown"
+        frame_landmarks = []
+        self.last_probabilities = None
+        
+        if results.multi_hand_landmarks:
+            self.last_hand_detected_time = timestamp
             
-            while self.cap.isOpened():
-                success, image = self.cap.read()
-                if not success:
-                    break
-                
-                # 水平镜像翻转图像，使其成为镜面效果
-                image = cv2.flip(image, 1)
-                
-                # 将BGR图像转换为RGB
-                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            # 处理双手情况
+            if hand_count == 2:
+                # 提取两手关键点，按稳定ID排序，避免两只手的顺序逐帧交换
+                first, second = sorted(range(2), key=lambda i: hand_ids[i])
+                hand1_landmarks = results.multi_hand_landmarks[first]
+                hand2_landmarks = results.multi_hand_landmarks[second]
                 
-                # 处理图像
-                results = hands.process(image_rgb)
+                landmarks1 = []
+                for landmark in hand1_landmarks.landmark:
+                    x = int(landmark.x * image_shape[1])
+                    y = int(landmark.y * image_shape[0])
+                    landmarks1.append((x, y))
                 
-                # 检测到手的数量
-                hand_count = 0 if results.multi_hand_landmarks is None else len(results.multi_hand_landmarks)
+                landmarks2 = []
+                for landmark in hand2_landmarks.landmark:
+                    x = int(landmark.x * image_shape[1])
+                    y = int(landmark.y * image_shape[0])
+                    landmarks2.append((x, y))
                 
-                # 如果启用了位置跟踪，处理位置信息
-                hands_info = {}
-                if self.enable_position_tracking:
-                    hands_info = self.position_tracker.process_frame(results, image.shape)
-                    # 在图像上绘制位置标记
-                    if hands_info:
-                        image = self.position_tracker.draw_position_markers(image, hands_info)
+                # 识别双手手势
+                inference_start = time.perf_counter()
+                frame_landmarks = [landmarks1, landmarks2]
+                raw_gesture = self.recognize_hands(landmarks1, landmarks2)
+                self.metrics.record_recognition(raw_gesture, time.perf_counter() - inference_start)
+                profiler.lap("recognize")
                 
-                current_gesture = "Unknown"
+                # 使用稳定器处理
+                current_gesture = self.gesture_stabilizer.add_gesture(raw_gesture, timestamp)
+                profiler.lap("stabilizer")
                 
-                if results.multi_hand_landmarks:
-                    last_hand_detected_time = time.time()
-                    
-                    # 处理双手情况
-                    if hand_count == 2:
-                        # 提取两手关键点
-                        hand1_landmarks = results.multi_hand_landmarks[0]
-                        hand2_landmarks = results.multi_hand_landmarks[1]
-                        
-                        landmarks1 = []
-                        for landmark in hand1_landmarks.landmark:
-                            x = int(landmark.x * image.shape[1])
-                            y = int(landmark.y * image.shape[0])
-                            landmarks1.append((x, y))
-                        
-                        landmarks2 = []
-                        for landmark in hand2_landmarks.landmark:
-                            x = int(landmark.x * image.shape[1])
-                            y = int(landmark.y * image.shape[0])
-                            landmarks2.append((x, y))
-                        
-                        # 识别双手手势
-                        raw_gesture = self.two_hands_recognizer.recognize(landmarks1, landmarks2)
-                        
-                        # 使用稳定器处理
-                        current_gesture = self.gesture_stabilizer.add_gesture(raw_gesture)
-                        
-                        # 显示在画面上
-                        status_text = f"双手: {raw_gesture}"
-                        if raw_gesture != current_gesture:
-                            status_text += f" -> {current_gesture}"
-                        cv2.putText(image, status_text, (10, 30), 
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                        
-                        # 可视化两只手
-                        for hand_landmarks in results.multi_hand_landmarks:
-                            mp_drawing.draw_landmarks(
-                                image, hand_landmarks, mp_hands.HAND_CONNECTIONS,
-                                mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=4),
-                                mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2))
+                if image is not None:
+                    # 显示在画面上
+                    status_text = f"双手: {raw_gesture}"
+                    if raw_gesture != current_gesture:
+                        status_text += f" -> {current_gesture}"
+                    cv2.putText(image, status_text, (10, 30), 
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                     
-                    # 处理单手情况
-                    elif hand_count == 1:
-                        # 单手手势识别
-                        hand_landmarks = results.multi_hand_landmarks[0]
-                        
-                        # 获取所有关键点的坐标
-                        landmarks = []
-                        for landmark in hand_landmarks.landmark:
-                            x = int(landmark.x * image.shape[1])
-                            y = int(landmark.y * image.shape[0])
-                            landmarks.append((x, y))
-                        
-                        # 单手识别
-                        raw_gesture = self.single_hand_recognizer.recognize(landmarks)
-                        
-                        # 使用稳定器处理
-                        current_gesture = self.gesture_stabilizer.add_gesture(raw_gesture)
-                        
-                        # 显示在画面上
-                        status_text = f"单手: {raw_gesture}"
-                        if raw_gesture != current_gesture:
-                            status_text += f" -> {current_gesture}"
-                        cv2.putText(image, status_text, (10, 30), 
-                                  cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
-                        
-                        # 可视化
+                    # 可视化两只手
+                    for hand_landmarks in results.multi_hand_landmarks:
                         mp_drawing.draw_landmarks(
                             image, hand_landmarks, mp_hands.HAND_CONNECTIONS,
                             mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=4),
                             mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2))
-                else:
-                    # 检测不到手的时间超过0.5s
-                    if time.time() - last_hand_detected_time > 0.5:
-                        print("屏幕中0.5s检测不到手")
-                        # 发送手部检测状态：未检测到手
-                        self.network.send_gesture("HandDetectionStatus|False")
-                        last_hand_detected_time = time.time()
-                if results.multi_hand_landmarks:
-                    # 有手被检测到，发送检测状态
-                    if time.time() - last_hand_detected_time > 1:  # 避免频繁发送状态
-                        self.network.send_gesture("HandDetectionStatus|True")
-                        last_hand_detected_time = time.time()  # 重置计时器
+                    profiler.lap("draw")
+            
+            # 处理单手情况
+            elif hand_count == 1:
+                # 单手手势识别
+                hand_landmarks = results.multi_hand_landmarks[0]
+                
+                # 获取所有关键点的坐标
+                landmarks = []
+                for landmark in hand_landmarks.landmark:
+                    x = int(landmark.x * image_shape[1])
+                    y = int(landmark.y * image_shape[0])
+                    landmarks.append((x, y))
+                
+                # 单手识别
+                inference_start = time.perf_counter()
+                frame_landmarks = [landmarks]
+                raw_gesture = self.recognize_hands(landmarks)
+                self.metrics.record_recognition(raw_gesture, time.perf_counter() - inference_start)
+                profiler.lap("recognize")
                 
-                # 只有当稳定手势变化时才发送
-                if current_gesture != last_sent_gesture:
-                    print(f"发送手势: {current_gesture}")
-                    self.network.send_gesture(current_gesture)
-                    last_sent_gesture = current_gesture
+                # 使用稳定器处理
+                current_gesture = self.gesture_stabilizer.add_gesture(raw_gesture, timestamp)
+                profiler.lap("stabilizer")
                 
-                # 显示结果
+                if image is not None:
+                    # 显示在画面上
+                    status_text = f"单手: {raw_gesture}"
+                    if raw_gesture != current_gesture:
+                        status_text += f" -> {current_gesture}"
+                    cv2.putText(image, status_text, (10, 30), 
+                              cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
+                    
+                    # 可视化
+                    mp_drawing.draw_landmarks(
+                        image, hand_landmarks, mp_hands.HAND_CONNECTIONS,
+                        mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=4),
+                        mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2))
+                    profiler.lap("draw")
+        else:
+            # 检测不到手的时间超过0.5s
+            if timestamp - self.last_hand_detected_time > 0.5:
+                log_event(log, "hands.lost", "屏幕中0.5s检测不到手")
+                # 发送手部检测状态：未检测到手
+                self.network.send_gesture("HandDetectionStatus|False")
+                self.last_hand_detected_time = timestamp
+                self.hands_present = False
+        # 录入新手势（没有检测到手的帧也要调用，以便按时结束）
+        if self.prototype_recognizer and self.prototype_recognizer.enrolling:
+            self.prototype_recognizer.observe(frame_landmarks, timestamp)
+            if image is not None and self.prototype_recognizer.enrolling:
+                cv2.putText(image, f"Enrolling: {self.prototype_recognizer.enrolling}", (10, 60),
+                            cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
+        
+        if results.multi_hand_landmarks:
+            self.hands_present = True
+            # 有手被检测到，发送检测状态
+            if timestamp - self.last_hand_detected_time > 1:  # 避免频繁发送状态
+                self.network.send_gesture("HandDetectionStatus|True")
+                self.last_hand_detected_time = timestamp  # 重置计时器
+        
+        # 归一化关键点数组，动态手势和共享内存总线共用
+        use_dynamic = self.dynamic_recognizer and self.dynamic_recognizer.template_count()
+        hand_arrays = [landmarks_to_array(hand_landmarks) for hand_landmarks in results.multi_hand_landmarks or []] \
+            if use_dynamic or self.landmark_bus else []
+        
+        # 动态手势: 每只手的关键点序列与动作模板流式匹配，完成的动作立即发送
+        if use_dynamic:
+            tracked = list(zip(hand_ids, hand_arrays))
+            for gesture in self.dynamic_recognizer.update(tracked, timestamp):
+                log_event(log, "dynamic.sent", "发送动态手势: %(gesture)s", gesture=gesture)
+                self.network.send_motion(gesture)
+            profiler.lap("dynamic")
+        
+        self.metrics.record_stable_gesture(current_gesture)
+        self.last_raw_gesture = raw_gesture
+        
+        # 只有当稳定手势变化时才发送
+        if current_gesture != self.last_sent_gesture:
+            log_event(log, "gesture.sent", "发送手势: %(gesture)s", gesture=current_gesture)
+            self.network.send_gesture(current_gesture)
+            self.last_sent_gesture = current_gesture
+        if self.state_sync:
+            self.state_sync.update(timestamp, gesture=current_gesture, hands=int(self.hands_present))
+            self.state_sync.tick(timestamp)
+        profiler.lap("send")
+        
+        # 发布到共享内存总线，本地读者进程不需要重新检测
+        if self.landmark_bus:
+            handedness = [h.classification[0].label for h in results.multi_handedness or []]
+            self.landmark_bus.publish(timestamp, hand_arrays, hand_ids, handedness, raw_gesture, current_gesture,
+                                      self.last_probabilities)
+            profiler.lap("bus")
+        
+        return current_gesture, image
+    
+    def handle_detections(self, detections, display=True):
+        """
+        处理检测后端返回的帧: 录制、process_results 和显示
+        
+        参数:
+            detections: HandDetector.poll 的结果 [(帧时间, 检测结果, BGR 图像), ...]
+        
+        返回:
+            是否按下了 ESC 键
+        """
+        for frame_time, results, image in detections:
+            # 在滤波修改结果之前录制原始检测结果
+            if self.recorder:
+                self.recorder.record(results, frame_time)
+            
+            current_gesture, image = self.process_results(results, image.shape,
+                                                          image if display else None, frame_time)
+            
+            # 显示结果
+            if display:
                 window_title = '手势与位置跟踪' if self.enable_position_tracking else '手势识别'
                 cv2.imshow(window_title, image)
-                if cv2.waitKey(5) & 0xFF == 27:  # ESC键退出
-                    break
+                key = cv2.waitKey(5) & 0xFF
+                profiler.lap("imshow")
+                if key == 27:  # ESC键退出
+                    return True
+                if key == ord('e') and self.prototype_recognizer:  # E键录入一个新手势
+                    self.enroll_gesture(self.prototype_recognizer.next_name())
+        return False
+    
+    def recognize_gestures(self, source=0, realtime=None, display=True, parallel_startup=True):
+        """
+        执行手势识别任务
+        
+        参数:
+            source: 帧来源，摄像头序号、视频文件、图片目录、"synthetic" 或 FrameSource，见 utils.frame_source
+            realtime: 文件类来源是否按原始帧率输出，默认尽快输出
+            display: 是否绘制并显示画面，关闭后可在没有显示器的机器上测量吞吐
+            parallel_startup: 是否并行初始化帧来源、MediaPipe 和模型，见 prepare
+        """
+        if not self.network.is_connected:
+            print("GestureRecognition: 未连接，请先调用 connect() 方法")
+            return
+        
+        # 打开帧来源、加载模型并预热 MediaPipe
+        hands = self.prepare(source, realtime, parallel=parallel_startup)
+        if hands is None:
+            print(f"错误：无法打开帧来源 {source}")
+            return
+        
+        with hands:
+            self.hands = hands
+            self.reset_state()
+            
+            # 同步后端每次提交都立即得到结果；异步后端用短超时读帧，等待下一帧期间及时处理已完成的检测
+            read_timeout = 1.0 if hands.synchronous else 0.002
+            stopped = False
+            while not stopped:
+                profiler.start_frame()
+                success, image, frame_time = self.cap.read_timestamped(timeout=read_timeout)
+                if not success:
+                    if not self.cap.isOpened():
+                        break
+                    stopped = self.handle_detections(hands.poll(), display)
+                    continue
+                profiler.lap("cap.read")
+                
+                # 水平镜像翻转图像，使其成为镜面效果
+                image = cv2.flip(image, 1)
+                
+                # 将BGR图像转换为RGB
+                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                profiler.lap("flip+cvtColor")
+                
+                # 提交检测（异步后端忙时丢弃这一帧）
+                hands.submit(image_rgb, frame_time, image)
+                profiler.lap("hands.process")
+                
+                stopped = self.handle_detections(hands.poll(), display)
+                profiler.maybe_report()
+            
+            # 处理来源结束时还在检测中的帧
+            if not stopped:
+                self.handle_detections(hands.drain(), display)
+            
+            # 保存录制
+            if self.recorder:
+                frame_count = self.recorder.save(self.record_path)
+                print(f"已录制 {frame_count} 帧到 {self.record_path}")
+            
+            # 导出计时记录
+            if profiler.enabled:
+                print(profiler.format_summary())
+                if self.trace_path:
+                    profiler.export_chrome_trace(self.trace_path)
+                    print(f"Chrome trace 已保存到 {self.trace_path}")
             
             # 清理资源
             if self.cap:
@@ -229,11 +631,37 @@ class GestureRecognition:
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="手势识别与位置跟踪")
+    parser.add_argument("--source", default="0", help="摄像头序号、视频文件、图片目录或 synthetic")
+    parser.add_argument("--realtime", action="store_true", help="文件类来源按原始帧率输出")
+    parser.add_argument("--gesture-port", type=int, default=8000, help="手势发送端口")
+    parser.add_argument("--position-port", type=int, default=5000, help="位置发送端口")
+    parser.add_argument("--no-position", action="store_true", help="不启用位置跟踪")
+    parser.add_argument("--no-display", action="store_true", help="不显示画面")
+    parser.add_argument("--sequential-startup", action="store_true", help="按顺序而不是并行初始化")
+    parser.add_argument("--enroll", metavar="NAME", help="启动后录入一个新手势（也可在画面中按 E 录入）")
+    parser.add_argument("--bus", metavar="NAME", nargs="?", const="gesture_landmarks",
+                        help="把每帧结果发布到共享内存总线，本地进程用 python -m utils.landmark_bus NAME 读取")
+    parser.add_argument("--detector", choices=["legacy", "tasks"], default="legacy",
+                        help="手部检测后端: legacy 同步检测，tasks 为 HandLandmarker LIVE_STREAM 异步检测")
+    parser.add_argument("--task-model", help="tasks 后端的 hand_landmarker.task 路径")
+    parser.add_argument("--mirror", metavar="HOST", action="append", default=[],
+                        help="同时把手势和位置发送到该主机（可重复）")
+    parser.add_argument("--no-state-sync", action="store_true", help="不发送手势状态快照，只发送变化消息")
+    parser.add_argument("--enroll-seconds", type=float, default=3.0, help="录入新手势的采集时长(秒)")
+    args = parser.parse_args()
+    
     # 创建手势识别实例
-    gr = GestureRecognition(gesture_port=8000, position_port=5000)
+    gr = GestureRecognition(gesture_port=args.gesture_port, position_port=args.position_port,
+                            position_send_rate=60, bus_name=args.bus,
+                            detector=args.detector, task_model=args.task_model, mirror_hosts=args.mirror,
+                            state_sync=not args.no_state_sync)
     # 启用位置跟踪功能
-    gr.enable_position(True)
+    gr.enable_position(not args.no_position)
+    if args.enroll:
+        gr.enroll_gesture(args.enroll, args.enroll_seconds)
     # 开始识别
-    gr.recognize_gestures()
+    gr.recognize_gestures(args.source, realtime=args.realtime, display=not args.no_display,
+                          parallel_startup=not args.sequential_startup)
     # 断开连接
     gr.disconnect()
\ No newline at end of file
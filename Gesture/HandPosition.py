@@ -1,58 +1,172 @@
-import cv2
-import mediapipe as mp
 import numpy as np
-import socket
+import logging
 import time
 
+from utils.landmark_filter import LandmarkFilter
+from utils.kalman import HandPredictor
+from utils.fixed_rate_sender import FixedRateSender
+from utils.udp_transport import UdpTransport
+from utils.hand_id_tracker import HandIdentityTracker
+from utils.profiler import profiler, span
+from utils.frame_source import open_source
+from utils.hand_detector import create_hand_detector
+from utils.log import get_logger, log_event
+from utils.landmark_stream import make_results, load_tracking_stream
+from utils.startup import LazyModule
+
+# 在第一次使用时才导入
+cv2 = LazyModule("cv2")
+mp = LazyModule("mediapipe")
+
+log = get_logger("position")
+
 class HandPositionTracker:
-    def __init__(self, host='127.0.0.1', port=5000, auto_connect=True):
+    def __init__(self, host='127.0.0.1', port=5000, auto_connect=True,
+                 min_delta=0.01, keepalive_interval=0.25,
+                 filter_landmarks=True, min_cutoff=1.0, beta=5.0,
+                 predict_lookahead=0.05, prediction_model="cv",
+                 send_rate=None, interpolation_delay=0.0, stable_ids=True, transport=None):
+        """
+        参数:
+            host, port: Unity 接收位置的地址
+            auto_connect: 是否立即连接
+            min_delta: 滤波后的位置变化超过该值才发送
+            keepalive_interval: 位置没有明显变化时，每只手至少每隔这个时间(秒)发送一次
+            filter_landmarks: 独立运行时是否对关键点做 One-Euro 滤波
+            min_cutoff, beta: One-Euro 滤波参数
+            predict_lookahead: 卡尔曼外推时间(秒)，用于补偿管线延迟；None 表示不预测
+            prediction_model: "cv" 匀速 或 "ca" 匀加速
+            send_rate: 固定发送频率(Hz)，例如60或120；设置后由独立线程按该频率发送，
+                       摄像头循环只写入最新样本；None 表示在摄像头循环中直接发送
+            interpolation_delay: 固定频率发送时的插值延后量(秒)，见 FixedRateSender
+            stable_ids: 是否用跨帧稳定的手部ID代替 MediaPipe 结果中的顺序
+            transport: 共享的 UdpTransport（目的地 "position"）；None 时创建自己的
+        """
         self.host = host
         self.port = port
-        self.sock = None
+        self.owns_transport = transport is None
+        self.transport = UdpTransport() if transport is None else transport
         self.is_connected = False
-        self.last_positions = {}  # 存储上一次的手部位置
-        self.last_send_time = time.time()  # 控制发送频率
+        self.last_positions = {}  # 存储上一次发送的手部位置
+        self.last_send_time = time.time()  # 控制无手时的发送频率
+        self.last_hand_send_times = {}  # 每只手上一次发送的时间
+        self.min_delta = min_delta
+        self.keepalive_interval = keepalive_interval
+        self.packets_sent = 0   # 放入发送队列的消息数，实际发出的见 transport
+        self.bytes_sent = 0
+        
+        # 独立运行时使用的关键点滤波器（与手势识别一起运行时由 GestureRecognition 滤波）
+        self.landmark_filter = LandmarkFilter(min_cutoff=min_cutoff, beta=beta) if filter_landmarks else None
+        
+        # 位置预测器: 发送外推到未来的位置，并在消息中附带速度
+        self.predictor = None
+        if predict_lookahead is not None:
+            self.predictor = HandPredictor(lookahead=predict_lookahead, model=prediction_model)
+        
+        # 手部ID跟踪器（与手势识别一起运行时由 GestureRecognition 传入ID）
+        self.id_tracker = HandIdentityTracker() if stable_ids else None
+        
+        # 固定频率发送线程，与摄像头帧率解耦
+        self.fixed_rate_sender = None
+        if send_rate:
+            self.fixed_rate_sender = FixedRateSender(self._send_sample, rate_hz=send_rate,
+                                                     interpolation_delay=interpolation_delay)
         
         if auto_connect:
             self.connect()
 
     def connect(self):
         try:
-            # 初始化UDP套接字
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            # 不绑定本地地址，因为我们只是发送方
+            if not self.transport.add_destination("position", self.host, self.port):
+                self.is_connected = False
+                return False
+            self.transport.start()
             self.is_connected = True
             # 测试发送一条消息
-            test_message = "position|0.5|0.5|0.0"
-            self.sock.sendto(test_message.encode('utf-8'), (self.host, self.port))
-            print(f"HandPositionTracker: 成功连接并向{self.host}:{self.port}发送测试消息")
+            self.transport.send("position", "position|0.5|0.5|0.0")
+            log_event(log, "position.connected", "HandPositionTracker: 成功连接并向%(host)s:%(port)d发送测试消息",
+                      host=self.host, port=self.port)
+            if self.fixed_rate_sender:
+                self.fixed_rate_sender.start()
             return True
         except Exception as e:
-            print(f"HandPositionTracker: 连接错误 - {e}")
+            log_event(log, "position.connect_error", "HandPositionTracker: 连接错误 - %(error)s", logging.ERROR,
+                      error=e)
             self.is_connected = False
             return False
 
     def disconnect(self):
-        if self.sock:
-            self.sock.close()
-            self.sock = None
+        if self.fixed_rate_sender:
+            self.fixed_rate_sender.stop()
+        if self.owns_transport:
+            self.transport.stop()
+        else:
+            # 先发完队列中的位置，移除目的地后它们会被丢弃
+            self.transport.flush(0.5, destination="position")
+            self.transport.remove_destination("position")
         self.is_connected = False
-        print("HandPositionTracker: 已断开连接")
+        log_event(log, "position.disconnected", "HandPositionTracker: 已断开连接")
+
+    def _send(self, message, hand_idx):
+        """把一条位置消息放入发送队列，同一只手还没发出的旧位置被替换"""
+        data = message.encode('utf-8')
+        with span("udp.send_position"):
+            self.transport.send("position", data, key=hand_idx)
+        self.packets_sent += 1
+        self.bytes_sent += len(data)
+
+    def assign_hand_ids(self, results, timestamp=None):
+        """返回每只手的ID，未启用稳定ID时为 MediaPipe 结果中的顺序"""
+        if not results.multi_hand_landmarks:
+            if self.id_tracker:
+                self.id_tracker.assign(results, timestamp)
+            return []
+        if self.id_tracker:
+            return self.id_tracker.assign(results, timestamp)
+        return list(range(len(results.multi_hand_landmarks)))
+
+    def _send_sample(self, hand_idx, position, velocity):
+        """固定频率发送线程的回调，hand_idx 为 None 表示没有手"""
+        if not self.is_connected:
+            return
+        if hand_idx is None:
+            self._send("position|-1|0.5|0.5|0.0", -1)
+        else:
+            self._send(self._position_message(hand_idx, position, velocity), hand_idx)
+
+    @staticmethod
+    def _position_message(hand_idx, position, velocity=None):
+        """
+        构造位置消息: "position|hand_idx|x|y|z"，有速度时附加 "|vx:..|vy:..|vz:.."
+        
+        Unity 端把第5个字段之后的 key:value 解析为附加数据
+        """
+        x, y, z = position
+        message = f"position|{hand_idx}|{x:.4f}|{y:.4f}|{z:.4f}"
+        if velocity is not None:
+            vx, vy, vz = velocity
+            message += f"|vx:{vx:.4f}|vy:{vy:.4f}|vz:{vz:.4f}"
+        return message
 
     # 新方法：处理外部传入的帧和检测结果
-    def process_frame(self, results, image_shape):
+    def process_frame(self, results, image_shape, timestamp=None, hand_ids=None):
         """
         处理外部传入的MediaPipe检测结果并发送位置信息
         
+        关键点应当已经过滤波，只有位置变化超过 min_delta 或超过 keepalive_interval 未发送时才发送。
+        
         参数:
             results: MediaPipe手部检测结果
             image_shape: 图像尺寸 (height, width, channels)
+            timestamp: 帧时间(秒)，默认为当前时间，回放录制数据时传入录制时间
+            hand_ids: 每只手的稳定ID，默认由自身的 id_tracker 分配
         
         返回:
-            None
+            当前检测到的手的位置 {hand_idx: (x, y, z), ...}
         """
         if not self.is_connected:
-            print("HandPositionTracker: 未连接，请先调用 connect() 方法")
+            log_event(log, "position.not_connected", "HandPositionTracker: 未连接，请先调用 connect() 方法",
+                      logging.WARNING)
             return {}
         
         # 解析图像尺寸
@@ -64,12 +178,33 @@ class HandPositionTracker:
         # 当前检测到的手的位置信息
         current_hands = {}
 
+        current_time = time.time() if timestamp is None else timestamp
+        
+        # 为每只手分配稳定的ID，避免手的顺序交换导致位置跳变
+        if hand_ids is None:
+            hand_ids = self.assign_hand_ids(results, current_time)
+        
+        # 固定频率模式: 只把样本写入双缓冲，由发送线程按固定频率插值/外推后发送
+        if self.fixed_rate_sender:
+            samples = {}
+            if results.multi_hand_landmarks:
+                for hand_idx, hand_landmarks in zip(hand_ids, results.multi_hand_landmarks):
+                    cx = sum(lm.x for lm in hand_landmarks.landmark) / len(hand_landmarks.landmark)
+                    cy = sum(lm.y for lm in hand_landmarks.landmark) / len(hand_landmarks.landmark)
+                    position = (cx, cy, hand_landmarks.landmark[0].z)
+                    velocity = None
+                    if self.predictor:
+                        position, velocity = self.predictor.update(f"hand_{hand_idx}", position, current_time)
+                        position = tuple(float(v) for v in position)
+                    current_hands[hand_idx] = position
+                    samples[hand_idx] = (position, velocity)
+                if self.predictor:
+                    self.predictor.forget(current_time)
+            self.fixed_rate_sender.publish(samples, current_time)
+            return current_hands
+        
         if results.multi_hand_landmarks:
-            current_time = time.time()
-            # 每30ms发送一次位置信息
-            should_send = (current_time - self.last_send_time) > 0.03
-            
-            for hand_idx, hand_landmarks in enumerate(results.multi_hand_landmarks):
+            for hand_idx, hand_landmarks in zip(hand_ids, results.multi_hand_landmarks):
                 # 计算手部中心点
                 cx = 0
                 cy = 0
@@ -83,34 +218,42 @@ class HandPositionTracker:
                 # 获取手腕深度作为z坐标
                 wrist_depth = hand_landmarks.landmark[0].z
                 
+                key = f"hand_{hand_idx}"
+                
+                # 外推到未来以补偿延迟
+                velocity = None
+                if self.predictor:
+                    position, velocity = self.predictor.update(key, (cx, cy, wrist_depth), current_time)
+                    cx, cy, wrist_depth = (float(v) for v in position)
+                
                 # 记录当前手的位置
                 current_hands[hand_idx] = (cx, cy, wrist_depth)
                 
                 # 检查位置是否有显著变化
-                key = f"hand_{hand_idx}"
                 if key in self.last_positions:
                     last_x, last_y, last_z = self.last_positions[key]
                     dist = np.sqrt((cx-last_x)**2 + (cy-last_y)**2)
-                    # 只有当位置变化明显或者应该发送时才发送
-                    if dist > 0.01 or should_send:
+                    stale = (current_time - self.last_hand_send_times.get(key, 0)) > self.keepalive_interval
+                    # 只有当位置变化明显或者长时间未发送时才发送
+                    if dist > self.min_delta or stale:
                         # 坐标已经是镜像的，因为图像已经翻转，MediaPipe检测的是翻转后的图像
-                        message = f"position|{hand_idx}|{cx:.4f}|{cy:.4f}|{wrist_depth:.4f}"
-                        self.sock.sendto(message.encode('utf-8'), (self.host, self.port))
+                        self._send(self._position_message(hand_idx, (cx, cy, wrist_depth), velocity), hand_idx)
                         self.last_positions[key] = (cx, cy, wrist_depth)
+                        self.last_hand_send_times[key] = current_time
                 else:
                     # 首次检测到此手
-                    message = f"position|{hand_idx}|{cx:.4f}|{cy:.4f}|{wrist_depth:.4f}"
-                    self.sock.sendto(message.encode('utf-8'), (self.host, self.port))
+                    self._send(self._position_message(hand_idx, (cx, cy, wrist_depth), velocity), hand_idx)
                     self.last_positions[key] = (cx, cy, wrist_depth)
+                    self.last_hand_send_times[key] = current_time
             
-            if should_send:
-                self.last_send_time = current_time
+            self.last_send_time = current_time
+            
+            if self.predictor:
+                self.predictor.forget(current_time)
         else:
             # 如果没有检测到手，发送默认位置
-            current_time = time.time()
             if (current_time - self.last_send_time) > 0.2:  # 降低无手时的发送频率
-                message = f"position|-1|{default_pos[0]}|{default_pos[1]}|{default_pos[2]}"
-                self.sock.sendto(message.encode('utf-8'), (self.host, self.port))
+                self._send(f"position|-1|{default_pos[0]}|{default_pos[1]}|{default_pos[2]}", -1)
                 self.last_send_time = current_time
         
         return current_hands
@@ -141,43 +284,40 @@ class HandPositionTracker:
         return image
 
     # 保留原始方法以支持独立运行
-    def track_position(self):
-        """跟踪手部位置并发送坐标信息 - 独立运行模式"""
+    def track_position(self, source=0, realtime=None, detector="legacy", task_model=None):
+        """
+        跟踪手部位置并发送坐标信息 - 独立运行模式
+        
+        参数:
+            source: 帧来源，摄像头序号、视频文件、图片目录、"synthetic" 或 FrameSource，见 utils.frame_source
+            realtime: 文件类来源是否按原始帧率输出，默认尽快输出
+            detector, task_model: 手部检测后端，见 utils.hand_detector.create_hand_detector
+        """
         if not self.is_connected:
             print("HandPositionTracker: 未连接，请先调用 connect() 方法")
             return
 
-        # 打开摄像头
-        cap = cv2.VideoCapture(0)
+        # 打开帧来源
+        cap = open_source(source, realtime=realtime)
         if not cap.isOpened():
-            print("错误：无法打开摄像头")
+            print(f"错误：无法打开帧来源 {source}")
             return
 
-        # 设置MediaPipe参数
         mp_hands = mp.solutions.hands
         mp_drawing = mp.solutions.drawing_utils
-        with mp_hands.Hands(
-                static_image_mode=False,
-                max_num_hands=2,
-                min_detection_confidence=0.5,
-                min_tracking_confidence=0.5) as hands:
-
-            while cap.isOpened():
-                success, image = cap.read()
-                if not success:
-                    break
-
-                # 水平镜像翻转图像
-                image = cv2.flip(image, 1)
-
-                # 将BGR图像转换为RGB
-                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
 
-                # 处理图像
-                results = hands.process(image_rgb)
+        def handle(detections):
+            """处理检测完成的帧，返回是否按下了 ESC 键"""
+            for frame_time, results, image in detections:
+                # 关键点滤波，抑制 MediaPipe 的抖动（按稳定ID维护滤波状态）
+                hand_ids = self.assign_hand_ids(results, frame_time)
+                if self.landmark_filter:
+                    self.landmark_filter.filter_results(results, frame_time, keys=hand_ids)
+                profiler.lap("filter")
 
                 # 处理检测结果并发送位置信息
-                hands_info = self.process_frame(results, image.shape)
+                hands_info = self.process_frame(results, image.shape, timestamp=frame_time, hand_ids=hand_ids)
+                profiler.lap("position")
                 
                 # 绘制手部标记
                 if hands_info:
@@ -190,16 +330,191 @@ class HandPositionTracker:
                             image, hand_landmarks, mp_hands.HAND_CONNECTIONS,
                             mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2, circle_radius=4),
                             mp_drawing.DrawingSpec(color=(0, 255, 0), thickness=2))
+                profiler.lap("draw")
 
                 # 显示结果
                 cv2.imshow('手部位置跟踪', image)
-                if cv2.waitKey(5) & 0xFF == 27:  # ESC键退出
-                    break
+                key = cv2.waitKey(5) & 0xFF
+                profiler.lap("imshow")
+                if key == 27:  # ESC键退出
+                    return True
+            return False
+
+        with create_hand_detector(detector, task_model, max_num_hands=2, min_detection_confidence=0.5,
+                                  min_tracking_confidence=0.5) as hands:
+            # 异步后端用短超时读帧，等待下一帧期间及时处理已完成的检测
+            read_timeout = 1.0 if hands.synchronous else 0.002
+            stopped = False
+            while not stopped:
+                profiler.start_frame()
+                success, image, frame_time = cap.read_timestamped(timeout=read_timeout)
+                if not success:
+                    if not cap.isOpened():
+                        break
+                    stopped = handle(hands.poll())
+                    continue
+                profiler.lap("cap.read")
+
+                # 水平镜像翻转图像
+                image = cv2.flip(image, 1)
+
+                # 将BGR图像转换为RGB
+                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                profiler.lap("flip+cvtColor")
+
+                # 提交检测（异步后端忙时丢弃这一帧）
+                hands.submit(image_rgb, frame_time, image)
+                profiler.lap("hands.process")
+
+                stopped = handle(hands.poll())
+                profiler.maybe_report()
 
         cap.release()
         cv2.destroyAllWindows()
 
 
+def evaluate_position_sending(stream=None, filter_landmarks=True, min_cutoff=1.0, beta=5.0,
+                              min_delta=0.01, keepalive_interval=0.25, predict_lookahead=None,
+                              stable_ids=True, port=5999):
+    """
+    在录制的关键点流上评估位置发送: 每秒发送的数据包数和滤波带来的延迟
+    
+    参数:
+        stream: load_tracking_stream 等返回的 [(timestamp, hands), ...]，默认使用 hand_tracking_data.json
+        filter_landmarks, min_cutoff, beta, min_delta, keepalive_interval: 见 HandPositionTracker
+        port: 评估时发送到的本地端口
+    
+    返回:
+        {"packets_per_second": 每秒数据包数, "lag_ms": 滤波后中心点相对原始中心点的延迟(毫秒)}
+    """
+    if stream is None:
+        stream = load_tracking_stream()
+    
+    tracker = HandPositionTracker(port=port, auto_connect=False, min_delta=min_delta,
+                                  keepalive_interval=keepalive_interval,
+                                  filter_landmarks=filter_landmarks, min_cutoff=min_cutoff, beta=beta,
+                                  predict_lookahead=predict_lookahead, stable_ids=stable_ids)
+    tracker.connect()
+    
+    raw_centers = []
+    filtered_centers = []
+    for timestamp, hands in stream:
+        results = make_results(hands)
+        if hands:
+            raw_centers.append(hands[0][2][:, :2].mean(axis=0))
+        hand_ids = tracker.assign_hand_ids(results, timestamp)
+        if tracker.landmark_filter:
+            tracker.landmark_filter.filter_results(results, timestamp, keys=hand_ids)
+        hands_info = tracker.process_frame(results, (480, 640, 3), timestamp=timestamp, hand_ids=hand_ids)
+        if hands:
+            filtered_centers.append(hands_info[hand_ids[0]][:2])
+    tracker.disconnect()
+    
+    duration = max(stream[-1][0] - stream[0][0], 1e-6)
+    frame_time = duration / max(len(stream) - 1, 1)
+    
+    # 延迟: 使滤波结果与平移后的原始轨迹误差最小的平移量（0.1帧步长）
+    lag_ms = 0.0
+    if len(raw_centers) > 10:
+        raw = np.array(raw_centers)
+        filtered = np.array(filtered_centers)
+        frames = np.arange(len(raw), dtype=np.float64)
+        best = None
+        for shift in np.arange(0.0, 5.0, 0.1):
+            shifted = np.column_stack([np.interp(frames - shift, frames, raw[:, k]) for k in range(2)])
+            err = np.mean(np.sum((filtered[5:] - shifted[5:]) ** 2, axis=1))
+            if best is None or err < best[0]:
+                best = (err, shift)
+        lag_ms = best[1] * frame_time * 1000
+    
+    return {"packets_per_second": tracker.packets_sent / duration, "lag_ms": float(lag_ms)}
+
+
+def evaluate_prediction(stream=None, lookahead=0.05, model="cv", process_noise=10.0, measurement_noise=1e-4):
+    """
+    在录制的关键点流上评估位置预测误差
+    
+    每帧用当前及之前的测量外推 lookahead 秒，与该时刻实际的中心点（相邻帧线性插值）比较；
+    同时给出不做预测（直接使用当前位置）时的误差作为对照。
+    
+    返回:
+        {"rmse": 预测误差, "baseline_rmse": 不预测的误差, "samples": 比较的样本数}
+    """
+    if stream is None:
+        stream = load_tracking_stream()
+    
+    # 按左右手拆分为中心点轨迹
+    tracks = {}
+    for timestamp, hands in stream:
+        for handedness, _, landmarks in hands:
+            center = np.array([landmarks[:, 0].mean(), landmarks[:, 1].mean(), landmarks[0, 2]])
+            tracks.setdefault(handedness, []).append((timestamp, center))
+    
+    errors = []
+    baseline_errors = []
+    for samples in tracks.values():
+        times = np.array([t for t, _ in samples])
+        centers = np.array([c for _, c in samples])
+        predictor = HandPredictor(lookahead=lookahead, model=model,
+                                  process_noise=process_noise, measurement_noise=measurement_noise)
+        for i, (t, c) in enumerate(samples):
+            predicted, _ = predictor.update("hand", c, t)
+            target_time = t + lookahead
+            j = np.searchsorted(times, target_time)
+            # 只比较目标时刻前后都有测量且没有长时间缺口的样本
+            if j >= len(times) or j == 0 or times[j] - times[j - 1] > 0.1:
+                continue
+            w = (target_time - times[j - 1]) / (times[j] - times[j - 1])
+            actual = centers[j - 1] * (1 - w) + centers[j] * w
+            errors.append(np.linalg.norm(predicted[:2] - actual[:2]))
+            baseline_errors.append(np.linalg.norm(c[:2] - actual[:2]))
+    
+    if not errors:
+        return {"rmse": 0.0, "baseline_rmse": 0.0, "samples": 0}
+    return {
+        "rmse": float(np.sqrt(np.mean(np.square(errors)))),
+        "baseline_rmse": float(np.sqrt(np.mean(np.square(baseline_errors)))),
+        "samples": len(errors),
+    }
+
+
+def evaluate_hand_ids(stream=None, jump_threshold=0.15, port=5999):
+    """
+    在录制的双手数据上比较 MediaPipe 原始顺序与稳定ID
+    
+    返回:
+        {"raw": {...}, "stable": {...}}，每项包含:
+            packets: 发送的位置数据包数
+            jumps: 同一ID的位置在相邻帧间跳变超过 jump_threshold 的次数（手的顺序交换的表现）
+            jump_rate: 跳变次数 / 有手的帧数
+    """
+    if stream is None:
+        stream = load_tracking_stream()
+    
+    report = {}
+    for name, stable_ids in (("raw", False), ("stable", True)):
+        tracker = HandPositionTracker(port=port, auto_connect=False, filter_landmarks=False,
+                                      predict_lookahead=None, stable_ids=stable_ids)
+        tracker.connect()
+        
+        last = {}
+        jumps = 0
+        frames_with_hands = 0
+        for timestamp, hands in stream:
+            hands_info = tracker.process_frame(make_results(hands), (480, 640, 3), timestamp=timestamp)
+            if hands_info:
+                frames_with_hands += 1
+            for hand_id, (x, y, _) in hands_info.items():
+                if hand_id in last and np.hypot(x - last[hand_id][0], y - last[hand_id][1]) > jump_threshold:
+                    jumps += 1
+                last[hand_id] = (x, y)
+        tracker.disconnect()
+        
+        report[name] = {"packets": tracker.packets_sent, "jumps": jumps,
+                        "jump_rate": jumps / max(frames_with_hands, 1)}
+    return report
+
+
 if __name__ == "__main__":
     # 独立运行模式
     tracker = HandPositionTracker()
@@ -0,0 +1,799 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+import numpy as np
+
+# 性能基准: 每个基准返回若干指标，median_us 为单次操作耗时的中位数，min_us 为各轮中最快的一轮。
+# 与基线比较时使用受调度噪声影响最小的 min_us（没有时用 median_us），越小越好；
+# 任何基准比基线慢超过阈值百分比即以非零状态退出。
+
+GESTURE_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(GESTURE_DIR, "benchmark_baseline.json")
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """注册一个基准函数，函数返回指标字典（至少包含 median_us 和 min_us）"""
+    def decorator(fn):
+        BENCHMARKS[name] = fn
+        return fn
+    return decorator
+
+
+def measure(fn, number=100, repeat=7, warmup=1):
+    """
+    多次计时 fn
+
+    参数:
+        number: 每轮调用次数
+        repeat: 轮数，取各轮单次耗时的中位数
+        warmup: 预热轮数
+
+    返回:
+        {"median_us", "min_us", "ops_per_sec"}
+    """
+    for _ in range(warmup):
+        for _ in range(number):
+            fn()
+    per_call = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        per_call.append((time.perf_counter() - start) / number)
+    median = float(np.median(per_call))
+    return {"median_us": median * 1e6, "min_us": float(min(per_call)) * 1e6,
+            "ops_per_sec": 1.0 / median if median > 0 else 0.0}
+
+
+@contextlib.contextmanager
+def quiet():
+    """屏蔽被测代码的 print 输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def _load_models():
+    from model_loader import ModelLoader
+    loader = ModelLoader()
+    with quiet():
+        loader.load_gesture_models()
+    return loader
+
+
+def _sample_landmarks(two_hands=False):
+    """从 gesture_data 取一个样本，转换为识别器使用的像素坐标"""
+    from utils.landmark_stream import load_session_stream
+    folder = "Bird_TwoHands" if two_hands else "Deer"
+    session_dir = os.path.join(GESTURE_DIR, "gesture_data", folder)
+    path = os.path.join(session_dir, sorted(os.listdir(session_dir))[0])
+    hands = load_session_stream(path)[0][1]
+    return [[(int(x * 640), int(y * 480)) for x, y, _ in landmarks] for _, _, landmarks in hands]
+
+
+@benchmark("single_hand.predict")
+def bench_single_predict():
+    from recognizers import SingleHandRecognizer
+    model = _load_models().single_hand_model
+    features = [SingleHandRecognizer.extract_features(_sample_landmarks()[0])]
+    return measure(lambda: model.predict(features), number=20)
+
+
+@benchmark("single_hand.predict_proba")
+def bench_single_predict_proba():
+    from recognizers import SingleHandRecognizer
+    model = _load_models().single_hand_model
+    features = [SingleHandRecognizer.extract_features(_sample_landmarks()[0])]
+    return measure(lambda: model.predict_proba(features), number=20)
+
+
+@benchmark("single_hand.predict_proba_batch256")
+def bench_single_batch():
+    """批量推理，median_us 为每个样本的耗时"""
+    from recognizers import SingleHandRecognizer
+    model = _load_models().single_hand_model
+    features = np.tile(SingleHandRecognizer.extract_features(_sample_landmarks()[0]), (256, 1))
+    result = measure(lambda: model.predict_proba(features), number=2, repeat=5)
+    return {"median_us": result["median_us"] / 256, "min_us": result["min_us"] / 256,
+            "ops_per_sec": result["ops_per_sec"] * 256, "batch": 256}
+
+
+@benchmark("cascade.first_stage")
+def bench_cascade_first_stage():
+    """级联第一级: 一只手的手指状态编码和查表（不含随机森林）"""
+    from recognizers.cascade_recognizer import hand_codes
+    cascade = _load_models().cascades["single"]
+    landmarks = np.asarray(_sample_landmarks(), dtype=np.float64)[np.newaxis]
+    return measure(lambda: cascade.decide(hand_codes(landmarks)[0]), number=200)
+
+
+@benchmark("cascade.single_hand_recognize")
+def bench_cascade_single_hand():
+    """gesture_data 单手会话逐帧经过级联识别（歧义帧调用随机森林）；forest_fraction 为调用模型的帧比例"""
+    import logging
+    from recognizers import CascadeRecognizer, SingleHandRecognizer
+    from utils.landmark_stream import load_session_stream
+    loader = _load_models()
+    recognizer = CascadeRecognizer(SingleHandRecognizer(loader.single_hand_model), loader.cascades["single"])
+    frames = []
+    for folder in ("Deer", "Wolf"):
+        session_dir = os.path.join(GESTURE_DIR, "gesture_data", folder)
+        for name in sorted(os.listdir(session_dir)):
+            for _, hands in load_session_stream(os.path.join(session_dir, name)):
+                frames.append([(int(x * 640), int(y * 480)) for x, y, _ in hands[0][2]])
+    index = [0]
+
+    def step():
+        recognizer.recognize(frames[index[0] % len(frames)])
+        index[0] += 1
+    logging.disable(logging.INFO)
+    try:
+        result = measure(step, number=len(frames), repeat=3)
+    finally:
+        logging.disable(logging.NOTSET)
+    result["forest_fraction"] = recognizer.forwarded / max(recognizer.accepted + recognizer.rejected
+                                                           + recognizer.forwarded, 1)
+    return result
+
+
+@benchmark("two_hands.predict_proba")
+def bench_two_predict_proba():
+    from recognizers import TwoHandsRecognizer
+    model = _load_models().two_hands_model
+    features = [TwoHandsRecognizer.extract_features(*_sample_landmarks(two_hands=True))]
+    return measure(lambda: model.predict_proba(features), number=20)
+
+
+@benchmark("two_hands.predict_proba_batch256")
+def bench_two_batch():
+    from recognizers import TwoHandsRecognizer
+    model = _load_models().two_hands_model
+    features = np.tile(TwoHandsRecognizer.extract_features(*_sample_landmarks(two_hands=True)), (256, 1))
+    result = measure(lambda: model.predict_proba(features), number=2, repeat=5)
+    return {"median_us": result["median_us"] / 256, "min_us": result["min_us"] / 256,
+            "ops_per_sec": result["ops_per_sec"] * 256, "batch": 256}
+
+
+@benchmark("stabilizer.add_gesture")
+def bench_stabilizer():
+    """1000 Hz 输入时的稳定器开销，时间窗口内保持约1000条历史"""
+    from gesture_stabilizer import GestureStabilizer
+    stabilizer = GestureStabilizer(time_window=1.0, threshold=0.9)
+    gestures = ["Bird", "Bird", "Bird", "Deer"]
+    state = {"t": 0.0, "i": 0}
+
+    def step():
+        state["t"] += 0.001
+        state["i"] += 1
+        stabilizer.add_gesture(gestures[state["i"] % 4], state["t"])
+
+    with quiet():
+        return measure(step, number=1000, repeat=5)
+
+
+@benchmark("features.single_hand")
+def bench_features_single():
+    from recognizers import SingleHandRecognizer
+    landmarks = _sample_landmarks()[0]
+    return measure(lambda: SingleHandRecognizer.extract_features(landmarks), number=2000)
+
+
+@benchmark("features.two_hands")
+def bench_features_two():
+    from recognizers import TwoHandsRecognizer
+    landmarks1, landmarks2 = _sample_landmarks(two_hands=True)
+    return measure(lambda: TwoHandsRecognizer.extract_features(landmarks1, landmarks2), number=2000)
+
+
+@benchmark("model_loader.load")
+def bench_model_loader():
+    """进程内重复加载模型文件（不含 sklearn 导入）"""
+    from model_loader import ModelLoader
+
+    def load():
+        with quiet():
+            ModelLoader().load_gesture_models()
+    return measure(load, number=3, repeat=7)
+
+
+@benchmark("model_loader.cold_process")
+def bench_model_loader_cold():
+    """新进程中导入并加载模型的总耗时（冷启动）"""
+    code = ("import time; t = time.perf_counter(); from model_loader import ModelLoader; "
+            "ModelLoader().load_gesture_models(); print('ELAPSED', time.perf_counter() - t)")
+    times = []
+    for _ in range(3):
+        output = subprocess.run([sys.executable, "-c", code], cwd=GESTURE_DIR, capture_output=True,
+                                text=True, env=dict(os.environ, PYTHONWARNINGS="ignore")).stdout
+        times.append(float(output.rsplit("ELAPSED", 1)[1]))
+    return {"median_us": float(np.median(times)) * 1e6, "min_us": min(times) * 1e6}
+
+
+def _cold_start(extra_args=(), timeout=60.0):
+    """
+    启动 Gesture_recognition.py（合成帧来源、不显示画面），在本地端口接收手势消息
+
+    返回:
+        (收到启动状态 status|Ready 或 status|NoModels 的时间, 收到第一个手势的时间)，从启动进程开始计时(秒)
+    """
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.settimeout(0.5)
+    command = [sys.executable, "Gesture_recognition.py", "--source", "synthetic", "--no-display",
+               "--no-position", "--gesture-port", str(receiver.getsockname()[1]), *extra_args]
+    ready = first = None
+    start = time.perf_counter()
+    process = subprocess.Popen(command, cwd=GESTURE_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               env=dict(os.environ, PYTHONWARNINGS="ignore"))
+    try:
+        while first is None and time.perf_counter() - start < timeout:
+            try:
+                message = receiver.recv(65535).decode('utf-8')
+            except socket.timeout:
+                if process.poll() is not None:
+                    break
+                continue
+            elapsed = time.perf_counter() - start
+            if message in ("status|Ready", "status|NoModels"):
+                ready = elapsed
+            elif message.startswith("gesture|") and message.count("|") == 1:
+                first = elapsed
+    finally:
+        process.kill()
+        process.wait()
+        receiver.close()
+    if first is None:
+        raise RuntimeError("没有收到手势消息")
+    return ready, first
+
+
+def _bench_cold_start(extra_args=()):
+    runs = [_cold_start(extra_args) for _ in range(3)]
+    first = [f for _, f in runs]
+    return {"median_us": float(np.median(first)) * 1e6, "min_us": min(first) * 1e6,
+            "ready_us": float(np.median([r for r, _ in runs])) * 1e6}
+
+
+@benchmark("startup.time_to_first_gesture")
+def bench_time_to_first_gesture():
+    """冷启动到第一个手势消息的时间（新进程，并行初始化并预热）；ready_us 为发送 Ready 的时间"""
+    return _bench_cold_start()
+
+
+@benchmark("startup.time_to_first_gesture_sequential")
+def bench_time_to_first_gesture_sequential():
+    """同上，按顺序初始化，用于比较并行初始化的收益"""
+    return _bench_cold_start(["--sequential-startup"])
+
+
+@benchmark("trainer.load_data")
+def bench_trainer_load_data():
+    """GestureTrainer.load_data（读取 gesture_data 并训练），输出写入临时目录"""
+    from gesture_trainer import GestureTrainer
+    data_dir = os.path.join(GESTURE_DIR, "gesture_data")
+    times = []
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)   # 混淆矩阵图片保存在当前目录
+        try:
+            for _ in range(2):
+                trainer = GestureTrainer(data_dir=data_dir, model_file=os.path.join(tmp, "gesture_model.pkl"))
+                start = time.perf_counter()
+                with quiet(), warnings.catch_warnings():
+                    warnings.simplefilter("ignore")   # 混淆矩阵中文标签缺字形的警告
+                    trainer.load_data()
+                times.append(time.perf_counter() - start)
+        finally:
+            os.chdir(cwd)
+    return {"median_us": float(np.median(times)) * 1e6, "min_us": min(times) * 1e6}
+
+
+@benchmark("collector.accept_sample")
+def bench_collector_accept():
+    """数据采集每帧的新颖度判断和后台写入排队（不含 MediaPipe），使用录制的跟踪数据"""
+    from data_collector import GestureDataCollector
+    from utils.landmark_stream import load_tracking_stream
+    from utils.novelty_sampler import NoveltySampler
+    from utils.session_writer import SessionWriter
+    frames = [[landmarks for _, _, landmarks in hands] for _, hands in load_tracking_stream() if hands]
+    sampler = NoveltySampler()
+    with tempfile.TemporaryDirectory() as tmp:
+        writer = SessionWriter(os.path.join(tmp, "session.json"), {"gesture": "Bench", "is_two_hands": False},
+                               encode=GestureDataCollector.encode_sample)
+        index = [0]
+
+        def step():
+            points = frames[index[0] % len(frames)]
+            index[0] += 1
+            if sampler.accept(points):
+                writer.write(points)
+        result = measure(step, number=len(frames), repeat=5)
+        writer.close()
+    result["accept_ratio"] = sampler.accepted / max(sampler.accepted + sampler.rejected, 1)
+    return result
+
+
+@benchmark("dataset.near_duplicates")
+def bench_dataset_near_duplicates():
+    """30000 个单手样本（gesture_data 每个样本复制 100 份并加抖动）的规范化和近重复剔除"""
+    from gesture_trainer import GestureTrainer
+    from utils.dataset import canonicalize, near_duplicates
+    with quiet():
+        X, y, _ = GestureTrainer(data_dir=os.path.join(GESTURE_DIR, "gesture_data"), plot=False).read_samples()["single"]
+    rng = np.random.default_rng(0)
+    X = np.repeat(np.asarray(X), 100, axis=0) + rng.normal(0, 0.0005, (len(X) * 100, 63))
+    y = np.repeat(np.asarray(y), 100)
+    result = measure(lambda: near_duplicates(canonicalize(X, 1), 0.05, labels=y), number=1, repeat=3)
+    result["samples"] = len(X)
+    return result
+
+
+@benchmark("augmentation.augment")
+def bench_augmentation_augment():
+    """gesture_data 单手样本每个生成若干份增强，共约 100 万个增强样本"""
+    from gesture_trainer import GestureTrainer
+    from utils.augmentation import LandmarkAugmenter
+    with quiet():
+        X, _, _ = GestureTrainer(data_dir=os.path.join(GESTURE_DIR, "gesture_data"), plot=False).read_samples()["single"]
+    points = np.asarray(X, dtype=np.float32).reshape(len(X), 21, 3)
+    copies = max(1000000 // len(points), 1)
+    augmenter = LandmarkAugmenter()
+    result = measure(lambda: augmenter.augment(points, copies), number=1, repeat=5)
+    result["samples"] = len(points) * copies
+    result["samples_per_sec"] = result["samples"] / (result["median_us"] / 1e6)
+    return result
+
+
+def _bench_prototype_recognize(count):
+    """PrototypeRecognizer.recognize 单手一帧（像素坐标到结果），原型为 gesture_data 单手样本的增强"""
+    from gesture_trainer import GestureTrainer
+    from recognizers.prototype_recognizer import PrototypeRecognizer
+    from utils.augmentation import LandmarkAugmenter
+    from utils.landmark_stream import load_tracking_stream
+    with quiet():
+        X, y, _ = GestureTrainer(data_dir=os.path.join(GESTURE_DIR, "gesture_data"), plot=False).read_samples()["single"]
+    copies = -(-count // len(X))
+    points = LandmarkAugmenter().augment(np.asarray(X, dtype=np.float32).reshape(len(X), 21, 3), copies)[:count]
+    labels = np.tile(np.asarray(y), copies)[:count]
+    recognizer = PrototypeRecognizer()
+    embeddings = recognizer.embed(points)
+    for name in np.unique(labels):
+        recognizer.add(str(name), embeddings[labels == name])
+    frames = [[(int(x * 640), int(y * 480)) for x, y, _ in hands[0][2]] for _, hands in load_tracking_stream() if hands]
+    index = [0]
+
+    def step():
+        recognizer.recognize(frames[index[0] % len(frames)])
+        index[0] += 1
+    result = measure(step, number=len(frames), repeat=5)
+    result["prototypes"] = recognizer.count()
+    return result
+
+
+@benchmark("prototype.recognize_100")
+def bench_prototype_recognize_100():
+    return _bench_prototype_recognize(100)
+
+
+@benchmark("prototype.recognize_1000")
+def bench_prototype_recognize_1000():
+    return _bench_prototype_recognize(1000)
+
+
+@benchmark("prototype.recognize_10000")
+def bench_prototype_recognize_10000():
+    return _bench_prototype_recognize(10000)
+
+
+@benchmark("prototype.recognize_100000")
+def bench_prototype_recognize_100000():
+    return _bench_prototype_recognize(100000)
+
+
+def _bench_dynamic_update(fps, templates=20):
+    """
+    DynamicGestureRecognizer.update 一帧（两只手: 每只手匹配单手模板，两只手一起匹配双手模板），
+    模板为跟踪数据中 2 秒长的片段；budget_fraction 为单帧耗时占帧间隔的比例
+    """
+    from recognizers.dynamic_recognizer import DynamicGestureRecognizer
+    from utils.landmark_stream import load_tracking_stream
+    stream = [(t, np.array([landmarks for _, _, landmarks in hands])) for t, hands in load_tracking_stream()
+              if len(hands) == 2]
+    times = np.array([t for t, _ in stream])
+    points = np.array([p for _, p in stream])
+    recognizer = DynamicGestureRecognizer()
+    rng = np.random.default_rng(0)
+    for i in range(templates):
+        start = rng.integers(0, len(stream) - 60)
+        recognizer.add_template(f"Motion{i}", times[start:start + 60], points[start:start + 60, :1], hands=1)
+        recognizer.add_template(f"Pair{i}", times[start:start + 60], points[start:start + 60], hands=2)
+    # 按目标帧率重采样跟踪数据
+    frame_times = np.arange(times[0], times[-1], 1.0 / fps)
+    frames = points[np.minimum(np.searchsorted(times, frame_times), len(times) - 1)]
+    index = [0]
+
+    def step():
+        i = index[0] % len(frames)
+        index[0] += 1
+        recognizer.update([(0, frames[i, 0]), (1, frames[i, 1])], index[0] / fps)
+    result = measure(step, number=len(frames), repeat=5)
+    result["templates"] = recognizer.template_count()
+    result["budget_fraction"] = result["median_us"] * 1e-6 * fps
+    return result
+
+
+@benchmark("dynamic.update_30fps")
+def bench_dynamic_update_30fps():
+    return _bench_dynamic_update(30)
+
+
+@benchmark("dynamic.update_60fps")
+def bench_dynamic_update_60fps():
+    return _bench_dynamic_update(60)
+
+
+def _bench_detector(backend, work=0.0):
+    """
+    合成来源按 30 FPS 实时输出 150 帧，检测后端逐帧检测，每个结果之后在调用线程中模拟 work 秒的识别耗时；
+    median_us 为帧时间到调用线程处理结果的延迟中位数，submit_us 为调用线程每帧阻塞在检测上的时间
+    """
+    from utils.frame_source import SyntheticSource
+    from utils.hand_detector import measure_backend
+    with quiet():
+        result = measure_backend(backend, SyntheticSource(frames=150, realtime=True), work=work)
+    return {"median_us": result["latency_ms"] * 1000, "min_us": result["latency_ms"] * 1000,
+            "submit_us": result["submit_ms"] * 1000, "fps": result["fps"], "dropped": result["dropped"]}
+
+
+@benchmark("detector.legacy_30fps")
+def bench_detector_legacy():
+    return _bench_detector("legacy")
+
+
+@benchmark("detector.tasks_30fps")
+def bench_detector_tasks():
+    return _bench_detector("tasks")
+
+
+@benchmark("detector.legacy_30fps_busy")
+def bench_detector_legacy_busy():
+    """同上，每帧识别耗时 20 ms（检测加识别超过帧间隔）"""
+    return _bench_detector("legacy", work=0.02)
+
+
+@benchmark("detector.tasks_30fps_busy")
+def bench_detector_tasks_busy():
+    return _bench_detector("tasks", work=0.02)
+
+
+def _bus_frame():
+    """一帧双手数据: 跟踪数据中的关键点、稳定ID、左右手和单手模型大小的概率"""
+    from utils.landmark_stream import load_tracking_stream
+    hands = next(hands for _, hands in load_tracking_stream() if len(hands) == 2)
+    return ([landmarks for _, _, landmarks in hands], [0, 1], [handedness for handedness, _, _ in hands],
+            np.full(8, 0.125))
+
+
+@benchmark("bus.publish")
+def bench_bus_publish():
+    """LandmarkBus.publish 写入一帧双手数据（关键点、手势名和概率）"""
+    from utils.landmark_bus import LandmarkBus
+    landmarks, hand_ids, handedness, probabilities = _bus_frame()
+    bus = LandmarkBus(f"gesture_bench_{os.getpid()}")
+    try:
+        return measure(lambda: bus.publish(0.0, landmarks, hand_ids, handedness, "Bird", "Bird", probabilities),
+                       number=1000, repeat=7)
+    finally:
+        bus.close()
+
+
+_BUS_READER = """
+import json, sys, time
+from utils.landmark_bus import LandmarkBusReader
+reader = LandmarkBusReader(sys.argv[1])
+print("READY", flush=True)
+lags = []
+while len(lags) + reader.missed < int(sys.argv[2]):
+    for frame in reader.wait(timeout=5.0):
+        lags.append(time.monotonic() - float(frame["published"]))
+print(json.dumps({"lags": lags, "missed": reader.missed}), flush=True)
+"""
+
+
+@benchmark("bus.reader_lag")
+def bench_bus_reader_lag(readers=2, frames=500, fps=200.0):
+    """
+    写者按固定频率发布，readers 个读者进程轮询读取；median_us 为发布到读者读到的延迟（所有读者汇总），
+    missed 为读者因落后超过缓冲区而丢失的帧数
+    """
+    from utils.landmark_bus import LandmarkBus
+    landmarks, hand_ids, handedness, probabilities = _bus_frame()
+    bus = LandmarkBus(f"gesture_bench_{os.getpid()}")
+    processes = [subprocess.Popen([sys.executable, "-c", _BUS_READER, bus.name, str(frames)], cwd=GESTURE_DIR,
+                                  stdout=subprocess.PIPE, text=True) for _ in range(readers)]
+    try:
+        for process in processes:
+            process.stdout.readline()
+        for i in range(frames):
+            bus.publish(i / fps, landmarks, hand_ids, handedness, "Bird", "Bird", probabilities)
+            time.sleep(1.0 / fps)
+        outputs = [json.loads(process.communicate(timeout=30)[0].splitlines()[-1]) for process in processes]
+    finally:
+        for process in processes:
+            process.kill()
+        bus.close()
+    lags = np.concatenate([output["lags"] for output in outputs]) * 1e6
+    return {"median_us": float(np.median(lags)), "min_us": float(lags.min()),
+            "p99_us": float(np.percentile(lags, 99)), "readers": readers,
+            "missed": sum(output["missed"] for output in outputs)}
+
+
+@benchmark("network.send_gesture")
+def bench_network_send():
+    """NetworkManager 编码并发送一条手势消息到本地端口"""
+    from utils.network import NetworkManager
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setblocking(False)
+    network = NetworkManager("127.0.0.1", receiver.getsockname()[1])
+    with quiet():
+        network.connect()
+
+    def drain():
+        try:
+            while True:
+                receiver.recv(65535)
+        except BlockingIOError:
+            pass
+
+    # 每轮的消息数小于发送队列长度，轮间等发送线程发完，只计调用方的耗时
+    per_call = []
+    for _ in range(6):
+        start = time.perf_counter()
+        for _ in range(200):
+            network.send_gesture("Bird")
+        per_call.append((time.perf_counter() - start) / 200)
+        network.transport.flush()
+        drain()
+    median = float(np.median(per_call[1:]))
+    result = {"median_us": median * 1e6, "min_us": float(min(per_call[1:])) * 1e6, "ops_per_sec": 1.0 / median,
+              "dropped": network.transport.dropped}
+    with quiet():
+        network.disconnect()
+    receiver.close()
+    return result
+
+
+@benchmark("transport.enqueue")
+def bench_transport_enqueue():
+    """
+    UdpTransport.send 放入一条位置消息（按手合并）的调用方耗时
+
+    inline_us 为同一消息在调用方直接 sendto 的耗时，即改用发送线程之前摄像头循环中的开销。
+    """
+    from utils.udp_transport import UdpTransport
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setblocking(False)
+    address = receiver.getsockname()
+    transport = UdpTransport().start()
+    transport.add_destination("position", *address)
+    message = "position|0|0.512|0.488|-0.031|vx:0.120|vy:-0.040|vz:0.000".encode('utf-8')
+
+    def drain():
+        try:
+            while True:
+                receiver.recv(65535)
+        except BlockingIOError:
+            pass
+
+    result = measure(lambda: transport.send("position", message, key=0), number=500, repeat=5)
+    transport.flush()
+    drain()
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    inline = measure(lambda: sender.sendto(message, address), number=500, repeat=5)
+    drain()
+    sender.close()
+    result.update(inline_us=inline["median_us"], coalesced=transport.coalesced, dropped=transport.dropped)
+    transport.stop()
+    receiver.close()
+    return result
+
+
+@benchmark("transport.position_burst")
+def bench_transport_burst():
+    """
+    两只手的位置以远超发送线程能力的速度提交，检查合并效果
+
+    队列深度不超过手数，接收端收到的每只手的最后一个位置是最后提交的位置（没有积压过时数据）。
+    median_us 为每次提交的平均耗时。
+    """
+    from utils.udp_transport import UdpTransport
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    receiver.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 20)
+    receiver.settimeout(0.2)
+    transport = UdpTransport().start()
+    transport.add_destination("position", *receiver.getsockname())
+
+    updates = 5000
+    start = time.perf_counter()
+    for i in range(updates):
+        hand = i % 2
+        transport.send("position", f"position|{hand}|{i}", key=hand)
+    submit = (time.perf_counter() - start) / updates
+    transport.flush()
+
+    last = {}
+    received = 0
+    try:
+        while True:
+            _, hand, index = receiver.recv(65535).decode('utf-8').split("|")
+            last[hand] = int(index)
+            received += 1
+    except socket.timeout:
+        pass
+    stats = transport.stats()
+    transport.stop()
+    receiver.close()
+    return {"median_us": submit * 1e6, "min_us": submit * 1e6, "ops_per_sec": 1.0 / submit,
+            "submitted": updates, "received": received, "coalesced": stats["coalesced"],
+            "max_queue_depth": stats["max_queue_depth"], "dropped": stats["dropped"],
+            "latest_delivered": last == {"0": updates - 2, "1": updates - 1}}
+
+
+@benchmark("state_sync.convergence")
+def bench_state_sync():
+    """
+    经 30% 双向丢包的本地中继发送 30 次状态变化，测量接收方收到每个版本的时间
+
+    冗余重发 + 确认与只发送一次（原来的手势变化消息）比较，unconverged 为被下一次变化覆盖前仍未收到的比例。
+    """
+    from utils.state_sync import measure_convergence
+    result = measure_convergence(loss=0.3, ack=True)
+    one_shot = measure_convergence(loss=0.3, ack=False, repeats=0, heartbeat_interval=None)
+    return {"median_us": result["median_ms"] * 1000, "min_us": result["median_ms"] * 1000,
+            "p99_ms": result["p99_ms"], "unconverged": result["unconverged"],
+            "packets_per_change": result["packets_per_change"], "one_shot_unconverged": one_shot["unconverged"]}
+
+
+@benchmark("udp_listener.receive")
+def bench_udp_listener():
+    """
+    以固定速率向 udp_listener 发送数据包，测量其接收速率和丢包
+
+    median_us 为每个数据包的平均间隔（发送 N 个包到全部收完的时间 / 收到的包数）。
+    """
+    from udp_listener import udp_listener
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    probe.bind(("127.0.0.1", 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    packets = 20000
+    result = {}
+
+    def listen():
+        with quiet():
+            result["received"] = udp_listener(host="127.0.0.1", port=port, timeout=1.0,
+                                              track_gesture_changes=True)
+        result["end"] = time.perf_counter()
+
+    thread = threading.Thread(target=listen)
+    thread.start()
+    time.sleep(0.2)
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    message = "gesture|Bird".encode('utf-8')
+    start = time.perf_counter()
+    for i in range(packets):
+        sender.sendto(message, ("127.0.0.1", port))
+        if i % 100 == 99:
+            time.sleep(0.0005)   # 避免一次性塞满接收缓冲区
+    send_time = time.perf_counter() - start
+    thread.join()
+    sender.close()
+
+    # 监听器在收不到数据1秒后因超时退出，扣除这段空闲时间
+    received = result.get("received", 0)
+    active = max(result["end"] - start - 1.0, send_time)
+    per_packet = active / max(received, 1) * 1e6
+    return {"median_us": per_packet, "min_us": per_packet, "ops_per_sec": received / active,
+            "received": received, "dropped": packets - received}
+
+
+def run_benchmarks(names=None):
+    """运行基准，返回结果字典"""
+    results = {}
+    for name, fn in BENCHMARKS.items():
+        if names and not any(name.startswith(prefix) for prefix in names):
+            continue
+        print(f"运行 {name} ...", end=" ", flush=True)
+        try:
+            results[name] = fn()
+            print(f"中位数 {results[name]['median_us']:.2f} us, 最快 {results[name]['min_us']:.2f} us")
+        except Exception as e:
+            print(f"失败: {e}")
+            results[name] = {"error": str(e)}
+    return {
+        "meta": {"python": platform.python_version(), "platform": platform.platform(),
+                 "machine": platform.machine(), "time": time.strftime("%Y-%m-%d %H:%M:%S")},
+        "results": results,
+    }
+
+
+def _score(result):
+    return result.get("min_us", result.get("median_us"))
+
+
+def compare(current, baseline, threshold_pct=20.0):
+    """
+    与基线比较 min_us（没有时用 median_us）
+
+    返回:
+        [(名称, 基线值, 当前值, 变化百分比, 是否退化), ...]
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or _score(base) is None or _score(result) is None:
+            continue
+        change = (_score(result) - _score(base)) / _score(base) * 100.0
+        rows.append((name, _score(base), _score(result), change, change > threshold_pct))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gesture 模块性能基准")
+    parser.add_argument("--output", default="benchmark_results.json", help="结果JSON路径")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线JSON路径")
+    parser.add_argument("--threshold", type=float, default=20.0, help="判定为退化的变慢百分比")
+    parser.add_argument("--only", help="只运行名称以这些前缀开头的基准，逗号分隔")
+    parser.add_argument("--update-baseline", action="store_true", help="把本次结果保存为基线")
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, GESTURE_DIR)
+    current = run_benchmarks(args.only.split(",") if args.only else None)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"结果已保存到 {args.output}")
+
+    if args.update_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"基线已更新: {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"没有基线文件 {args.baseline}，跳过比较")
+        return 0
+
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    rows = compare(current, baseline, args.threshold)
+    print(f"\n{'基准':<40}{'基线(us)':>14}{'当前(us)':>14}{'变化':>10}")
+    for name, base, value, change, regressed in rows:
+        flag = "  退化" if regressed else ""
+        print(f"{name:<40}{base:>14.2f}{value:>14.2f}{change:>9.1f}%{flag}")
+    regressions = [row for row in rows if row[4]]
+    errors = [name for name, result in current["results"].items() if "error" in result]
+    if regressions or errors:
+        print(f"\n{len(regressions)} 项退化超过 {args.threshold:.0f}%，{len(errors)} 项运行失败")
+        return 1
+    print("\n没有超过阈值的退化")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
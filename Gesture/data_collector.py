@@ -6,16 +6,49 @@ import time
 import json
 import datetime
 
+from utils.frame_source import open_source
+from utils.landmark_filter import landmarks_to_array
+from utils.novelty_sampler import NoveltySampler
+from utils.session_writer import SessionWriter
+
 class GestureDataCollector:
-    def __init__(self, base_dir="gesture_data"):
+    def __init__(self, base_dir="gesture_data", sequence_dir="gesture_sequences"):
         self.mp_hands = mp.solutions.hands
         self.mp_drawing = mp.solutions.drawing_utils
         self.base_dir = base_dir
+        self.sequence_dir = sequence_dir
         
         # 创建基础数据目录
         os.makedirs(base_dir, exist_ok=True)
         
-    def collect_gesture_data(self, gesture_name, is_two_hands=False, samples_count=100):
+    @staticmethod
+    def select_hands(results, is_two_hands):
+        """返回要采集的手（双手手势需要2只手，单手手势取第一只手），不满足时返回 None"""
+        hand_count = 0 if results.multi_hand_landmarks is None else len(results.multi_hand_landmarks)
+        if is_two_hands and hand_count == 2:
+            return results.multi_hand_landmarks[:2]
+        if not is_two_hands and hand_count >= 1:
+            return results.multi_hand_landmarks[:1]
+        return None
+    
+    @staticmethod
+    def encode_sample(points):
+        """把一个样本的关键点数组转换为会话文件中的格式（在写入线程中调用）"""
+        hand_data = [[{"x": x, "y": y, "z": z} for x, y, z in hand.tolist()] for hand in points]
+        return {
+            "hand1": hand_data[0],
+            "hand2": hand_data[1] if len(hand_data) > 1 else None,
+            "is_two_hands": len(hand_data) > 1
+        }
+    
+    @classmethod
+    def encode_sequence(cls, sequence):
+        """把一次动作 (时间戳列表, 关键点数组列表) 转换为序列文件中的格式（在写入线程中调用）"""
+        timestamps, frames = sequence
+        return {"timestamps": [round(t, 4) for t in timestamps], "frames": [cls.encode_sample(p) for p in frames]}
+    
+    def collect_gesture_data(self, gesture_name, is_two_hands=False, samples_count=100, source=0,
+                             novelty_threshold=0.05):
         """
         收集指定手势的特征数据
         
@@ -23,6 +56,8 @@ class GestureDataCollector:
             gesture_name: 手势名称
             is_two_hands: 是否为双手手势
             samples_count: 要收集的样本数量
+            source: 帧来源，摄像头序号、视频文件或图片目录，见 utils.frame_source
+            novelty_threshold: 新样本与最近样本的最小差别，见 utils.novelty_sampler，0 表示每帧都采集
         """
         # 添加双手标记到手势名称
         folder_name = gesture_name
@@ -41,7 +76,7 @@ class GestureDataCollector:
         print(f"数据将保存到: {session_file}")
         print("请将手放在摄像头前，准备好后按空格键开始")
         
-        cap = cv2.VideoCapture(0)
+        cap = open_source(source)
         
         with self.mp_hands.Hands(
             static_image_mode=False,
@@ -51,6 +86,11 @@ class GestureDataCollector:
             # 等待用户准备好
             while True:
                 success, image = cap.read()
+                if not success:
+                    print("错误：无法读取帧来源")
+                    cap.release()
+                    cv2.destroyAllWindows()
+                    return
                 cv2.putText(image, f"准备收集: {gesture_name} {'(双手)' if is_two_hands else '(单手)'}", (10, 30), 
                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
                 cv2.putText(image, "按空格键开始", (10, 70), 
@@ -65,13 +105,19 @@ class GestureDataCollector:
                     cv2.destroyAllWindows()
                     return
             
-            # 开始收集数据
+            # 开始收集数据: 与最近样本差别足够大的帧才作为新样本，写文件在后台线程中进行，
+            # 采集循环不暂停，预览和跟踪保持摄像头帧率
+            sampler = NoveltySampler(threshold=novelty_threshold)
+            writer = SessionWriter(session_file, {"gesture": gesture_name, "is_two_hands": is_two_hands},
+                                   encode=self.encode_sample)
             collected_samples = 0
-            samples = []
+            start_time = time.time()
             
             while collected_samples < samples_count:
                 success, image = cap.read()
                 if not success:
+                    if not cap.isOpened():
+                        break
                     continue
                 
                 # 处理图像
@@ -84,93 +130,127 @@ class GestureDataCollector:
                 cv2.putText(image, f"样本: {collected_samples}/{samples_count}", (10, 70), 
                            cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
                 
-                # 检测到的手数量
-                hand_count = 0 if results.multi_hand_landmarks is None else len(results.multi_hand_landmarks)
-                
-                # 如果是双手手势，需要检测到2只手才收集
-                # 如果是单手手势，只需要检测到1只手即可
-                valid_sample = False
-                
-                if is_two_hands and hand_count == 2:
-                    valid_sample = True
-                    # 收集双手的关键点
-                    hand_data = []
-                    
-                    for hand_landmarks in results.multi_hand_landmarks:
-                        # 绘制手部关键点
+                # 双手手势需要检测到2只手，单手手势只取第一只手
+                hand_landmarks_list = self.select_hands(results, is_two_hands)
+                if hand_landmarks_list:
+                    # 绘制手部关键点
+                    for hand_landmarks in hand_landmarks_list:
                         self.mp_drawing.draw_landmarks(
                             image, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-                        
-                        # 提取此手的特征
-                        landmarks_list = []
-                        for landmark in hand_landmarks.landmark:
-                            landmarks_list.append({
-                                "x": landmark.x,
-                                "y": landmark.y,
-                                "z": landmark.z
-                            })
-                        hand_data.append(landmarks_list)
-                        
-                    # 添加到样本集
-                    samples.append({
-                        "hand1": hand_data[0], 
-                        "hand2": hand_data[1],
-                        "is_two_hands": True
-                    })
-                    collected_samples += 1
-                    
-                elif not is_two_hands and hand_count >= 1:
-                    valid_sample = True
-                    # 只收集第一只手的关键点
-                    hand_landmarks = results.multi_hand_landmarks[0]
                     
-                    # 绘制手部关键点
-                    self.mp_drawing.draw_landmarks(
-                        image, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
-                    
-                    # 提取特征
-                    landmarks_list = []
-                    for landmark in hand_landmarks.landmark:
-                        landmarks_list.append({
-                            "x": landmark.x,
-                            "y": landmark.y,
-                            "z": landmark.z
-                        })
-                    
-                    # 添加到样本集
-                    samples.append({
-                        "hand1": landmarks_list,
-                        "hand2": None,
-                        "is_two_hands": False
-                    })
-                    collected_samples += 1
-                
-                if valid_sample:
-                    # 每收集一个样本暂停一下，防止连续的帧太相似
-                    time.sleep(0.1)
+                    points = [landmarks_to_array(hand_landmarks) for hand_landmarks in hand_landmarks_list]
+                    # 新颖度比较时按手腕横坐标排序，避免两只手的检测顺序交换被当作新样本
+                    if sampler.accept(sorted(points, key=lambda p: p[0, 0])):
+                        writer.write(points)
+                        collected_samples += 1
                 
                 cv2.imshow("手势数据收集", image)
-                if cv2.waitKey(5) & 0xFF == 27:  # ESC键退出
+                if cv2.waitKey(1) & 0xFF == 27:  # ESC键退出
                     break
             
-            # 保存数据
-            if samples:
-                with open(session_file, 'w') as f:
-                    json.dump({
-                        "gesture": gesture_name,
-                        "is_two_hands": is_two_hands,
-                        "samples": samples
-                    }, f)
-                
-                print(f"成功收集并保存了 {len(samples)} 个 {gesture_name} {'(双手)' if is_two_hands else '(单手)'} 手势样本")
+            # 写入剩余样本
+            saved = writer.close()
+            elapsed = time.time() - start_time
+            if saved:
+                print(f"成功收集并保存了 {saved} 个 {gesture_name} {'(双手)' if is_two_hands else '(单手)'} 手势样本"
+                      f"，用时 {elapsed:.1f} 秒（{sampler.rejected} 帧因与最近样本过于相似被跳过）")
                 
                 # 更新此手势的样本总数
                 total_samples = self.count_gesture_samples(gesture_dir)
                 print(f"{folder_name} 手势当前共有 {total_samples} 个样本")
+            else:
+                os.remove(session_file)
             
         cap.release()
         cv2.destroyAllWindows()
     
+    def collect_sequence_data(self, gesture_name, is_two_hands=False, repetitions=10, duration=2.0, source=0,
+                              min_frames=5):
+        """
+        录制动态手势（如鸟扇动翅膀、狼张嘴）的动作序列，用作 DynamicGestureRecognizer 的模板
+        
+        每按一次空格键录制一遍动作，录制 duration 秒内检测到手的每一帧及其时间戳。
+        保存到 sequence_dir/手势名[_TwoHands]/sequences_时间.json，格式见 utils.landmark_stream.load_sequence_data。
+        
+        参数:
+            gesture_name: 手势名称
+            is_two_hands: 是否为双手手势
+            repetitions: 录制的次数
+            duration: 每次录制的时长(秒)，应覆盖一遍完整动作
+            source: 帧来源，见 utils.frame_source
+            min_frames: 检测到手的帧少于该数时丢弃这一遍
+        """
+        folder_name = f"{gesture_name}_TwoHands" if is_two_hands else gesture_name
+        gesture_dir = os.path.join(self.sequence_dir, folder_name)
+        os.makedirs(gesture_dir, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+        session_file = os.path.join(gesture_dir, f"sequences_{timestamp}.json")
+        title = f"{gesture_name} {'(双手)' if is_two_hands else '(单手)'}"
+        
+        print(f"准备录制 {title} 动态手势，共 {repetitions} 遍，每遍 {duration:.1f} 秒")
+        print(f"数据将保存到: {session_file}")
+        print("每次按空格键开始录制一遍动作，ESC 键结束")
+        
+        cap = open_source(source)
+        writer = SessionWriter(session_file, {"gesture": gesture_name, "is_two_hands": is_two_hands},
+                               encode=self.encode_sequence)
+        recorded = 0
+        recording_start = None
+        
+        with self.mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=2,
+            min_detection_confidence=0.5) as hands:
+            
+            while recorded < repetitions:
+                success, image = cap.read()
+                if not success:
+                    if not cap.isOpened():
+                        break
+                    continue
+                now = time.perf_counter()
+                
+                image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+                results = hands.process(image_rgb)
+                hand_landmarks_list = self.select_hands(results, is_two_hands)
+                if hand_landmarks_list:
+                    for hand_landmarks in hand_landmarks_list:
+                        self.mp_drawing.draw_landmarks(
+                            image, hand_landmarks, self.mp_hands.HAND_CONNECTIONS)
+                
+                if recording_start is not None:
+                    if hand_landmarks_list:
+                        times.append(now - recording_start)
+                        frames.append([landmarks_to_array(hand_landmarks) for hand_landmarks in hand_landmarks_list])
+                    if now - recording_start >= duration:
+                        recording_start = None
+                        if len(frames) >= min_frames:
+                            writer.write((times, frames))
+                            recorded += 1
+                            print(f"第 {recorded}/{repetitions} 遍录制完成: {len(frames)} 帧")
+                        else:
+                            print(f"只检测到 {len(frames)} 帧，这一遍未保存，请重新录制")
+                    status = f"录制中: {title} {now - recording_start if recording_start else duration:.1f}s"
+                else:
+                    status = f"按空格键录制 {title}: {recorded}/{repetitions}"
+                cv2.putText(image, status, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+                cv2.imshow("动态手势录制", image)
+                
+                key = cv2.waitKey(1) & 0xFF
+                if key == 27:  # ESC键
+                    break
+                if key == 32 and recording_start is None:  # 空格键开始录制一遍
+                    recording_start = time.perf_counter()
+                    times, frames = [], []
+        
+        saved = writer.close()
+        if saved:
+            print(f"成功保存了 {saved} 遍 {title} 动作序列")
+        else:
+            os.remove(session_file)
+        cap.release()
+        cv2.destroyAllWindows()
+    
     def count_gesture_samples(self, gesture_dir):
         """计算某个手势目录下的总样本数"""
         total_samples = 0
@@ -0,0 +1,142 @@
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+
+from gesture_trainer import GestureTrainer
+from utils.dataset import canonicalize, near_duplicates, rebalance, grouped_split
+
+# gesture_data 数据集工具: 统计会话内和跨会话的近重复样本、剔除后的类别分布，
+# 比较全部样本与剔除后样本的训练耗时和按会话划分的测试准确率，可把清理后的数据写入新目录。
+
+KINDS = (("single", 1, "单手"), ("two_hands", 2, "双手"))
+
+
+def _fit(X_train, y_train, X_test, y_test):
+    """训练与 GestureTrainer 相同配置的随机森林，返回 (训练耗时, 测试准确率)"""
+    model = RandomForestClassifier(n_estimators=100, random_state=42)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    elapsed = time.perf_counter() - start
+    return elapsed, model.score(X_test, y_test)
+
+
+def analyze(X, y, groups, hands, radius=0.05, balance_ratio=1.5, seed=0):
+    """
+    分析一组样本（单手或双手）
+
+    返回:
+        {"keep": 保留样本下标, "classes": {类别: 统计}, "training": 训练比较}
+    """
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    groups = np.asarray(groups)
+
+    start = time.perf_counter()
+    covered_by = near_duplicates(canonicalize(X, hands), radius, labels=y)
+    search_time = time.perf_counter() - start
+    duplicate = covered_by >= 0
+    same_session = np.zeros(len(y), dtype=bool)
+    same_session[duplicate] = groups[duplicate] == groups[covered_by[duplicate]]
+
+    deduplicated = np.flatnonzero(~duplicate)
+    keep = deduplicated[rebalance(y[deduplicated], balance_ratio, seed)] if balance_ratio else deduplicated
+
+    classes = {}
+    for label in np.unique(y):
+        members = y == label
+        classes[str(label)] = {
+            "sessions": len(set(groups[members])),
+            "samples": int(members.sum()),
+            "within_session": int((members & duplicate & same_session).sum()),
+            "across_sessions": int((members & duplicate & ~same_session).sum()),
+            "kept": int(members[keep].sum()),
+        }
+
+    # 训练比较: 测试集按会话划分且使用全部样本，训练集分别为全部样本和剔除后的样本
+    train, test = grouped_split(y, groups, seed=seed)
+    training = {}
+    if len(test) and len(np.unique(y[train])) > 1:
+        pruned_train = np.intersect1d(train, keep)
+        full_time, full_accuracy = _fit(X[train], y[train], X[test], y[test])
+        pruned_time, pruned_accuracy = _fit(X[pruned_train], y[pruned_train], X[test], y[test])
+        # 原来的随机划分，相邻帧同时出现在训练集和测试集
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        _, random_accuracy = _fit(X_train, y_train, X_test, y_test)
+        training = {
+            "train_samples": len(train), "pruned_train_samples": len(pruned_train), "test_samples": len(test),
+            "full_time": full_time, "pruned_time": pruned_time,
+            "full_accuracy": full_accuracy, "pruned_accuracy": pruned_accuracy,
+            "random_split_accuracy": random_accuracy,
+        }
+    return {"keep": keep, "classes": classes, "training": training, "search_time": search_time}
+
+
+def write_dataset(X, y, groups, hands, keep, output_dir):
+    """把保留的样本按原来的文件夹和会话文件名写入 output_dir，返回写入的会话数"""
+    X = np.asarray(X, dtype=np.float64)
+    y = np.asarray(y)
+    groups = np.asarray(groups)
+    sessions = {}
+    for i in keep:
+        sessions.setdefault(groups[i], []).append(i)
+
+    for session, indices in sessions.items():
+        gesture = str(y[indices[0]])
+        folder = f"{gesture}_TwoHands" if hands == 2 else gesture
+        os.makedirs(os.path.join(output_dir, folder), exist_ok=True)
+        samples = []
+        for i in indices:
+            points = X[i].reshape(hands, 21, 3).tolist()
+            hand_data = [[{"x": px, "y": py, "z": pz} for px, py, pz in hand] for hand in points]
+            samples.append({"hand1": hand_data[0], "hand2": hand_data[1] if hands == 2 else None,
+                            "is_two_hands": hands == 2})
+        with open(os.path.join(output_dir, folder, os.path.basename(session)), 'w') as f:
+            json.dump({"gesture": gesture, "is_two_hands": hands == 2, "samples": samples}, f)
+    return len(sessions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="gesture_data 近重复检测、类别平衡和按会话划分")
+    parser.add_argument("--data-dir", default="gesture_data", help="数据目录")
+    parser.add_argument("--radius", type=float, default=0.05,
+                        help="近重复阈值，每个关键点的均方根位移（单位为手掌大小）")
+    parser.add_argument("--balance", type=float, default=1.5, help="每类最多为最少类别的倍数，0 表示不平衡")
+    parser.add_argument("--output", help="把剔除后的数据写入该目录")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    trainer = GestureTrainer(data_dir=args.data_dir, plot=False)
+    samples = trainer.read_samples()
+    if samples is None:
+        return 1
+
+    for kind, hands, title in KINDS:
+        X, y, groups = samples[kind]
+        if not X:
+            continue
+        result = analyze(X, y, groups, hands, args.radius, args.balance or None, args.seed)
+        print(f"\n{title}手势: {len(X)} 个样本, 近重复搜索 {result['search_time'] * 1000:.1f} ms")
+        print(f"{'手势':<10}{'会话':>6}{'样本':>8}{'会话内重复':>12}{'跨会话重复':>12}{'保留':>8}")
+        for label, stats in result["classes"].items():
+            print(f"{label:<10}{stats['sessions']:>6}{stats['samples']:>8}{stats['within_session']:>12}"
+                  f"{stats['across_sessions']:>12}{stats['kept']:>8}")
+        training = result["training"]
+        if training:
+            print(f"训练集 {training['train_samples']} -> {training['pruned_train_samples']} 个样本, "
+                  f"训练耗时 {training['full_time']:.2f} s -> {training['pruned_time']:.2f} s "
+                  f"({(1 - training['pruned_time'] / training['full_time']) * 100:.0f}% 减少)")
+            print(f"按会话划分的测试准确率 {training['full_accuracy']:.3f} -> {training['pruned_accuracy']:.3f} "
+                  f"(测试集 {training['test_samples']} 个样本; 随机划分时为 {training['random_split_accuracy']:.3f})")
+        if args.output:
+            count = write_dataset(X, y, groups, hands, result["keep"], args.output)
+            print(f"已写入 {count} 个会话到 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,9 @@
 import time
 
+from utils.log import get_logger, log_event
+
+log = get_logger("stabilizer")
+
 class GestureStabilizer:
     """手势稳定器，用于平滑手势识别结果"""
     
@@ -16,17 +20,23 @@ class GestureStabilizer:
         self.gesture_history = []         # 历史记录 [(timestamp, gesture), ...]
         self.current_stable_gesture = "Unknown"  # 当前稳定的手势
     
-    def add_gesture(self, gesture):
+    def reset(self):
+        """清除历史记录"""
+        self.gesture_history = []
+        self.current_stable_gesture = "Unknown"
+    
+    def add_gesture(self, gesture, timestamp=None):
         """
         添加一个新识别的手势
         
         参数:
             gesture: 识别到的手势类型字符串
+            timestamp: 识别时间(秒)，默认为当前时间，回放录制数据时传入录制时间
         
         返回:
             当前稳定的手势类型
         """
-        current_time = time.time()
+        current_time = time.time() if timestamp is None else timestamp
         
         # 添加新手势到历史
         self.gesture_history.append((current_time, gesture))
@@ -51,7 +61,8 @@ class GestureStabilizer:
             if count / total_count >= self.threshold:
                 # 如果检测到新的稳定手势
                 if g != self.current_stable_gesture:
-                    print(f"手势稳定为: {g} ({count}/{total_count})")
+                    log_event(log, "stabilizer.stable", "手势稳定为: %(gesture)s (%(count)d/%(total)d)",
+                              gesture=g, count=count, total=total_count)
                     self.current_stable_gesture = g
                 return self.current_stable_gesture
         
@@ -4,22 +4,58 @@ import numpy as np
 from sklearn.model_selection import train_test_split
 from sklearn.ensemble import RandomForestClassifier
 import pickle
-import matplotlib.pyplot as plt
-from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
+
+from utils.dataset import canonicalize, near_duplicates, rebalance, grouped_split
+from utils.augmentation import LandmarkAugmenter
+from recognizers.cascade_recognizer import FingerStateCascade, hand_codes, IMAGE_SIZE
 
 class GestureTrainer:
-    def __init__(self, data_dir="gesture_data", model_file="gesture_model.pkl"):
+    def __init__(self, data_dir="gesture_data", model_file="gesture_model.pkl", plot=True,
+                 dedup_radius=None, balance_ratio=None, split="random", augment_copies=0, augmenter=None,
+                 two_hands_augment_copies=0, two_hands_augmenter=None):
+        """
+        参数:
+            plot: 是否保存混淆矩阵图片；关闭时不导入 matplotlib
+            dedup_radius: 训练前剔除近重复样本的距离阈值（见 utils.dataset.near_duplicates），None 表示不剔除
+            balance_ratio: 每类样本数不超过最少类别的多少倍，None 表示不平衡
+            split: "random" 随机划分测试集；"session" 按会话划分，避免同一会话的相似帧同时出现在训练集和测试集
+            augment_copies: 划分后为单手训练集每个样本生成的增强样本数，0 表示不增强（测试集始终为原始样本）
+            augmenter: 单手样本的 utils.augmentation.LandmarkAugmenter，None 时使用默认参数
+            two_hands_augment_copies: 双手训练集的增强样本数，默认不增强。
+                                      按会话划分时，默认参数增强 5 份使双手准确率从 0.85 降到 0.72
+                                      （镜像交换双手、倾斜和遮挡改变了双手的相对位置），
+                                      下面的温和参数增强 1-2 份与不增强相当（0.83-0.85，测试集较小），更多份数仍会下降
+            two_hands_augmenter: 双手样本的增强器，None 时不镜像、倾斜 3 度、旋转 5 度、不模拟遮挡
+        """
         self.data_dir = data_dir
         self.model_file = model_file
+        self.plot = plot
+        self.dedup_radius = dedup_radius
+        self.balance_ratio = balance_ratio
+        self.split = split
+        self.augment_copies = augment_copies
+        self.augmenter = augmenter or LandmarkAugmenter()
+        self.two_hands_augment_copies = two_hands_augment_copies
+        self.two_hands_augmenter = two_hands_augmenter or LandmarkAugmenter(rotation=5.0, tilt=3.0, mirror=0.0,
+                                                                            occlusion=0.0)
         self.model = None
+        self.cascades = {}  # 级联识别第一级的查找表，"single" / "two_hands"
         self.hand_type_dict = {}  # 存储每个手势是单手还是双手
         
-    def load_data(self):
-        """从每个手势的文件夹加载所有样本"""
+    def read_samples(self):
+        """
+        从每个手势的文件夹读取所有样本
+        
+        返回:
+            {"single": (X, y, groups), "two_hands": (X, y, groups)}，groups 为每个样本所属的会话文件；
+            没有找到手势文件夹时返回 None
+        """
         X_single = []  # 单手特征
         X_double = []  # 双手特征
         y_single = []  # 单手标签
         y_double = []  # 双手标签
+        g_single = []  # 单手样本所属会话
+        g_double = []  # 双手样本所属会话
         
         # 获取所有手势文件夹
         gesture_folders = [d for d in os.listdir(self.data_dir) 
@@ -27,7 +63,7 @@ class GestureTrainer:
         
         if not gesture_folders:
             print(f"错误：在 {self.data_dir} 中没有找到手势文件夹!")
-            return np.array([]), np.array([])
+            return None
         
         print(f"发现以下手势类型: {gesture_folders}")
         
@@ -77,6 +113,7 @@ class GestureTrainer:
                             
                             X_double.append(features)
                             y_double.append(gesture_name)
+                            g_double.append(file_path)
                         else:
                             # 单手特征
                             features = []
@@ -85,24 +122,74 @@ class GestureTrainer:
                             
                             X_single.append(features)
                             y_single.append(gesture_name)
+                            g_single.append(file_path)
                 except Exception as e:
                     print(f"处理文件 {file_path} 时出错: {e}")
             
             print(f"  - 已加载 {gesture_name} {'(双手)' if is_two_hands else '(单手)'} 手势的 {gesture_samples_count} 个样本")
         
+        print(f"单手手势样本: {len(X_single)}，双手手势样本: {len(X_double)}")
+        return {"single": (X_single, y_single, g_single), "two_hands": (X_double, y_double, g_double)}
+    
+    def load_data(self):
+        """从每个手势的文件夹加载所有样本并训练"""
+        samples = self.read_samples()
+        if samples is None:
+            return False
+        
         # 保存手势类型信息
         with open(self.model_file.replace('.pkl', '_hand_types.json'), 'w') as f:
             json.dump(self.hand_type_dict, f)
-            
-        print(f"单手手势样本: {len(X_single)}，双手手势样本: {len(X_double)}")
         
         # 分别训练单手和双手手势模型
-        self.train_single_hand_model(X_single, y_single)
-        self.train_two_hands_model(X_double, y_double)
+        self.train_single_hand_model(*samples["single"])
+        self.train_two_hands_model(*samples["two_hands"])
+        
+        # 保存级联识别的手指状态查找表
+        with open(self.model_file.replace('.pkl', '_cascade.json'), 'w') as f:
+            json.dump({kind: cascade.to_dict() for kind, cascade in self.cascades.items()}, f)
         
         return True
     
-    def train_single_hand_model(self, X, y):
+    def split_data(self, X, y, groups=None, hands=1):
+        """
+        按设置剔除近重复样本、平衡类别、划分训练集和测试集，并增强训练集
+        
+        返回:
+            X_train, X_test, y_train, y_test
+        """
+        X = np.asarray(X, dtype=np.float64)
+        y = np.asarray(y)
+        groups = np.asarray(groups) if groups is not None else None
+        
+        if self.dedup_radius:
+            keep = near_duplicates(canonicalize(X, hands), self.dedup_radius, labels=y) < 0
+            print(f"剔除近重复样本 {int((~keep).sum())} 个，保留 {int(keep.sum())} 个")
+            X, y = X[keep], y[keep]
+            groups = groups[keep] if groups is not None else None
+        
+        if self.balance_ratio:
+            keep = rebalance(y, self.balance_ratio)
+            X, y = X[keep], y[keep]
+            groups = groups[keep] if groups is not None else None
+        
+        if self.split == "session" and groups is not None:
+            train, test = grouped_split(y, groups, test_size=0.2)
+            X_train, X_test, y_train, y_test = X[train], X[test], y[train], y[test]
+        else:
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+        
+        copies, augmenter = (self.augment_copies, self.augmenter) if hands == 1 else \
+            (self.two_hands_augment_copies, self.two_hands_augmenter)
+        if copies:
+            # 原始样本之后附加增强样本，第 k 份增强的标签与原始顺序相同
+            augmented = augmenter.augment(X_train.reshape(len(X_train), hands, 21, 3), copies)
+            print(f"训练集增强 {len(X_train)} -> {len(X_train) + len(augmented)} 个样本")
+            X_train = np.concatenate([X_train, augmented.reshape(len(augmented), -1)])
+            y_train = np.concatenate([y_train, np.tile(y_train, copies)])
+        return X_train, X_test, y_train, y_test
+    
+    def train_single_hand_model(self, X, y, groups=None):
         """训练单手手势识别模型"""
         if len(X) == 0:
             print("错误：没有找到单手手势训练数据!")
@@ -111,8 +198,7 @@ class GestureTrainer:
         print(f"训练单手手势模型：{len(X)} 个样本，{len(set(y))} 种不同的手势")
         
         # 划分训练集和测试集
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42)
+        X_train, X_test, y_train, y_test = self.split_data(X, y, groups, hands=1)
         
         # 训练模型
         print("训练单手手势模型中...")
@@ -122,16 +208,12 @@ class GestureTrainer:
         # 评估模型
         score = self.single_hand_model.score(X_test, y_test)
         print(f"单手模型准确率: {score:.2f}")
+        self.cascades["single"] = self.fit_cascade(self.single_hand_model, X_train, y_train, X_test, y_test, 1)
         
         # 显示混淆矩阵
-        y_pred = self.single_hand_model.predict(X_test)
-        cm = confusion_matrix(y_test, y_pred, labels=self.single_hand_model.classes_)
-        disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=self.single_hand_model.classes_)
-        disp.plot(xticks_rotation=45)
-        plt.title("单手手势识别混淆矩阵")
-        plt.tight_layout()
-        plt.savefig("single_hand_confusion_matrix.png")
-        plt.close()
+        if self.plot:
+            self.save_confusion_matrix(self.single_hand_model, X_test, y_test,
+                                       "单手手势识别混淆矩阵", "single_hand_confusion_matrix.png")
         
         # 保存模型
         with open(self.model_file.replace('.pkl', '_single_hand.pkl'), 'wb') as f:
@@ -140,7 +222,7 @@ class GestureTrainer:
         print(f"单手模型已保存")
         return True
         
-    def train_two_hands_model(self, X, y):
+    def train_two_hands_model(self, X, y, groups=None):
         """训练双手手势识别模型"""
         if len(X) == 0:
             print("错误：没有找到双手手势训练数据!")
@@ -149,8 +231,7 @@ class GestureTrainer:
         print(f"训练双手手势模型：{len(X)} 个样本，{len(set(y))} 种不同的手势")
         
         # 划分训练集和测试集
-        X_train, X_test, y_train, y_test = train_test_split(
-            X, y, test_size=0.2, random_state=42)
+        X_train, X_test, y_train, y_test = self.split_data(X, y, groups, hands=2)
         
         # 训练模型
         print("训练双手手势模型中...")
@@ -160,16 +241,12 @@ class GestureTrainer:
         # 评估模型
         score = self.two_hands_model.score(X_test, y_test)
         print(f"双手模型准确率: {score:.2f}")
+        self.cascades["two_hands"] = self.fit_cascade(self.two_hands_model, X_train, y_train, X_test, y_test, 2)
         
         # 显示混淆矩阵
-        y_pred = self.two_hands_model.predict(X_test)
-        cm = confusion_matrix(y_test, y_pred, labels=self.two_hands_model.classes_)
-        disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=self.two_hands_model.classes_)
-        disp.plot(xticks_rotation=45)
-        plt.title("双手手势识别混淆矩阵")
-        plt.tight_layout()
-        plt.savefig("two_hands_confusion_matrix.png")
-        plt.close()
+        if self.plot:
+            self.save_confusion_matrix(self.two_hands_model, X_test, y_test,
+                                       "双手手势识别混淆矩阵", "two_hands_confusion_matrix.png")
         
         # 保存模型
         with open(self.model_file.replace('.pkl', '_two_hands.pkl'), 'wb') as f:
@@ -178,6 +255,39 @@ class GestureTrainer:
         print(f"双手模型已保存")
         return True
     
+    @staticmethod
+    def fit_cascade(model, X_train, y_train, X_test, y_test, hands):
+        """
+        在训练集上统计手指状态查找表（见 recognizers.cascade_recognizer），并在测试集上
+        报告直接接受和拒识的比例（这些帧不调用随机森林）以及级联后的准确率
+        """
+        cascade = FingerStateCascade.fit(X_train, y_train, hands)
+        if len(X_test):
+            points = np.asarray(X_test, dtype=np.float64).reshape(len(X_test), hands, 21, 3)[..., :2] * IMAGE_SIZE
+            decisions = [cascade.decide(code) for code in hand_codes(points)]
+            forest = model.predict(X_test)
+            combined = np.array([d if d is not None else f for d, f in zip(decisions, forest)])
+            skipped = sum(d is not None for d in decisions)
+            print(f"级联第一级: {len(cascade.accept)} 种手指状态直接接受，测试集 {skipped / len(X_test):.0%} 的帧"
+                  f"不调用随机森林（拒识 {sum(d == 'Unknown' for d in decisions)} 帧），"
+                  f"准确率 {np.mean(forest == y_test):.2f} -> {np.mean(combined == y_test):.2f}")
+        return cascade
+    
+    @staticmethod
+    def save_confusion_matrix(model, X_test, y_test, title, path):
+        """在测试集上计算混淆矩阵并保存为图片（matplotlib 只在这里导入）"""
+        import matplotlib.pyplot as plt
+        from sklearn.metrics import confusion_matrix, ConfusionMatrixDisplay
+        
+        y_pred = model.predict(X_test)
+        cm = confusion_matrix(y_test, y_pred, labels=model.classes_)
+        disp = ConfusionMatrixDisplay(confusion_matrix=cm, display_labels=model.classes_)
+        disp.plot(xticks_rotation=45)
+        plt.title(title)
+        plt.tight_layout()
+        plt.savefig(path)
+        plt.close()
+    
     def train_model(self):
         """训练手势识别模型"""
         print("加载训练数据...")
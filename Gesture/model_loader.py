@@ -2,6 +2,8 @@ import os
 import pickle
 import json
 
+from recognizers.cascade_recognizer import FingerStateCascade
+
 class ModelLoader:
     """模型加载器，负责加载和管理手势识别模型"""
     
@@ -9,6 +11,7 @@ class ModelLoader:
         self.single_hand_model = None
         self.two_hands_model = None
         self.hand_type_dict = {}
+        self.cascades = {}  # 级联识别的手指状态查找表，"single" / "two_hands"
     
     def load_gesture_models(self):
         """加载双模型系统"""
@@ -46,6 +49,15 @@ class ModelLoader:
                 print(f"手势类型文件不存在: {hand_types_path}")
                 self.hand_type_dict = {}
             
+            # 加载级联识别的手指状态查找表（可选，没有时每帧都调用随机森林）
+            cascade_path = os.path.join(current_dir, "gesture_model_cascade.json")
+            if os.path.exists(cascade_path):
+                with open(cascade_path, 'r') as f:
+                    self.cascades = {kind: FingerStateCascade.from_dict(data) for kind, data in json.load(f).items()}
+                print("成功加载级联查找表")
+            else:
+                self.cascades = {}
+            
             # 显示加载结果
             if self.single_hand_model:
                 print(f"单手手势: {self.single_hand_model.classes_}")
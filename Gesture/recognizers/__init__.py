@@ -1,6 +1,10 @@
 from .single_hand_recognizer import SingleHandRecognizer
 from .two_hands_recognizer import TwoHandsRecognizer
 from .rule_based_recognizer import RuleBasedRecognizer
+from .prototype_recognizer import PrototypeRecognizer
+from .dynamic_recognizer import DynamicGestureRecognizer
+from .cascade_recognizer import CascadeRecognizer, FingerStateCascade
 
 # 便于一次导入所有识别器
-__all__ = ['SingleHandRecognizer', 'TwoHandsRecognizer', 'RuleBasedRecognizer']
\ No newline at end of file
+__all__ = ['SingleHandRecognizer', 'TwoHandsRecognizer', 'RuleBasedRecognizer', 'PrototypeRecognizer', 'DynamicGestureRecognizer',
+           'CascadeRecognizer', 'FingerStateCascade']
\ No newline at end of file
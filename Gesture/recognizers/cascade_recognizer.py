@@ -0,0 +1,140 @@
+import numpy as np
+
+from utils.log import get_logger, log_event
+from utils.profiler import span
+
+log = get_logger("recognizer")
+
+# 级联识别的第一级: 每只手的手指伸展位掩码和拇指-食指捏合位，按比例计算，与图像分辨率无关。
+# 训练时统计每种位掩码组合对应的手势: 样本足够多且几乎只属于一个手势的组合直接接受，
+# 与训练中出现过的所有组合都相差两位以上的组合直接拒识为 Unknown，其余（有歧义的）帧才交给随机森林。
+
+WRIST = 0
+MIDDLE_MCP = 9
+PINKY_MCP = 17
+FINGER_TIPS = [4, 8, 12, 16, 20]
+FINGER_JOINTS = [3, 6, 10, 14, 18]   # 拇指为指间关节，其余手指为近端指间关节
+FINGER_REFERENCES = [PINKY_MCP, WRIST, WRIST, WRIST, WRIST]
+BITS_PER_HAND = 6
+FINGER_WEIGHTS = 1 << np.arange(5)
+PINCH_WEIGHT = 1 << 5
+IMAGE_SIZE = np.array([640, 480], dtype=np.float64)   # 训练数据的归一化坐标乘以图像尺寸换算为像素
+
+
+def hand_codes(points, extension_ratio=1.1, pinch_ratio=0.35):
+    """
+    批量计算手指状态编码
+
+    参数:
+        points: (N, hands, 21, 2 或 3) 像素坐标（x, y 同一比例），只使用 x, y
+        extension_ratio: 指尖到参考点的距离超过关节到参考点距离的该倍数时视为伸展
+                         （参考点: 拇指为小指根部，其余手指为手腕）
+        pinch_ratio: 拇指尖与食指尖的距离小于手掌大小（手腕到中指根部）的该倍数时视为捏合
+
+    返回:
+        (N,) 整数编码，每只手 6 位: 低 5 位为拇指到小指的伸展状态，第 6 位为捏合
+    """
+    p = np.asarray(points, dtype=np.float64)[..., :2]
+    # 比较平方距离，避免开方
+    tip = p[..., FINGER_TIPS, :] - p[..., FINGER_REFERENCES, :]
+    joint = p[..., FINGER_JOINTS, :] - p[..., FINGER_REFERENCES, :]
+    extended = np.einsum('...i,...i->...', tip, tip) > extension_ratio ** 2 * np.einsum('...i,...i->...', joint, joint)
+    palm = p[..., MIDDLE_MCP, :] - p[..., WRIST, :]
+    gap = p[..., 4, :] - p[..., 8, :]
+    pinch = np.einsum('...i,...i->...', gap, gap) < pinch_ratio ** 2 * np.einsum('...i,...i->...', palm, palm)
+    per_hand = extended @ FINGER_WEIGHTS + pinch * PINCH_WEIGHT
+    return per_hand @ (1 << (BITS_PER_HAND * np.arange(p.shape[1])))
+
+
+class FingerStateCascade:
+    """手指状态编码到手势的查找表"""
+
+    def __init__(self, accept=None, known=None, hands=1):
+        """
+        参数:
+            accept: {编码: 手势}，直接接受的编码
+            known: 训练中出现过的全部编码，与它们都相差两位以上的编码拒识；None 表示不拒识
+            hands: 每个样本的手数
+        """
+        self.accept = dict(accept or {})
+        self.known = None if known is None else set(known)
+        self.hands = hands
+        # 允许一位之差（单个手指的状态判断在边界上抖动），预先展开便于逐帧查表
+        self._near = None if known is None else {
+            code ^ (1 << bit) for code in self.known for bit in range(BITS_PER_HAND * hands)} | self.known
+
+    @classmethod
+    def fit(cls, X, y, hands=1, min_support=20, min_purity=0.98):
+        """
+        从训练样本统计查找表
+
+        参数:
+            X: (N, hands*63) 训练特征（归一化坐标）
+            y: 标签
+            min_support: 直接接受的编码至少需要的样本数
+            min_purity: 直接接受的编码中最多的手势至少占的比例
+        """
+        points = np.asarray(X, dtype=np.float64).reshape(len(X), hands, 21, 3)[..., :2] * IMAGE_SIZE
+        codes = hand_codes(points)
+        y = np.asarray(y)
+        accept = {}
+        for code in np.unique(codes):
+            labels, counts = np.unique(y[codes == code], return_counts=True)
+            if counts.sum() >= min_support and counts.max() >= min_purity * counts.sum():
+                accept[int(code)] = str(labels[np.argmax(counts)])
+        return cls(accept, codes.tolist(), hands)
+
+    def decide(self, code):
+        """
+        返回:
+            手势名（直接接受）、"Unknown"（拒识）或 None（有歧义，交给模型）
+        """
+        code = int(code)
+        if code in self.accept:
+            return self.accept[code]
+        if self._near is not None and code not in self._near:
+            return "Unknown"
+        return None
+
+    def to_dict(self):
+        return {"hands": self.hands, "accept": {str(k): v for k, v in self.accept.items()},
+                "known": None if self.known is None else sorted(self.known)}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({int(k): v for k, v in data["accept"].items()}, data["known"], data["hands"])
+
+
+class CascadeRecognizer:
+    """在单手或双手识别器之前运行 FingerStateCascade，只有歧义帧调用模型"""
+
+    def __init__(self, recognizer, cascade=None):
+        """
+        参数:
+            recognizer: SingleHandRecognizer 或 TwoHandsRecognizer
+            cascade: FingerStateCascade，None 时每帧都调用 recognizer
+        """
+        self.recognizer = recognizer
+        self.cascade = cascade
+        self.accepted = 0
+        self.rejected = 0
+        self.forwarded = 0
+
+    def reset_stats(self):
+        self.accepted = self.rejected = self.forwarded = 0
+
+    def recognize(self, *landmarks):
+        """参数与 recognizer.recognize 相同（每只手 21 个像素坐标）"""
+        if self.cascade is not None and all(len(hand) >= 21 for hand in landmarks):
+            with span("cascade"):
+                decision = self.cascade.decide(hand_codes(np.asarray(landmarks, dtype=np.float64)[np.newaxis])[0])
+            if decision == "Unknown":
+                self.rejected += 1
+                log_event(log, "cascade.rejected", "手指状态不属于任何手势")
+                return decision
+            if decision is not None:
+                self.accepted += 1
+                log_event(log, "cascade.accepted", "手指状态直接识别为: %(gesture)s", gesture=decision)
+                return decision
+        self.forwarded += 1
+        return self.recognizer.recognize(*landmarks)
@@ -0,0 +1,236 @@
+import numpy as np
+
+from recognizers.prototype_recognizer import PrototypeRecognizer
+from utils.landmark_stream import load_sequence_data
+from utils.log import get_logger, log_event
+from utils.profiler import span
+
+log = get_logger("recognizer")
+
+
+class _TemplateBank:
+    """
+    同一手数的全部模板，逐帧做流式子序列 DTW
+
+    所有模板的帧拼接成一个 (M, D) 数组，DTW 的一列状态也是长度 M 的数组。每一帧的转移只依赖上一列:
+    停留在同一模板帧（动作比模板慢）、前进一帧、跳过一帧（动作比模板快，最快两倍），
+    模板第一帧随时可以重新开始，所以不需要保存滑动窗口，每帧的计算量只取决于模板总帧数。
+    """
+
+    def __init__(self):
+        self.names = []
+        self.durations = []
+        self.frames = []
+
+    def add(self, name, embeddings, duration):
+        self.names.append(name)
+        self.durations.append(duration)
+        self.frames.append(np.asarray(embeddings, dtype=np.float32))
+        self._build()
+
+    def _build(self):
+        self.vectors = np.concatenate(self.frames)
+        self.norms = np.einsum('ij,ij->i', self.vectors, self.vectors)
+        lengths = np.array([len(f) for f in self.frames])
+        starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+        total = int(lengths.sum())
+        self.row_template = np.repeat(np.arange(len(self.frames)), lengths)
+        offset = np.arange(total) - starts[self.row_template]
+        self.ends = starts + lengths - 1
+        self.duration_array = np.array(self.durations)
+        # 每一行的三个前驱: 停留、前进一帧、跳过一帧；total 为代价无穷大的哨兵，total+1 为代价为 0 的起点
+        rows = np.arange(total)
+        self.sources = np.stack([
+            np.where(offset == 0, total + 1, rows),
+            np.where(offset == 0, total + 1, rows - 1),
+            np.where(offset < 2, total, rows - 2),
+        ])
+        # 每个模板各维度的取值范围，帧到范围的距离是到该模板任一帧距离的下界
+        self.low = np.stack([f.min(axis=0) for f in self.frames])
+        self.high = np.stack([f.max(axis=0) for f in self.frames])
+        self.scale = 1.0 / (self.vectors.shape[1] / 3)
+
+    def new_state(self):
+        total = len(self.vectors)
+        cost = np.full(total + 2, np.inf)
+        cost[total + 1] = 0.0
+        length = np.ones(total + 2)
+        length[total + 1] = 0
+        return {"cost": cost, "length": length, "start": np.zeros(total + 2), "pending": None}
+
+    def step(self, state, x, timestamp, threshold, max_frame_distance, duration_range, max_delay):
+        """
+        输入一帧，更新 DTW 状态
+
+        返回:
+            (模板下标, 平均代价)，没有满足条件的匹配时为 None
+        """
+        total = len(self.vectors)
+        # 下界剪枝: 帧离模板的取值范围太远时，该模板所有帧的距离都超过上限，不必计算
+        gap = np.maximum(self.low - x, 0) + np.maximum(x - self.high, 0)
+        active = np.einsum('ij,ij->i', gap, gap) * self.scale <= max_frame_distance ** 2
+        distance = np.full(total, np.inf)
+        if active.all():
+            rows = slice(None)
+        else:
+            rows = np.flatnonzero(active[self.row_template])
+        squared = (self.norms[rows] - 2 * (self.vectors[rows] @ x) + x @ x) * self.scale
+        distance[rows] = np.sqrt(np.maximum(squared, 0))
+        distance[distance > max_frame_distance] = np.inf
+
+        cost, length, start = state["cost"], state["length"], state["start"]
+        start[total + 1] = timestamp
+        stay, advance, skip = self.sources
+        best = cost[stay]
+        source = stay
+        for candidate in (advance, skip):
+            value = cost[candidate]
+            better = value < best
+            source = np.where(better, candidate, source)
+            best = np.where(better, value, best)
+        cost[:total] = best + distance
+        length[:total] = length[source] + 1
+        start[:total] = start[source]
+
+        # 到达模板最后一帧: 按对齐的帧数取平均代价，并检查动作时长
+        ends = self.ends
+        average = cost[ends] / length[ends]
+        elapsed = timestamp - start[ends]
+        matched = (average <= threshold) & (elapsed >= duration_range[0] * self.duration_array) \
+            & (elapsed <= duration_range[1] * self.duration_array)
+        best = int(np.argmin(np.where(matched, average, np.inf))) if matched.any() else None
+        pending = state["pending"]
+        if best is not None and (pending is None or average[best] < pending[1]):
+            pending = state["pending"] = (best, float(average[best]), timestamp)
+        if pending is None:
+            return None
+        # 与候选重叠（在候选结束前开始）的路径平均代价更低时，它完成后可能是更好的匹配，
+        # 继续等待（最多 max_delay 秒），避免在动作完成前报告一个较差的对齐
+        overlapping = start[:total] <= pending[2]
+        if timestamp - pending[2] < max_delay and np.any(cost[:total][overlapping] < pending[1] * length[:total][overlapping]):
+            return None
+        # 报告后清空状态，同一次动作不重复报告
+        cost[:total] = np.inf
+        state["pending"] = None
+        return pending[:2]
+
+
+class DynamicGestureRecognizer:
+    """
+    动态手势识别器: 用流式 DTW 把关键点序列与录制的动作模板匹配
+
+    单手模板对每只手（按跟踪ID）分别匹配，双手模板对两只手一起匹配（按手腕横坐标排序）。
+    特征与原型识别器相同（规范化的 x, y 坐标），模板按 template_fps 重采样，
+    所以每帧耗时与帧率和已处理的帧数无关，只取决于模板总帧数。
+    """
+
+    def __init__(self, threshold=0.35, max_frame_distance=0.8, template_fps=15.0, duration_range=(0.5, 2.0),
+                 max_delay=0.5):
+        """
+        参数:
+            threshold: 匹配的平均代价上限（每个对齐帧的均方根关键点位移，单位为手掌大小）
+            max_frame_distance: 单帧距离上限，超过时该帧不能与模板帧对齐
+            template_fps: 模板的重采样帧率
+            duration_range: 动作时长相对模板时长的允许范围
+            max_delay: 找到匹配后等待可能更好的重叠匹配的最长时间(秒)
+        """
+        self.threshold = threshold
+        self.max_frame_distance = max_frame_distance
+        self.template_fps = template_fps
+        self.duration_range = duration_range
+        self.max_delay = max_delay
+        self._banks = {}    # 手数 -> _TemplateBank
+        self._states = {}   # (手数, 手的键) -> DTW 状态
+
+    def template_count(self):
+        return sum(len(bank.names) for bank in self._banks.values())
+
+    def add_template(self, name, timestamps, points, hands=1):
+        """
+        添加一个动作模板
+
+        参数:
+            timestamps: (T,) 每帧时间(秒)
+            points: (T, hands, 21, 2 或 3) 归一化坐标
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        points = np.asarray(points, dtype=np.float64)
+        if hands == 2:
+            points = self._order_pair(points)
+        # 按固定帧率取最接近的帧
+        times = np.arange(timestamps[0], timestamps[-1] + 1e-9, 1.0 / self.template_fps)
+        index = np.minimum(np.searchsorted(timestamps, times), len(timestamps) - 1)
+        embeddings = PrototypeRecognizer.embed(points[index], hands)
+        self._banks.setdefault(hands, _TemplateBank()).add(name, embeddings, timestamps[-1] - timestamps[0])
+        self._states = {key: state for key, state in self._states.items() if key[0] != hands}
+
+    def load(self, base_dir="gesture_sequences", min_frames=5):
+        """从 GestureDataCollector.collect_sequence_data 录制的目录加载模板，返回加载的模板数"""
+        count = 0
+        for sequence in load_sequence_data(base_dir):
+            if len(sequence["timestamps"]) < min_frames:
+                continue
+            self.add_template(sequence["gesture"], sequence["timestamps"], sequence["points"],
+                              2 if sequence["is_two_hands"] else 1)
+            count += 1
+        if count:
+            log_event(log, "dynamic.loaded", "已加载 %(count)d 个动态手势模板", count=count)
+        return count
+
+    def reset(self):
+        self._states = {}
+
+    @staticmethod
+    def _order_pair(points):
+        """双手按手腕横坐标排序，points: (..., 2, 21, C)"""
+        swap = points[..., 1, 0, 0] < points[..., 0, 0, 0]
+        return np.where(swap[..., np.newaxis, np.newaxis, np.newaxis], points[..., ::-1, :, :], points)
+
+    def _step(self, hands, key, points, timestamp):
+        bank = self._banks.get(hands)
+        if bank is None:
+            return None
+        state = self._states.get((hands, key))
+        if state is None:
+            state = self._states[(hands, key)] = bank.new_state()
+        embedding = PrototypeRecognizer.embed(points[np.newaxis], hands)[0]
+        match = bank.step(state, embedding, timestamp, self.threshold, self.max_frame_distance,
+                          self.duration_range, self.max_delay)
+        if match is None:
+            return None
+        template, cost = match
+        log_event(log, "dynamic.recognized", "识别到动态手势: %(gesture)s (代价: %(cost).3f)",
+                  gesture=bank.names[template], cost=cost)
+        return bank.names[template]
+
+    def update(self, hands, timestamp):
+        """
+        输入一帧
+
+        参数:
+            hands: [(手的键, (21, 2 或 3) 归一化坐标), ...]，键为跨帧稳定的手部ID
+            timestamp: 帧时间(秒)
+
+        返回:
+            本帧完成的动态手势名列表
+        """
+        if not self._banks:
+            return []
+        detected = []
+        present = set()
+        with span("dynamic"):
+            for key, points in hands:
+                present.add((1, key))
+                gesture = self._step(1, key, np.asarray(points, dtype=np.float64)[np.newaxis], timestamp)
+                if gesture:
+                    detected.append(gesture)
+            if len(hands) == 2:
+                present.add((2, None))
+                pair = self._order_pair(np.asarray([points for _, points in hands], dtype=np.float64))
+                gesture = self._step(2, None, pair, timestamp)
+                if gesture:
+                    detected.append(gesture)
+        # 消失的手不再延续之前的匹配
+        for key in [key for key in self._states if key not in present]:
+            del self._states[key]
+        return detected
@@ -0,0 +1,259 @@
+import logging
+import os
+
+import numpy as np
+
+from utils.dataset import canonicalize, near_duplicates
+from utils.log import get_logger, log_event
+from utils.novelty_sampler import NoveltySampler
+from utils.profiler import span
+
+log = get_logger("recognizer")
+
+IMAGE_SIZE = np.array([640, 480], dtype=np.float64)  # 与 SingleHandRecognizer.extract_features 的假设一致
+
+
+class PrototypeRecognizer:
+    """
+    原型（最近邻）手势识别器
+
+    每个手势保存若干规范化后的关键点向量（原型），单手和双手各用一个连续数组存放。
+    识别时一次矩阵乘法求出到全部原型的距离，取最近的原型，超过拒识半径则返回 Unknown。
+    新手势可以在运行中用几秒的实时样本录入，不需要重新训练随机森林或重启。
+    """
+
+    def __init__(self, radius=0.4, path=None, novelty_threshold=0.05):
+        """
+        参数:
+            radius: 拒识半径，按每个关键点的均方根位移计（单位为手掌大小，与 utils.dataset.near_duplicates 相同）
+            path: 原型文件（.npz），存在时加载，录入新手势后自动保存；None 表示只保存在内存中
+            novelty_threshold: 录入时只保留足够新颖的帧，见 utils.novelty_sampler.NoveltySampler
+        """
+        self.radius = radius
+        self.path = path
+        self.novelty_threshold = novelty_threshold
+        self._vectors = {}   # 手数 -> (容量, D) float32 数组，前 _counts[手数] 行有效
+        self._norms = {}     # 手数 -> 每个原型的平方范数
+        self._labels = {}    # 手数 -> 每个原型的手势名
+        self._counts = {}
+        self._pending = None
+        self._enrollment = None
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def embed(points, hands=1):
+        """
+        把关键点转换为原型向量
+
+        参数:
+            points: (N, hands*63) 训练特征或 (N, hands, 21, 2 或 3) 归一化坐标；z 坐标不使用
+                    （实时识别时没有 z，见 SingleHandRecognizer.extract_features）
+
+        返回:
+            (N, D) float32 数组，D 与 utils.dataset.canonicalize 相同
+        """
+        points = np.asarray(points, dtype=np.float64)
+        xyz = np.zeros((len(points), hands * 21, 3))
+        xyz[:, :, :2] = points.reshape(len(points), hands * 21, -1)[:, :, :2]
+        return canonicalize(xyz.reshape(len(points), -1), hands).astype(np.float32)
+
+    def count(self, hands=None):
+        """原型数量，hands 为 None 时为单手和双手的总数"""
+        if hands is None:
+            return sum(self._counts.values())
+        return self._counts.get(hands, 0)
+
+    def gestures(self, hands=None):
+        """已录入的手势名"""
+        names = set()
+        for h, labels in self._labels.items():
+            if hands is None or h == hands:
+                names.update(labels[:self._counts[h]].tolist())
+        return sorted(names)
+
+    def add(self, name, embeddings, hands=1):
+        """添加一个手势的原型向量（embed 的结果）"""
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        count = self._counts.get(hands, 0)
+        needed = count + len(embeddings)
+        vectors = self._vectors.get(hands)
+        if vectors is None or needed > len(vectors):
+            # 容量按两倍增长，追加原型的均摊开销为常数
+            capacity = max(needed, 2 * (0 if vectors is None else len(vectors)), 64)
+            grown = np.empty((capacity, embeddings.shape[1]), dtype=np.float32)
+            norms = np.empty(capacity, dtype=np.float32)
+            labels = np.empty(capacity, dtype=object)
+            if vectors is not None:
+                grown[:count] = vectors[:count]
+                norms[:count] = self._norms[hands][:count]
+                labels[:count] = self._labels[hands][:count]
+            self._vectors[hands], self._norms[hands], self._labels[hands] = grown, norms, labels
+        self._vectors[hands][count:needed] = embeddings
+        self._norms[hands][count:needed] = np.einsum('ij,ij->i', embeddings, embeddings)
+        self._labels[hands][count:needed] = name
+        self._counts[hands] = needed
+
+    def add_samples(self, X, y, hands=1, dedup_radius=0.05):
+        """
+        从训练样本（如 GestureTrainer.read_samples 的结果）添加原型，先剔除近重复样本使原型保持紧凑
+
+        返回:
+            添加的原型数
+        """
+        embeddings = self.embed(X, hands)
+        y = np.asarray(y)
+        keep = near_duplicates(embeddings, dedup_radius, labels=y) < 0 if dedup_radius else np.ones(len(y), bool)
+        for name in np.unique(y[keep]):
+            self.add(str(name), embeddings[keep & (y == name)], hands)
+        return int(keep.sum())
+
+    def remove(self, name):
+        """删除一个手势的全部原型"""
+        for hands in list(self._counts):
+            count = self._counts[hands]
+            keep = np.flatnonzero(self._labels[hands][:count] != name)
+            self._vectors[hands][:len(keep)] = self._vectors[hands][keep]
+            self._norms[hands][:len(keep)] = self._norms[hands][keep]
+            self._labels[hands][:len(keep)] = self._labels[hands][keep]
+            self._counts[hands] = len(keep)
+
+    def classify(self, embedding, hands=1):
+        """
+        最近原型
+
+        返回:
+            (手势名, 距离)，没有原型时为 (None, inf)
+        """
+        count = self._counts.get(hands, 0)
+        if count == 0:
+            return None, float("inf")
+        # |p - e|^2 = |p|^2 - 2 p·e + |e|^2，一次矩阵向量乘法得到全部距离
+        squared = self._norms[hands][:count] - 2 * (self._vectors[hands][:count] @ embedding)
+        nearest = int(np.argmin(squared))
+        distance = np.sqrt(max(float(squared[nearest] + embedding @ embedding), 0.0) / (len(embedding) / 3))
+        return self._labels[hands][nearest], distance
+
+    def recognize(self, *landmarks):
+        """
+        识别一只或两只手的手势
+
+        参数:
+            landmarks: 每只手 21 个像素坐标 (x, y)，双手时按稳定顺序传入两组
+
+        返回:
+            手势名，没有原型或最近原型超过拒识半径时返回 "Unknown"
+        """
+        hands = len(landmarks)
+        if self._counts.get(hands, 0) == 0:
+            return "Unknown"
+        with span("prototype"):
+            embedding = self.embed(np.asarray(landmarks, dtype=np.float64)[np.newaxis] / IMAGE_SIZE, hands)[0]
+            gesture, distance = self.classify(embedding, hands)
+        if distance > self.radius:
+            log_event(log, "prototype.rejected", "最近原型 %(gesture)s 距离过大 (%(distance).3f)",
+                      gesture=gesture, distance=distance)
+            return "Unknown"
+        log_event(log, "prototype.recognized", "原型匹配手势: %(gesture)s (距离: %(distance).3f)",
+                  gesture=gesture, distance=distance)
+        return gesture
+
+    def start_enrollment(self, name, duration=3.0):
+        """
+        开始录入新手势（可在其他线程中调用），从下一帧检测到手开始采集 duration 秒
+
+        录入时的手数（单手或双手）由第一帧决定；同名手势已存在时追加原型。
+
+        返回:
+            是否开始录入；已有录入在进行（或等待第一帧）时拒绝，避免丢弃已采集的样本
+        """
+        if self.enrolling is not None:
+            log_event(log, "prototype.enroll_busy", "正在录入手势 %(current)s，忽略录入 %(gesture)s 的请求",
+                      logging.WARNING, current=self.enrolling, gesture=name)
+            return False
+        self._pending = (name, duration)
+        return True
+
+    def next_name(self, prefix="Custom"):
+        """不与已录入或正在录入的手势重名的新名称: prefix1, prefix2, ..."""
+        taken = set(self.gestures())
+        taken.add(self.enrolling)
+        index = 1
+        while f"{prefix}{index}" in taken:
+            index += 1
+        return f"{prefix}{index}"
+
+    @property
+    def enrolling(self):
+        """正在录入的手势名，没有录入时为 None"""
+        if self._enrollment is not None:
+            return self._enrollment["name"]
+        return self._pending[0] if self._pending else None
+
+    def observe(self, landmarks, timestamp):
+        """
+        录入时每帧调用，采集新颖的帧，到时间后把采集的原型加入索引
+
+        参数:
+            landmarks: [每只手 21 个像素坐标, ...]
+            timestamp: 帧时间(秒)
+
+        返回:
+            本次录入完成时为 (手势名, 原型数)，否则为 None
+        """
+        if self._pending and landmarks:
+            name, duration = self._pending
+            self._pending = None
+            self._enrollment = {"name": name, "hands": len(landmarks), "end": timestamp + duration,
+                                "sampler": NoveltySampler(self.novelty_threshold), "samples": []}
+            log_event(log, "prototype.enroll_start", "开始录入手势 %(gesture)s (%(hands)d 只手, %(duration).1f 秒)",
+                      gesture=name, hands=len(landmarks), duration=duration)
+        enrollment = self._enrollment
+        if enrollment is None:
+            return None
+
+        if len(landmarks) == enrollment["hands"]:
+            points = np.asarray(landmarks, dtype=np.float64) / IMAGE_SIZE
+            if enrollment["sampler"].accept(np.concatenate([points, np.zeros(points.shape[:2] + (1,))], axis=2)):
+                enrollment["samples"].append(points)
+        if timestamp < enrollment["end"]:
+            return None
+
+        self._enrollment = None
+        name, hands, samples = enrollment["name"], enrollment["hands"], enrollment["samples"]
+        if samples:
+            self.add(name, self.embed(np.stack(samples), hands), hands)
+            if self.path:
+                self.save(self.path)
+        log_event(log, "prototype.enrolled", "手势 %(gesture)s 录入完成: %(samples)d 个原型",
+                  gesture=name, hands=hands, samples=len(samples))
+        return name, len(samples)
+
+    def save(self, path):
+        """保存为 .npz（先写临时文件再替换，中途退出不会损坏原文件）"""
+        arrays = {}
+        for hands, count in self._counts.items():
+            arrays[f"vectors_{hands}"] = self._vectors[hands][:count]
+            arrays[f"labels_{hands}"] = self._labels[hands][:count].astype(str)
+        temporary = path + ".tmp"
+        with open(temporary, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temporary, path)
+
+    def load(self, path):
+        """从 .npz 加载原型，替换当前全部原型"""
+        self._vectors, self._norms, self._labels, self._counts = {}, {}, {}, {}
+        with np.load(path) as data:
+            for key in data.files:
+                if key.startswith("vectors_"):
+                    hands = int(key.split("_")[1])
+                    vectors, labels = data[key], data[f"labels_{hands}"]
+                    for name in dict.fromkeys(labels.tolist()):
+                        self.add(name, vectors[labels == name], hands)
+        log_event(log, "prototype.loaded", "已加载 %(count)d 个原型: %(gestures)s",
+                  count=self.count(), gestures=self.gestures())
+
+    def warm_up(self):
+        """在空白关键点上运行一次识别"""
+        for hands in self._counts:
+            self.classify(self.embed(np.zeros((1, hands, 21, 2)), hands)[0], hands)
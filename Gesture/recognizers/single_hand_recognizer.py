@@ -1,17 +1,19 @@
+from utils.log import get_logger, log_event
+from utils.profiler import span
+
+log = get_logger("recognizer")
+
+
 class SingleHandRecognizer:
     """单手手势识别器"""
     
     def __init__(self, model=None):
         self.model = model
+        self.last_probabilities = None   # 最近一次调用模型得到的概率（按 model.classes_ 顺序）
     
-    def recognize(self, landmarks):
-        """单手手势识别"""
-        if self.model is None:
-            from .rule_based_recognizer import RuleBasedRecognizer
-            # 使用规则识别作为后备
-            return RuleBasedRecognizer().recognize(landmarks)
-        
-        # 将坐标转换为模型所需格式
+    @staticmethod
+    def extract_features(landmarks):
+        """将像素坐标转换为模型所需的特征向量"""
         features = []
         img_h, img_w = 480, 640  # 假设图像尺寸
         
@@ -21,19 +23,43 @@ class SingleHandRecognizer:
             norm_y = y / img_h
             # 添加z坐标（没有则为0）
             features.extend([norm_x, norm_y, 0.0])
+        return features
+    
+    def warm_up(self):
+        """在一组空白关键点上运行一次推理，提前完成首次调用的初始化"""
+        if self.model is not None:
+            features = self.extract_features([(0, 0)] * 21)
+            self.model.predict([features])
+            self.model.predict_proba([features])
+    
+    def recognize(self, landmarks):
+        """单手手势识别"""
+        if self.model is None:
+            from .rule_based_recognizer import RuleBasedRecognizer
+            # 使用规则识别作为后备
+            return RuleBasedRecognizer().recognize(landmarks)
+        
+        # 将坐标转换为模型所需格式
+        with span("features"):
+            features = self.extract_features(landmarks)
         
         # 预测手势
         try:
-            gesture = self.model.predict([features])[0]
-            confidence = max(self.model.predict_proba([features])[0])
+            with span("predict"):
+                gesture = self.model.predict([features])[0]
+            with span("predict_proba"):
+                self.last_probabilities = self.model.predict_proba([features])[0]
+            confidence = max(self.last_probabilities)
             
             # 如果置信度较低，返回Unknown
             if confidence < 0.6:
-                print(f"单手手势置信度过低: {gesture} ({confidence:.2f})")
+                log_event(log, "single.low_confidence", "单手手势置信度过低: %(gesture)s (%(confidence).2f)",
+                          gesture=gesture, confidence=confidence)
                 return "Unknown"
             
-            print(f"识别到单手手势: {gesture} (置信度: {confidence:.2f})")
+            log_event(log, "single.recognized", "识别到单手手势: %(gesture)s (置信度: %(confidence).2f)",
+                      gesture=gesture, confidence=confidence)
             return gesture
         except Exception as e:
-            print(f"单手识别错误: {e}")
+            log.exception(f"单手识别错误: {e}")
             return "Unknown"
\ No newline at end of file
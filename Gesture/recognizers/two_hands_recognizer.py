@@ -1,24 +1,24 @@
+import logging
+
+from utils.log import get_logger, log_event
+from utils.profiler import span
+
+log = get_logger("recognizer")
+
+
 class TwoHandsRecognizer:
     """双手手势识别器"""
     
     def __init__(self, model=None):
         self.model = model
+        self.last_probabilities = None   # 最近一次调用模型得到的概率（按 model.classes_ 顺序）
     
-    def recognize(self, landmarks1, landmarks2):
-        """双手手势识别"""
-        if self.model is None:
-            print("错误: 未加载双手模型")
-            return "Unknown"  # 没有双手模型
-        
-        # 将两手坐标转换为模型所需格式
+    @staticmethod
+    def extract_features(landmarks1, landmarks2):
+        """将两手的像素坐标转换为模型所需的特征向量"""
         features = []
         img_h, img_w = 480, 640
         
-        # 检查关键点数量
-        if len(landmarks1) < 21 or len(landmarks2) < 21:
-            print(f"警告: 关键点不足21个 (手1: {len(landmarks1)}, 手2: {len(landmarks2)})")
-            return "Unknown"
-        
         # 第一只手特征
         for x, y in landmarks1:
             norm_x = x / img_w
@@ -30,32 +30,60 @@ class TwoHandsRecognizer:
             norm_x = x / img_w
             norm_y = y / img_h
             features.extend([norm_x, norm_y, 0.0])
+        return features
+    
+    def warm_up(self):
+        """在一组空白关键点上运行一次推理，提前完成首次调用的初始化"""
+        if self.model is not None:
+            features = self.extract_features([(0, 0)] * 21, [(0, 0)] * 21)
+            self.model.predict([features])
+            self.model.predict_proba([features])
+    
+    def recognize(self, landmarks1, landmarks2):
+        """双手手势识别"""
+        if self.model is None:
+            log_event(log, "two_hands.no_model", "未加载双手模型", logging.ERROR)
+            return "Unknown"  # 没有双手模型
+        
+        # 检查关键点数量
+        if len(landmarks1) < 21 or len(landmarks2) < 21:
+            log_event(log, "two_hands.missing_landmarks", "关键点不足21个 (手1: %(hand1)d, 手2: %(hand2)d)",
+                      logging.WARNING, hand1=len(landmarks1), hand2=len(landmarks2))
+            return "Unknown"
+        
+        # 将两手坐标转换为模型所需格式
+        with span("features"):
+            features = self.extract_features(landmarks1, landmarks2)
         
         # 预测手势
         try:
             # 获取概率分布
-            probabilities = self.model.predict_proba([features])[0]
+            with span("predict_proba"):
+                probabilities = self.model.predict_proba([features])[0]
+            self.last_probabilities = probabilities
             
-            # 输出所有类别的概率
-            for i, gesture_class in enumerate(self.model.classes_):
-                print(f"  {gesture_class}: {probabilities[i]:.4f}")
+            # 输出所有类别的概率（抽样记录，在后台线程中格式化）
+            log_event(log, "two_hands.probabilities", "双手手势概率: %(classes)s %(probabilities)s",
+                      classes=self.model.classes_, probabilities=probabilities)
             
-            gesture = self.model.predict([features])[0]
+            with span("predict"):
+                gesture = self.model.predict([features])[0]
             confidence = max(probabilities)
             
             # 如果置信度可疑地高
             if confidence > 0.99:
-                print("警告: 置信度异常高，可能模型过拟合")
+                log_event(log, "two_hands.overconfident", "置信度异常高，可能模型过拟合", logging.WARNING,
+                          confidence=float(confidence))
                 
             # 如果置信度太低，返回Unknown
             if confidence < 0.6:
-                print(f"双手手势置信度过低: {gesture} ({confidence:.2f})")
+                log_event(log, "two_hands.low_confidence", "双手手势置信度过低: %(gesture)s (%(confidence).2f)",
+                          gesture=gesture, confidence=confidence)
                 return "Unknown"
             
-            print(f"识别到双手手势: {gesture} (置信度: {confidence:.2f})")
+            log_event(log, "two_hands.recognized", "识别到双手手势: %(gesture)s (置信度: %(confidence).2f)",
+                      gesture=gesture, confidence=confidence)
             return gesture
         except Exception as e:
-            print(f"双手识别错误: {e}")
-            import traceback
-            traceback.print_exc()  # 打印详细错误信息
+            log.exception(f"双手识别错误: {e}")  # 附带详细错误信息
             return "Unknown"
\ No newline at end of file
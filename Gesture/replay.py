@@ -0,0 +1,265 @@
+import argparse
+import contextlib
+import glob
+import io
+import os
+import socket
+import threading
+import time
+
+from Gesture_recognition import GestureRecognition
+from utils.landmark_stream import make_results, load_stream, DEFAULT_TRACKING_FILE
+from utils.profiler import profiler
+from utils.state_sync import StateSyncReceiver
+
+# 回放录制的关键点: 不使用摄像头，把录制结果依次送入 GestureRecognition 的处理流程
+# （ID分配、滤波、识别器、稳定器、位置和手势发送），UDP 输出发到本地的替身监听器。
+
+
+class StandInListener:
+    """代替 Unity 的本地 UDP 监听器，在后台线程中接收并保存所有数据包"""
+
+    def __init__(self, host='127.0.0.1', port=0, ack=True):
+        """
+        参数:
+            host: 监听地址
+            port: 监听端口，0 表示由系统分配（分配后的端口见 self.port）
+            ack: 是否像支持状态同步的 Unity 一样确认收到的状态快照
+        """
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.sock.settimeout(0.1)
+        self.host, self.port = self.sock.getsockname()
+        self.messages = []   # [(接收时间, 消息), ...]
+        self.bytes_received = 0
+        self.ack = ack
+        self.state_receiver = StateSyncReceiver()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"StandInListener:{self.port}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止监听，等待缓冲区中剩余的数据包"""
+        time.sleep(0.05)
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+        self.sock.close()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                data, address = self.sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            self.bytes_received += len(data)
+            message = data.decode('utf-8', errors='replace')
+            self.messages.append((time.time(), message))
+            _, reply = self.state_receiver.handle(message)
+            if reply and self.ack:
+                self.sock.sendto(reply.encode('utf-8'), address)
+
+    def gesture_messages(self):
+        """返回收到的手势消息 (不含测试消息、手部检测状态和状态快照)"""
+        gestures = []
+        for _, message in self.messages:
+            parts = message.split("|")
+            if parts[0] == "gesture" and len(parts) == 2:
+                gestures.append(parts[1])
+        return gestures
+
+
+def replay(stream, realtime=False, speed=1.0, enable_position=True, image_shape=(480, 640, 3),
+           **recognition_kwargs):
+    """
+    回放一段关键点流
+
+    参数:
+        stream: [(timestamp, hands), ...]，见 utils.landmark_stream
+        realtime: True 时按录制的时间间隔回放，False 时尽可能快地回放
+        speed: 按原始时间回放时的倍速
+        enable_position: 是否同时回放位置发送
+        image_shape: 录制时的图像尺寸
+        recognition_kwargs: 传给 GestureRecognition 的其他参数（如滤波参数）
+
+    返回:
+        {"frames", "wall_time", "fps", "gestures": 稳定手势变化序列 [(timestamp, gesture)],
+         "raw_gestures": 每帧识别器的原始结果, "cascade": 级联直接接受、拒识和交给模型的帧数,
+         "reordered_frames": 手的ID与 MediaPipe 原始顺序不一致的帧数,
+         "gesture_packets", "position_packets", "sent_gestures": 监听器收到的手势序列,
+         "state": 监听器最后收到的状态快照, "state_packets": 其中状态快照的数据包数}
+    """
+    gesture_listener = StandInListener().start()
+    position_listener = StandInListener().start()
+
+    gr = GestureRecognition(gesture_port=gesture_listener.port, position_port=position_listener.port,
+                            auto_connect=False, **recognition_kwargs)
+    gr.load_models()
+    gr.connect()
+    if enable_position:
+        gr.enable_position(True)
+
+    start_time = stream[0][0] if stream else 0.0
+    gr.reset_state(start_time)
+    gestures = []
+    raw_gestures = []
+    last_gesture = None
+
+    wall_start = time.perf_counter()
+    for timestamp, hands in stream:
+        if realtime:
+            delay = (timestamp - start_time) / speed - (time.perf_counter() - wall_start)
+            if delay > 0:
+                time.sleep(delay)
+        profiler.start_frame()
+        # 使用录制的时间戳，回放结果与回放速度无关
+        current_gesture, _ = gr.process_results(make_results(hands), image_shape, timestamp=timestamp)
+        raw_gestures.append(str(gr.last_raw_gesture))
+        if current_gesture != last_gesture:
+            gestures.append((timestamp, str(current_gesture)))
+            last_gesture = current_gesture
+    wall_time = time.perf_counter() - wall_start
+    cascades = (gr.single_hand_cascade, gr.two_hands_cascade)
+    cascade = {key: sum(getattr(c, key) for c in cascades) for key in ("accepted", "rejected", "forwarded")}
+
+    gr.disconnect()
+    gesture_listener.stop()
+    position_listener.stop()
+
+    return {
+        "frames": len(stream),
+        "wall_time": wall_time,
+        "fps": len(stream) / wall_time if wall_time > 0 else 0.0,
+        "gestures": gestures,
+        "raw_gestures": raw_gestures,
+        "cascade": cascade,
+        "reordered_frames": gr.hand_id_tracker.reordered_frames,
+        "gesture_packets": len(gesture_listener.messages),
+        "position_packets": len(position_listener.messages),
+        "sent_gestures": gesture_listener.gesture_messages(),
+        "state": gesture_listener.state_receiver.state,
+        "state_packets": gesture_listener.state_receiver.updates + gesture_listener.state_receiver.duplicates,
+    }
+
+
+def replay_gesture_data(base_dir="gesture_data", **kwargs):
+    """
+    回放 gesture_data 中的所有会话，统计稳定手势与会话标注一致的比例
+
+    返回:
+        {会话文件: {"label": 标注手势, "final": 最后的稳定手势, "agreement": 帧级一致率,
+                   "raw_accuracy": 识别器原始结果与标注一致的帧的比例, "cascade": 见 replay}}
+    """
+    report = {}
+    for path in sorted(glob.glob(os.path.join(base_dir, "*", "session_*.json"))):
+        label = os.path.basename(os.path.dirname(path)).split("_")[0]
+        stream = load_stream(path)
+        result = replay(stream, **kwargs)
+
+        # 按时间展开稳定手势序列，计算与标注一致的帧的比例
+        changes = result["gestures"]
+        agree = 0
+        for timestamp, _ in stream:
+            current = "Unknown"
+            for t, gesture in changes:
+                if t > timestamp:
+                    break
+                current = gesture
+            agree += current == label
+        report[path] = {"label": label, "final": changes[-1][1] if changes else "Unknown",
+                        "agreement": agree / max(len(stream), 1), "fps": result["fps"],
+                        "raw_accuracy": sum(g == label for g in result["raw_gestures"]) / max(len(stream), 1),
+                        "cascade": result["cascade"]}
+    return report
+
+
+def held_out_cascade_report(base_dir="gesture_data"):
+    """
+    按会话划分 gesture_data（utils.dataset.grouped_split），只用训练会话重新训练随机森林和手指状态查找表，
+    在测试会话的每一帧上打印关闭和启用级联时的准确率以及不调用随机森林的帧比例
+
+    与随附模型无关，数字不受训练数据泄漏的影响。
+    """
+    from gesture_trainer import GestureTrainer
+    from sklearn.ensemble import RandomForestClassifier
+    trainer = GestureTrainer(data_dir=base_dir, plot=False, split="session")
+    with contextlib.redirect_stdout(io.StringIO()):
+        samples = trainer.read_samples()
+    if samples is None:
+        return
+    print("测试会话（未参与训练）:")
+    for kind, hands, name in (("single", 1, "单手"), ("two_hands", 2, "双手")):
+        X, y, groups = samples[kind]
+        if not len(X):
+            continue
+        with contextlib.redirect_stdout(io.StringIO()):
+            X_train, X_test, y_train, y_test = trainer.split_data(X, y, groups, hands=hands)
+        model = RandomForestClassifier(n_estimators=100, random_state=42).fit(X_train, y_train)
+        print(f"  {name} (训练 {len(X_train)} 帧, 测试 {len(X_test)} 帧) ", end="")
+        trainer.fit_cascade(model, X_train, y_train, X_test, y_test, hands)
+
+
+def cascade_report(base_dir="gesture_data", **kwargs):
+    """
+    先按会话划分报告级联在测试会话上的效果（held_out_cascade_report），再分别在启用和关闭手指状态级联时
+    回放 gesture_data，打印每帧原始识别的准确率和不调用随机森林的帧的比例
+
+    回放的会话也是随附模型和查找表的训练数据，这部分是训练集上的数字，准确率和跳过比例都偏乐观。
+    """
+    held_out_cascade_report(base_dir)
+    print("\n回放全部会话（训练集上的数字，随附模型和查找表由这些会话训练，偏乐观）:")
+    reports = {enabled: replay_gesture_data(base_dir, enable_position=False, cascade=enabled, **kwargs)
+               for enabled in (True, False)}
+    frames = {}
+    for enabled, report in reports.items():
+        counts = {key: sum(r["cascade"][key] for r in report.values()) for key in ("accepted", "rejected", "forwarded")}
+        recognized = max(sum(counts.values()), 1)
+        frames[enabled] = counts
+        accuracy = sum(r["raw_accuracy"] for r in report.values()) / max(len(report), 1)
+        agreement = sum(r["agreement"] for r in report.values()) / max(len(report), 1)
+        print(f"{'启用级联' if enabled else '关闭级联'}: 原始识别准确率 {accuracy:.3f}, 稳定手势一致率 {agreement:.3f}, "
+              f"不调用随机森林的帧 {(counts['accepted'] + counts['rejected']) / recognized:.1%} "
+              f"(直接接受 {counts['accepted']}, 拒识 {counts['rejected']}, 交给模型 {counts['forwarded']})")
+    for path, result in reports[True].items():
+        off = reports[False][path]
+        c = result["cascade"]
+        skipped = (c["accepted"] + c["rejected"]) / max(sum(c.values()), 1)
+        print(f"  {os.path.relpath(path, base_dir):<50} 准确率 {off['raw_accuracy']:.3f} -> {result['raw_accuracy']:.3f}"
+              f"  跳过模型 {skipped:.0%}")
+    return reports
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="回放录制的关键点，经过识别器、稳定器和网络层")
+    parser.add_argument("path", nargs="?", default=DEFAULT_TRACKING_FILE,
+                        help="录制文件、hand_tracking_data.json 或 gesture_data 会话文件")
+    parser.add_argument("--realtime", action="store_true", help="按录制的时间间隔回放")
+    parser.add_argument("--speed", type=float, default=1.0, help="按原始时间回放时的倍速")
+    parser.add_argument("--trace", help="导出 Chrome trace 的路径（同时启用计时）")
+    parser.add_argument("--cascade-report", metavar="DATA_DIR", nargs="?", const="gesture_data",
+                        help="回放 gesture_data，比较启用和关闭手指状态级联时的准确率和跳过随机森林的帧比例")
+    args = parser.parse_args()
+
+    if args.cascade_report:
+        cascade_report(args.cascade_report)
+        raise SystemExit(0)
+
+    if args.trace:
+        profiler.enable()
+    result = replay(load_stream(args.path), realtime=args.realtime, speed=args.speed)
+
+    print(f"\n回放 {result['frames']} 帧, 用时 {result['wall_time']:.2f} 秒 ({result['fps']:.1f} FPS)")
+    print(f"手势数据包 {result['gesture_packets']} 个（其中状态快照 {result['state_packets']} 个）, "
+          f"位置数据包 {result['position_packets']} 个")
+    print(f"手的ID与 MediaPipe 顺序不一致的帧 {result['reordered_frames']} 个")
+    print(f"最后的状态: {result['state']}")
+    print("稳定手势序列:")
+    for timestamp, gesture in result["gestures"]:
+        print(f"  {timestamp:8.2f}s  {gesture}")
+    if args.trace:
+        print(profiler.format_summary())
+        profiler.export_chrome_trace(args.trace)
@@ -2,6 +2,8 @@ import socket
 import time
 import datetime
 
+from utils.state_sync import StateSyncReceiver
+
 def parse_position_data(message, parts):
     """
     解析位置相关数据（暂时禁用）
@@ -29,7 +31,7 @@ def parse_position_data(message, parts):
     """
     pass
 
-def udp_listener(host='0.0.0.0', port=8000, timeout=None, track_gesture_changes=True):
+def udp_listener(host='0.0.0.0', port=8000, timeout=None, track_gesture_changes=True, ack=True):
     """
     创建一个UDP监听器，接收并显示所有传入的UDP数据包
     
@@ -38,9 +40,15 @@ def udp_listener(host='0.0.0.0', port=8000, timeout=None, track_gesture_changes=
         port: 监听的端口号
         timeout: 监听超时时间（秒），None表示永不超时
         track_gesture_changes: 是否只跟踪手势类型的变化
+        ack: 是否确认收到的状态快照（见 utils.state_sync），确认后发送方不再重复发送
+    
+    返回:
+        接收到的数据包数量
     """
     # 创建UDP套接字
     sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    packet_count = 0
+    start_time = time.time()
     
     try:
         # 绑定到指定地址和端口
@@ -58,6 +66,7 @@ def udp_listener(host='0.0.0.0', port=8000, timeout=None, track_gesture_changes=
         packet_count = 0
         start_time = time.time()
         last_gesture_type = None
+        state_receiver = StateSyncReceiver()
         
         # 开始监听
         while True:
@@ -75,6 +84,11 @@ def udp_listener(host='0.0.0.0', port=8000, timeout=None, track_gesture_changes=
                 # 获取当前时间
                 current_time = datetime.datetime.now().strftime("%H:%M:%S.%f")[:-3]
                 
+                # 状态快照: 只接受更新的版本，并回复确认
+                state, reply = state_receiver.handle(message)
+                if reply and ack:
+                    sock.sendto(reply.encode('utf-8'), addr)
+                
                 # 如果是按照我们的格式发送的，尝试提取手势类型
                 current_gesture = None
                 if "|" in message:
@@ -84,8 +98,12 @@ def udp_listener(host='0.0.0.0', port=8000, timeout=None, track_gesture_changes=
                 
                 # 根据跟踪模式决定显示内容
                 if track_gesture_changes:
+                    # 状态快照只在版本更新时显示
+                    if reply:
+                        if state is not None:
+                            print(f"[{current_time}] 状态 v{state_receiver.version}: {state}")
                     # 只在手势类型变化时显示信息
-                    if current_gesture and current_gesture != last_gesture_type:
+                    elif current_gesture and current_gesture != last_gesture_type:
                         print(f"[{current_time}] 手势变化: {current_gesture}")
                         last_gesture_type = current_gesture
                 else:
@@ -121,6 +139,7 @@ def udp_listener(host='0.0.0.0', port=8000, timeout=None, track_gesture_changes=
         print(f"\n监听结束 - 共接收 {packet_count} 个数据包，用时 {duration:.1f} 秒")
         if packet_count > 0:
             print(f"平均每秒接收 {packet_count/duration:.1f} 个数据包")
+    return packet_count
 
 if __name__ == "__main__":
     # 您可以根据需要修改端口
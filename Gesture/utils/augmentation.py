@@ -0,0 +1,155 @@
+import numpy as np
+
+# 关键点数据增强: 对整批 (N, hands, 21, 3) 数组一次性生成旋转（平面内和三维倾斜）、缩放和平移抖动、
+# 镜像（同时交换双手顺序）、逐点噪声和模拟手指遮挡的样本。坐标为 MediaPipe 的归一化图像坐标，
+# 旋转前按图像宽高比换算为等比例坐标，避免把手压扁。同一种子得到相同的结果。
+
+# 每根手指除根部外的三个关键点，以及对应的根部关键点
+FINGER_JOINTS = np.array([[2, 3, 4], [6, 7, 8], [10, 11, 12], [14, 15, 16], [18, 19, 20]])
+FINGER_BASES = np.array([1, 5, 9, 13, 17])
+
+
+def rotation_matrices(roll, pitch, yaw):
+    """
+    批量构造旋转矩阵 R = Rz(roll) @ Ry(yaw) @ Rx(pitch)
+
+    参数:
+        roll: 平面内旋转角（弧度），pitch, yaw: 绕 x、y 轴的倾斜角，形状均为 (M,)
+
+    返回:
+        (M, 3, 3) 数组
+    """
+    cr, sr = np.cos(roll), np.sin(roll)
+    cp, sp = np.cos(pitch), np.sin(pitch)
+    cy, sy = np.cos(yaw), np.sin(yaw)
+    R = np.empty((len(roll), 3, 3), dtype=np.float32)
+    R[:, 0, 0] = cr * cy
+    R[:, 0, 1] = cr * sy * sp - sr * cp
+    R[:, 0, 2] = cr * sy * cp + sr * sp
+    R[:, 1, 0] = sr * cy
+    R[:, 1, 1] = sr * sy * sp + cr * cp
+    R[:, 1, 2] = sr * sy * cp - cr * sp
+    R[:, 2, 0] = -sy
+    R[:, 2, 1] = cy * sp
+    R[:, 2, 2] = cy * cp
+    return R
+
+
+class LandmarkAugmenter:
+    """批量关键点增强"""
+
+    def __init__(self, rotation=15.0, tilt=10.0, scale=0.1, translation=0.05, mirror=0.5,
+                 noise=0.003, occlusion=0.1, aspect=640 / 480, seed=0):
+        """
+        参数:
+            rotation: 平面内旋转的最大角度(度)
+            tilt: 绕 x、y 轴倾斜的最大角度(度)
+            scale: 缩放抖动幅度，缩放系数在 [1-scale, 1+scale] 内均匀分布
+            translation: 平移抖动幅度（归一化图像坐标）
+            mirror: 水平镜像的概率，镜像时交换双手顺序
+            noise: 逐点高斯噪声的标准差（归一化图像坐标）
+            occlusion: 每只手模拟一根手指被遮挡的概率（该手指的关节向根部收缩）
+            aspect: 图像宽高比
+            seed: 随机种子
+        """
+        self.rotation = np.radians(rotation)
+        self.tilt = np.radians(tilt)
+        self.scale = scale
+        self.translation = translation
+        self.mirror = mirror
+        self.noise = noise
+        self.occlusion = occlusion
+        self.units = np.array([aspect, 1.0, aspect], dtype=np.float32)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+    def reset(self):
+        """恢复初始种子，之后的结果与新建的增强器相同"""
+        self.rng = np.random.default_rng(self.seed)
+
+    def augment(self, points, copies=1, chunk_size=4096):
+        """
+        生成增强样本
+
+        参数:
+            points: (N, hands, 21, 3) 或 (N, 21, 3) 关键点
+            copies: 每个样本生成的增强样本数
+            chunk_size: 每次处理的样本数，中间数组保持在缓存中
+
+        返回:
+            (N*copies, hands, 21, 3) float32 数组，第 k 组 N 个样本对应第 k 份增强
+        """
+        points = np.asarray(points, dtype=np.float32)
+        single = points.ndim == 3
+        if single:
+            points = points[:, np.newaxis]
+        n, hands = points.shape[:2]
+        m = n * copies
+        rng = self.rng
+
+        # 一次生成全部随机参数（float32），结果只取决于种子和输入，与 chunk_size 无关
+        def uniform(low, high, shape):
+            return low + (high - low) * rng.random(shape, dtype=np.float32)
+
+        flip = rng.random(m, dtype=np.float32) < self.mirror if self.mirror else None
+        R = rotation_matrices(uniform(-self.rotation, self.rotation, m),
+                              uniform(-self.tilt, self.tilt, m),
+                              uniform(-self.tilt, self.tilt, m))
+        R *= uniform(1 - self.scale, 1 + self.scale, (m, 1, 1))
+        # 把宽高比换算合并进旋转矩阵: 在等比例坐标中旋转等价于 diag(1/u) R diag(u)
+        A = R * (self.units[np.newaxis, :] / self.units[:, np.newaxis])
+        shift = np.zeros((m, 3), dtype=np.float32)
+        shift[:, :2] = uniform(-self.translation, self.translation, (m, 2))
+        # 噪声从本次调用生成的噪声库中按样本抽取，比逐点生成正态随机数快一个数量级
+        noise_bank = noise_index = None
+        if self.noise:
+            noise_bank = rng.standard_normal((4096, hands * 21, 3), dtype=np.float32) * np.float32(self.noise)
+            noise_index = rng.integers(0, len(noise_bank), m)
+        occluded = None
+        if self.occlusion:
+            occluded = np.flatnonzero(rng.random(m * hands, dtype=np.float32) < self.occlusion)
+            finger = rng.integers(0, 5, len(occluded))
+            amount = uniform(0.3, 1.0, (len(occluded), 1, 1))
+
+        out = np.empty((m, hands, 21, 3), dtype=np.float32)
+        for start in range(0, m, chunk_size):
+            stop = min(start + chunk_size, m)
+            self._transform(points, start, stop, out, flip, A, shift, noise_bank, noise_index)
+
+        # 手指遮挡: 被选中手指的三个关节向根部收缩（MediaPipe 对看不见的手指常给出蜷缩的估计）
+        if occluded is not None and len(occluded):
+            flat = out.reshape(m * hands, 21, 3)
+            joints = FINGER_JOINTS[finger]
+            base = flat[occluded, FINGER_BASES[finger]][:, np.newaxis]
+            rows = occluded[:, np.newaxis]
+            flat[rows, joints] = base + (flat[rows, joints] - base) * (1 - amount)
+
+        return out[:, 0] if single else out
+
+    @staticmethod
+    def _transform(points, start, stop, out, flip, A, shift, noise_bank, noise_index):
+        """对第 start 到 stop 个增强样本做镜像、旋转缩放、平移和噪声，写入 out"""
+        n, hands = points.shape[:2]
+        chunk = points[np.arange(start, stop) % n]
+        a = A[start:stop].copy()
+
+        # 以各只手中指根部的中点 c（镜像后）为中心: p' = A (p - c) + c + t = A p + (c + t - A c)
+        center = chunk[:, :, 9].mean(axis=1)
+        if flip is not None:
+            f = flip[start:stop]
+            center[f, 0] = 1.0 - center[f, 0]
+        offset = center + shift[start:stop] - (a * center[:, np.newaxis, :]).sum(axis=2)
+
+        # 镜像 p -> M p + e（M = diag(-1, 1, 1), e = (1, 0, 0)）合并进仿射变换:
+        # A (M p + e) = (A M) p + A e，即 A 的第一列加到偏移量上后取反；双手时交换两只手的顺序
+        if flip is not None:
+            offset[f] += a[f, :, 0]
+            a[f, :, 0] *= -1
+            if hands > 1:
+                chunk[f] = chunk[f, ::-1]
+
+        target = out[start:stop].reshape(stop - start, hands * 21, 3)
+        np.matmul(chunk.reshape(stop - start, hands * 21, 3), a.transpose(0, 2, 1), out=target)
+        target += offset[:, np.newaxis]
+        if noise_bank is not None:
+            target += noise_bank[noise_index[start:stop]]
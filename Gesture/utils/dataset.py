@@ -0,0 +1,155 @@
+import numpy as np
+
+from utils.novelty_sampler import WRIST, MIDDLE_MCP
+
+# gesture_data 的数据集处理: 规范化关键点向量、基于 KD 树的近重复样本剔除、
+# 类别再平衡和按会话分组的训练/测试划分。全部按数组批量计算，可处理数十万个样本。
+
+
+def canonicalize(X, hands=1):
+    """
+    批量规范化训练特征，与 utils.novelty_sampler.sample_features 的定义一致
+
+    参数:
+        X: (N, hands*63) 训练特征（每只手 21 个关键点的 x, y, z）
+        hands: 每个样本的手数
+
+    返回:
+        (N, D) 向量: 每只手以手腕为原点、按手掌大小缩放，双手时附加第二只手腕的相对位移；
+        D = hands*63 + (hands-1)*3
+    """
+    points = np.asarray(X, dtype=np.float64).reshape(len(X), hands, 21, 3)
+    wrists = points[:, :, WRIST:WRIST + 1, :]
+    centered = points - wrists
+    scale = np.linalg.norm(centered[:, :, MIDDLE_MCP, :2], axis=2)[:, :, np.newaxis, np.newaxis]
+    normalized = centered / np.where(scale > 1e-6, scale, 1.0)
+    parts = [normalized.reshape(len(X), -1)]
+    if hands > 1:
+        offsets = (wrists[:, 1:, 0, :] - wrists[:, :1, 0, :]) / np.maximum(scale[:, :1, 0, :], 1e-6)
+        parts.append(offsets.reshape(len(X), -1))
+    return np.concatenate(parts, axis=1)
+
+
+def near_duplicates(vectors, radius, labels=None, max_batch=1024, components=12):
+    """
+    贪心剔除近重复样本: 按顺序遍历，保留的样本覆盖半径内所有尚未处理的同类样本
+
+    高维向量上 KD 树接近暴力搜索，所以先投影到主成分上建树: 投影不会增大距离，
+    在投影空间按同一半径查询得到的候选包含全部真实邻居，再用原始向量的距离筛选。
+    只查询尚未被覆盖的样本；批量查询的大小自适应: 一批中大部分样本被同批的前面样本覆盖时
+    （大量连续相似帧）减小批量，避免为注定被剔除的样本取回大量邻居。
+
+    参数:
+        vectors: canonicalize 得到的 (N, D) 向量
+        radius: 近重复的距离阈值，按每个关键点的均方根位移计（单位为手掌大小）
+        labels: 每个样本的类别，只在同类样本之间剔除；None 表示全部视为同一类
+        max_batch: 每批最多查询的样本数
+        components: 建树使用的主成分数
+
+    返回:
+        covered_by: (N,) 数组，保留的样本为 -1，被剔除的样本为覆盖它的保留样本的下标
+    """
+    from scipy.spatial import cKDTree
+
+    vectors = np.asarray(vectors, dtype=np.float64)
+    covered_by = np.full(len(vectors), -1, dtype=np.int64)
+    if len(vectors) == 0:
+        return covered_by
+    labels = np.zeros(len(vectors), dtype=np.int64) if labels is None else np.asarray(labels)
+    # 向量距离 = 每个关键点均方根位移 * sqrt(关键点数)
+    vector_radius = radius * np.sqrt(vectors.shape[1] / 3)
+
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        points = vectors[members]
+        tree = cKDTree(project(points, components))
+        removed = np.zeros(len(members), dtype=bool)
+        position = 0
+        batch_size = 16
+        while position < len(members):
+            # 取接下来 batch_size 个尚未被覆盖的样本
+            pending = np.flatnonzero(~removed[position:position + 4 * batch_size])[:batch_size] + position
+            if len(pending) == 0:
+                position += 4 * batch_size
+                continue
+            neighbours = tree.query_ball_point(tree.data[pending], vector_radius, workers=-1)
+            wasted = 0
+            for i, found in zip(pending, neighbours):
+                if removed[i]:
+                    wasted += 1
+                    continue
+                found = np.asarray(found, dtype=np.int64)
+                found = found[(found > i) & ~removed[found]]
+                found = found[np.linalg.norm(points[found] - points[i], axis=1) <= vector_radius]
+                removed[found] = True
+                covered_by[members[found]] = members[i]
+            position = pending[-1] + 1
+            batch_size = max(batch_size // 2, 1) if wasted > len(pending) // 2 else min(batch_size * 2, max_batch)
+    return covered_by
+
+
+def project(vectors, components=12, max_fit_samples=20000, seed=0):
+    """投影到主成分上（正交投影，距离只会变小），用于在低维空间中建 KD 树"""
+    if vectors.shape[1] <= components:
+        return vectors
+    rng = np.random.default_rng(seed)
+    fit = vectors if len(vectors) <= max_fit_samples else vectors[rng.choice(len(vectors), max_fit_samples, replace=False)]
+    mean = fit.mean(axis=0)
+    _, _, vt = np.linalg.svd(fit - mean, full_matrices=False)
+    return (vectors - mean) @ vt[:components].T
+
+
+def rebalance(labels, max_ratio=1.5, seed=0):
+    """
+    下采样样本多的类别，使每类不超过最少类别的 max_ratio 倍
+
+    返回:
+        保留样本的下标（升序）
+    """
+    labels = np.asarray(labels)
+    classes, counts = np.unique(labels, return_counts=True)
+    if len(classes) == 0:
+        return np.array([], dtype=np.int64)
+    cap = int(np.ceil(counts.min() * max_ratio))
+    rng = np.random.default_rng(seed)
+    keep = []
+    for label, count in zip(classes, counts):
+        members = np.flatnonzero(labels == label)
+        keep.append(members if count <= cap else rng.choice(members, cap, replace=False))
+    return np.sort(np.concatenate(keep))
+
+
+def grouped_split(labels, groups, test_size=0.2, seed=0):
+    """
+    按会话划分训练集和测试集，同一会话的样本不会同时出现在两边
+
+    每个类别随机选择会话放入测试集，直到达到 test_size；只有一个会话的类别
+    无法按会话划分，改为把该会话末尾连续的 test_size 部分放入测试集。
+
+    参数:
+        labels: 每个样本的类别
+        groups: 每个样本所属的会话
+        test_size: 测试集比例
+
+    返回:
+        (训练集下标, 测试集下标)
+    """
+    labels = np.asarray(labels)
+    groups = np.asarray(groups)
+    rng = np.random.default_rng(seed)
+    test = np.zeros(len(labels), dtype=bool)
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        sessions = list(dict.fromkeys(groups[members]))
+        target = test_size * len(members)
+        if len(sessions) == 1:
+            test[members[len(members) - int(round(target)):]] = True
+            continue
+        taken = 0
+        for index in rng.permutation(len(sessions))[:-1]:   # 至少留一个会话用于训练
+            if taken >= target:
+                break
+            in_session = members[groups[members] == sessions[index]]
+            test[in_session] = True
+            taken += len(in_session)
+    return np.flatnonzero(~test), np.flatnonzero(test)
@@ -0,0 +1,178 @@
+import logging
+import threading
+import time
+
+import numpy as np
+
+from utils.log import get_logger, log_event
+
+log = get_logger("position")
+
+
+class SampleBuffer:
+    """
+    线程安全的双缓冲: 摄像头线程写后台缓冲后交换，发送线程只读前台缓冲
+
+    每只手保存最近两个样本 (timestamp, position, velocity)，用于插值或外推。
+    """
+
+    def __init__(self):
+        self._buffers = [{}, {}]
+        self._front = 0
+        self._lock = threading.Lock()
+        self._history = {}   # 仅由写入方访问 {key: [上一个样本, 最新样本]}
+
+    def publish(self, samples, timestamp):
+        """
+        写入一帧的样本
+
+        参数:
+            samples: {key: (position, velocity 或 None)}，没有出现的手视为已离开
+            timestamp: 帧时间(秒)
+        """
+        history = {}
+        for key, (position, velocity) in samples.items():
+            sample = (timestamp, np.asarray(position, dtype=np.float64),
+                      None if velocity is None else np.asarray(velocity, dtype=np.float64))
+            previous = self._history.get(key)
+            history[key] = (previous[1] if previous else None, sample)
+        self._history = history
+
+        back = 1 - self._front
+        self._buffers[back] = dict(history)
+        with self._lock:
+            self._front = back
+
+    def snapshot(self):
+        """读取最新一帧的样本 {key: (上一个样本, 最新样本)}"""
+        with self._lock:
+            return self._buffers[self._front]
+
+
+def estimate_position(previous, latest, target_time, max_extrapolation=0.1):
+    """
+    估计某只手在 target_time 的位置
+
+    目标时间在两个样本之间时线性插值；晚于最新样本时优先用样本中的速度外推，
+    没有速度时用最近两个样本的差分速度外推，外推时间不超过 max_extrapolation。
+
+    返回:
+        (位置, 速度)
+    """
+    t1, p1, v1 = latest
+    if previous is not None:
+        t0, p0, _ = previous
+        if t1 > t0 and target_time < t1:
+            w = max(0.0, (target_time - t0) / (t1 - t0))
+            return p0 + (p1 - p0) * w, (p1 - p0) / (t1 - t0)
+        if v1 is None and t1 > t0:
+            v1 = (p1 - p0) / (t1 - t0)
+    if v1 is None:
+        return p1, np.zeros_like(p1)
+    dt = min(max(target_time - t1, 0.0), max_extrapolation)
+    return p1 + v1 * dt, v1
+
+
+class FixedRateSender:
+    """以固定频率在独立线程中发送位置，与摄像头帧率解耦"""
+
+    def __init__(self, send_fn, rate_hz=60.0, interpolation_delay=0.0, max_extrapolation=0.1,
+                 idle_interval=0.2, clock=time.time):
+        """
+        参数:
+            send_fn: send_fn(key, position, velocity)；没有手时以 key=None 调用
+            rate_hz: 发送频率(Hz)，例如与 Unity 的帧率一致
+            interpolation_delay: 输出时间相对当前时间的延后量(秒)，大于0时在样本之间插值，
+                                 为0时从最新样本外推
+            max_extrapolation: 最长外推时间(秒)，防止检测停顿时位置飞出
+            idle_interval: 没有手时的发送间隔(秒)
+            clock: 时间函数，需与 publish 的时间戳使用同一时钟
+        """
+        self.send_fn = send_fn
+        self.rate_hz = rate_hz
+        self.interpolation_delay = interpolation_delay
+        self.max_extrapolation = max_extrapolation
+        self.idle_interval = idle_interval
+        self.clock = clock
+        self.buffer = SampleBuffer()
+        self.ticks = 0
+        self.missed_ticks = 0
+        self.tick_errors = 0
+        self._last_idle_send = 0.0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def publish(self, samples, timestamp=None):
+        """由摄像头循环调用，写入最新样本"""
+        self.buffer.publish(samples, self.clock() if timestamp is None else timestamp)
+
+    def start(self):
+        """启动发送线程"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="FixedRateSender", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止发送线程"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def tick(self, now):
+        """发送一次当前时刻的位置"""
+        snapshot = self.buffer.snapshot()
+        target_time = now - self.interpolation_delay
+        if snapshot:
+            for key, (previous, latest) in snapshot.items():
+                position, velocity = estimate_position(previous, latest, target_time, self.max_extrapolation)
+                self.send_fn(key, position, velocity)
+        elif now - self._last_idle_send > self.idle_interval:
+            self.send_fn(None, None, None)
+            self._last_idle_send = now
+        self.ticks += 1
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        next_tick = time.perf_counter()
+        while not self._stop_event.is_set():
+            try:
+                self.tick(self.clock())
+            except Exception as e:
+                # 单次发送失败不能让发送线程退出，否则位置输出会无声地停止
+                self.tick_errors += 1
+                log_event(log, "fixed_rate.tick_error", "FixedRateSender: 发送失败 - %(error)s", logging.ERROR,
+                          error=e)
+            next_tick += period
+            delay = next_tick - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
+            else:
+                # 落后时跳过错过的节拍，不连续补发
+                missed = int(-delay // period) + 1
+                self.missed_ticks += missed - 1
+                next_tick += (missed - 1) * period
+
+
+if __name__ == "__main__":
+    # 以不规则的间隔写入样本，测量发送间隔的抖动
+    send_times = []
+    sender = FixedRateSender(lambda key, p, v: send_times.append(time.perf_counter()), rate_hz=60.0)
+    sender.start()
+    rng = np.random.default_rng(0)
+    start = time.time()
+    while time.time() - start < 2.0:
+        t = time.time()
+        sender.publish({0: ((0.5 + 0.1 * np.sin(t), 0.5, 0.0), None)}, t)
+        time.sleep(rng.uniform(0.015, 0.06))   # 模拟推理耗时不稳定
+    sender.stop()
+
+    intervals = np.diff(send_times) * 1000
+    print(f"发送 {len(send_times)} 次, 间隔 {intervals.mean():.2f} ms, "
+          f"标准差 {intervals.std():.2f} ms, 最大 {intervals.max():.2f} ms")
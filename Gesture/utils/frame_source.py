@@ -0,0 +1,339 @@
+import glob
+import logging
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from utils.log import get_logger, log_event
+from utils.startup import LazyModule
+
+log = get_logger("camera")
+
+# cv2 在打开来源的线程中第一次使用时才导入
+cv2 = LazyModule("cv2")
+
+# 帧来源: 摄像头、视频文件、图片目录和合成图像共用同一接口。
+# 每个来源在独立线程中预先读取解码，主循环只从队列取帧；接口与 cv2.VideoCapture 的
+# isOpened/read/release 保持一致，另提供带时间戳的 read_timestamped。
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class FrameSource:
+    """
+    帧来源基类，子类实现 _open、_grab 和 _close
+
+    _grab 返回 (frame, media_time)，没有更多帧时返回 (None, None)；media_time 为相对
+    第一帧的时间(秒)，None 表示实时来源，以读取时刻为时间戳。
+    """
+
+    def __init__(self, buffer_size=4, drop_old=False, realtime=False):
+        """
+        参数:
+            buffer_size: 预读队列长度
+            drop_old: 队列满时丢弃最旧的帧（摄像头使用，保证处理的总是最新帧）；
+                      False 时等待消费，不丢帧
+            realtime: 对有媒体时间的来源，按原始帧率节奏输出；False 时尽快输出
+        """
+        self.buffer_size = buffer_size
+        self.drop_old = drop_old
+        self.realtime = realtime
+        self.frames_read = 0
+        self.frames_dropped = 0
+        self._queue = queue.Queue(maxsize=buffer_size)
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._finished = False
+        self._opened = False
+        self._close_lock = threading.Lock()
+        self._reader_exited = False
+        self._close_on_exit = False
+
+    # 子类实现
+    def _open(self):
+        raise NotImplementedError
+
+    def _grab(self):
+        raise NotImplementedError
+
+    def _close(self):
+        pass
+
+    def start(self):
+        """打开来源并启动预读线程，返回是否成功"""
+        if self._thread is not None:
+            return self._opened
+        self._opened = self._open()
+        if not self._opened:
+            return False
+        self._thread = threading.Thread(target=self._run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+        return True
+
+    def _put(self, item):
+        if self.drop_old:
+            while True:
+                try:
+                    self._queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        self._queue.get_nowait()
+                        self.frames_dropped += 1
+                    except queue.Empty:
+                        pass
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _run(self):
+        wall_start = time.time()
+        try:
+            while not self._stop_event.is_set():
+                frame, media_time = self._grab()
+                if frame is None:
+                    break
+                if media_time is None:
+                    timestamp = time.time()
+                else:
+                    timestamp = wall_start + media_time
+                    if self.realtime:
+                        delay = timestamp - time.time()
+                        if delay > 0:
+                            self._stop_event.wait(delay)
+                self._put((frame, timestamp))
+        finally:
+            self._put(None)
+            with self._close_lock:
+                self._reader_exited = True
+                close = self._close_on_exit
+            if close:
+                self._close()
+
+    def isOpened(self):
+        if self._thread is None:
+            self.start()
+        return self._opened and not self._finished
+
+    def read_timestamped(self, timeout=1.0):
+        """
+        取下一帧
+
+        返回:
+            (是否成功, 图像, 时间戳)
+        """
+        if self._thread is None and not self.start():
+            return False, None, None
+        if self._finished:
+            return False, None, None
+        try:
+            item = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return False, None, None
+        if item is None:
+            self._finished = True
+            return False, None, None
+        self.frames_read += 1
+        frame, timestamp = item
+        return True, frame, timestamp
+
+    def read(self):
+        """与 cv2.VideoCapture.read 相同的接口"""
+        success, frame, _ = self.read_timestamped()
+        return success, frame
+
+    def release(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            with self._close_lock:
+                # 读取线程仍卡在 _grab 中（如摄像头停止响应）时不能在它下面关闭来源，改由它退出时关闭
+                self._close_on_exit = not self._reader_exited
+            self._thread = None
+        if self._close_on_exit:
+            log_event(log, "frame_source.release_pending", "%(source)s: 读取线程未在 1 秒内退出，由其退出时关闭来源",
+                      logging.WARNING, source=type(self).__name__)
+        else:
+            self._close()
+        self._opened = False
+
+
+class CameraSource(FrameSource):
+    """摄像头设备，只保留最新帧"""
+
+    def __init__(self, index=0, width=None, height=None, buffer_size=1):
+        super().__init__(buffer_size=buffer_size, drop_old=True)
+        self.index = index
+        self.width = width
+        self.height = height
+        self.cap = None
+
+    def _open(self):
+        self.cap = cv2.VideoCapture(self.index)
+        if self.width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return self.cap.isOpened()
+
+    def _grab(self):
+        success, frame = self.cap.read()
+        return (frame, None) if success else (None, None)
+
+    def _close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class VideoFileSource(FrameSource):
+    """视频文件，按原始帧率（realtime=True）或尽快输出，不丢帧"""
+
+    def __init__(self, path, realtime=False, loop=False, buffer_size=8):
+        """
+        参数:
+            path: 视频文件路径
+            realtime: 是否按视频帧率输出
+            loop: 播放结束后是否从头循环
+        """
+        super().__init__(buffer_size=buffer_size, realtime=realtime)
+        self.path = path
+        self.loop = loop
+        self.cap = None
+        self.fps = 30.0
+        self._index = 0
+
+    def _open(self):
+        self.cap = cv2.VideoCapture(self.path)
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        if fps and fps > 0:
+            self.fps = fps
+        return self.cap.isOpened()
+
+    def _grab(self):
+        success, frame = self.cap.read()
+        if not success and self.loop and self._index > 0:
+            self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            success, frame = self.cap.read()
+        if not success:
+            return None, None
+        media_time = self._index / self.fps
+        self._index += 1
+        return frame, media_time
+
+    def _close(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+
+class ImageDirectorySource(FrameSource):
+    """按文件名顺序读取目录中的图片"""
+
+    def __init__(self, path, fps=30.0, realtime=False, loop=False, buffer_size=8):
+        super().__init__(buffer_size=buffer_size, realtime=realtime)
+        self.path = path
+        self.fps = fps
+        self.loop = loop
+        self.files = []
+        self._index = 0
+
+    def _open(self):
+        self.files = sorted(f for f in glob.glob(os.path.join(self.path, "*"))
+                            if f.lower().endswith(IMAGE_EXTENSIONS))
+        return bool(self.files)
+
+    def _grab(self):
+        while True:
+            position = self._index % len(self.files) if self.loop else self._index
+            if position >= len(self.files):
+                return None, None
+            frame = cv2.imread(self.files[position])
+            media_time = self._index / self.fps
+            self._index += 1
+            if frame is not None:
+                return frame, media_time
+            print(f"ImageDirectorySource: 无法读取 {self.files[position]}")
+
+
+class SyntheticSource(FrameSource):
+    """生成带移动圆形的合成图像，用于没有摄像头和录像时测量管线吞吐"""
+
+    def __init__(self, width=640, height=480, fps=30.0, frames=300, realtime=False, seed=0, buffer_size=8):
+        """
+        参数:
+            frames: 生成的帧数，None 表示无限
+        """
+        super().__init__(buffer_size=buffer_size, realtime=realtime)
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frames = frames
+        self.seed = seed
+        self._index = 0
+        self._background = None
+
+    def _open(self):
+        rng = np.random.default_rng(self.seed)
+        self._background = rng.integers(0, 60, (self.height, self.width, 3), dtype=np.uint8)
+        return True
+
+    def _grab(self):
+        if self.frames is not None and self._index >= self.frames:
+            return None, None
+        t = self._index / self.fps
+        frame = self._background.copy()
+        center = (int(self.width * (0.5 + 0.3 * np.cos(t))), int(self.height * (0.5 + 0.3 * np.sin(t))))
+        cv2.circle(frame, center, min(self.width, self.height) // 8, (120, 160, 220), -1)
+        self._index += 1
+        return frame, t
+
+
+def open_source(spec=0, realtime=None, **kwargs):
+    """
+    根据描述创建帧来源
+
+    参数:
+        spec: 摄像头序号（整数或数字字符串）、视频文件路径、图片目录、
+              "synthetic" 或 "synthetic:宽x高"，也可以直接传入 FrameSource
+        realtime: 文件类来源是否按原始帧率输出，默认 False（尽快输出）
+
+    返回:
+        FrameSource
+    """
+    if isinstance(spec, FrameSource):
+        return spec
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return CameraSource(int(spec), **kwargs)
+    realtime = bool(realtime)
+    if isinstance(spec, str) and spec.startswith("synthetic"):
+        if ":" in spec:
+            width, height = (int(v) for v in spec.split(":", 1)[1].split("x"))
+            kwargs.setdefault("width", width)
+            kwargs.setdefault("height", height)
+        return SyntheticSource(realtime=realtime, **kwargs)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, realtime=realtime, **kwargs)
+    return VideoFileSource(spec, realtime=realtime, **kwargs)
+
+
+if __name__ == "__main__":
+    # 测量各来源的预读吞吐
+    for spec in ("synthetic", "synthetic:1280x720"):
+        source = open_source(spec, frames=300)
+        start = time.perf_counter()
+        count = 0
+        while source.isOpened():
+            success, frame, timestamp = source.read_timestamped()
+            if not success:
+                break
+            count += 1
+        source.release()
+        elapsed = time.perf_counter() - start
+        print(f"{spec}: {count} 帧, {count / elapsed:.0f} FPS")
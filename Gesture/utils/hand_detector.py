@@ -0,0 +1,321 @@
+import collections
+import io
+import os
+import threading
+import time
+import zipfile
+from types import SimpleNamespace
+
+import numpy as np
+
+from utils.startup import LazyModule
+
+# MediaPipe 在第一次创建检测器时才导入
+mp = LazyModule("mediapipe")
+mp_hands = LazyModule("mediapipe.python.solutions.hands")
+vision = LazyModule("mediapipe.tasks.python.vision")
+base_options = LazyModule("mediapipe.tasks.python.core.base_options")
+landmark_pb2 = LazyModule("mediapipe.framework.formats.landmark_pb2")
+classification_pb2 = LazyModule("mediapipe.framework.formats.classification_pb2")
+
+# 手部检测后端: 统一为 submit(图像, 时间戳, 附带数据) 提交一帧、poll() 取回已完成的帧，
+# 检测结果与 mp.solutions.hands.Hands.process 的返回值结构相同（multi_hand_landmarks、multi_handedness），
+# 之后的滤波、识别、绘制和录制不需要区分后端。
+#
+# legacy: mp.solutions.hands.Hands.process，submit 时在调用线程中同步检测，每帧都有结果。
+# tasks:  MediaPipe Tasks HandLandmarker 的 LIVE_STREAM 模式，detect_async 立即返回，结果在 MediaPipe 的线程中回调；
+#         检测中的帧达到 max_in_flight 时新帧直接丢弃（计入 frames_dropped），调用线程从不等待检测。
+
+BACKENDS = ("legacy", "tasks")
+DEFAULT_TASK_MODEL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hand_landmarker.task")
+TASK_MODEL_URL = ("https://storage.googleapis.com/mediapipe-models/hand_landmarker/hand_landmarker/float16/1/"
+                  "hand_landmarker.task")
+
+
+class HandDetector:
+    """检测后端基类，子类实现 submit"""
+
+    synchronous = False   # submit 返回时这一帧是否已经有结果
+
+    def __init__(self):
+        self.frames_submitted = 0
+        self.frames_completed = 0
+        self.frames_dropped = 0
+        self.last_latency = None     # 最近一帧从提交到得到结果的时间(秒)
+        self._done = collections.deque()
+        self._condition = threading.Condition()
+
+    def submit(self, image_rgb, timestamp, context=None):
+        """
+        提交一帧 RGB 图像
+
+        参数:
+            timestamp: 帧时间(秒)，随结果一起返回
+            context: 随结果一起返回的任意数据（如用于绘制的 BGR 图像）
+
+        返回:
+            是否接受了这一帧（后端忙时返回 False，这一帧不会有结果）
+        """
+        raise NotImplementedError
+
+    @property
+    def in_flight(self):
+        """已提交、还没有结果的帧数"""
+        return 0
+
+    def _complete(self, timestamp, results, context, submitted):
+        with self._condition:
+            self._done.append((timestamp, results, context))
+            self.frames_completed += 1
+            self.last_latency = time.perf_counter() - submitted
+            self._condition.notify_all()
+
+    def poll(self):
+        """
+        取回已完成的帧，不等待
+
+        返回:
+            [(时间戳, 检测结果, context), ...]，按提交顺序
+        """
+        with self._condition:
+            done = list(self._done)
+            self._done.clear()
+        return done
+
+    def drain(self, timeout=1.0):
+        """等待所有已提交的帧完成（最多 timeout 秒），返回 poll 的结果"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self.in_flight and time.monotonic() < deadline:
+                self._condition.wait(max(deadline - time.monotonic(), 0.0))
+        return self.poll()
+
+    def warm_up(self, image_shape=(480, 640, 3)):
+        """在一帧空白图像上检测一次（首次检测比之后慢数倍），结果丢弃"""
+        self.submit(np.zeros(image_shape, dtype=np.uint8), 0.0)
+        self.drain(timeout=10.0)
+        self.frames_submitted = self.frames_completed = self.frames_dropped = 0
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LegacyHandDetector(HandDetector):
+    """mp.solutions.hands.Hands，同步检测"""
+
+    synchronous = True
+
+    def __init__(self, max_num_hands=2, min_detection_confidence=0.5, min_tracking_confidence=0.5):
+        super().__init__()
+        self._hands = mp_hands.Hands(
+            static_image_mode=False,
+            max_num_hands=max_num_hands,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence)
+
+    def submit(self, image_rgb, timestamp, context=None):
+        self.frames_submitted += 1
+        submitted = time.perf_counter()
+        self._complete(timestamp, self._hands.process(image_rgb), context, submitted)
+        return True
+
+    def close(self):
+        self._hands.close()
+
+
+def bundled_task_model():
+    """
+    用 mediapipe 包自带的手掌检测和关键点模型（legacy 后端使用的同一组模型）打包成 HandLandmarker 的模型包
+
+    返回:
+        .task 文件内容(bytes)，可作为 BaseOptions.model_asset_buffer
+    """
+    modules = os.path.join(os.path.dirname(mp.__file__), "modules")
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as bundle:
+        bundle.write(os.path.join(modules, "palm_detection", "palm_detection_full.tflite"), "hand_detector.tflite")
+        bundle.write(os.path.join(modules, "hand_landmark", "hand_landmark_full.tflite"),
+                     "hand_landmarks_detector.tflite")
+    return buffer.getvalue()
+
+
+def to_solution_results(result):
+    """把 HandLandmarkerResult 转换为与 Hands.process 返回值结构相同的对象"""
+    if not result.hand_landmarks:
+        return SimpleNamespace(multi_hand_landmarks=None, multi_hand_world_landmarks=None, multi_handedness=None)
+    landmarks, world_landmarks, handedness = [], [], []
+    for hand in result.hand_landmarks:
+        landmarks.append(landmark_pb2.NormalizedLandmarkList(
+            landmark=[landmark_pb2.NormalizedLandmark(x=p.x, y=p.y, z=p.z) for p in hand]))
+    for hand in result.hand_world_landmarks:
+        world_landmarks.append(landmark_pb2.LandmarkList(
+            landmark=[landmark_pb2.Landmark(x=p.x, y=p.y, z=p.z) for p in hand]))
+    for categories in result.handedness:
+        handedness.append(classification_pb2.ClassificationList(classification=[
+            classification_pb2.Classification(index=c.index, score=c.score, label=c.category_name)
+            for c in categories]))
+    return SimpleNamespace(multi_hand_landmarks=landmarks, multi_hand_world_landmarks=world_landmarks or None,
+                           multi_handedness=handedness)
+
+
+class LiveStreamHandDetector(HandDetector):
+    """MediaPipe Tasks HandLandmarker（LIVE_STREAM 模式），异步检测，忙时丢帧"""
+
+    def __init__(self, model_path=None, max_num_hands=2, min_detection_confidence=0.5,
+                 min_tracking_confidence=0.5, max_in_flight=1, stale_timeout=1.0):
+        """
+        参数:
+            model_path: hand_landmarker.task 路径；None 时使用 DEFAULT_TASK_MODEL，
+                        该文件也不存在时用 mediapipe 包自带的模型打包（见 bundled_task_model）
+            max_in_flight: 同时在检测中的最大帧数，达到时新帧丢弃
+            stale_timeout: 超过该时间(秒)仍没有回调的帧视为被 MediaPipe 丢弃，不再等待
+        """
+        super().__init__()
+        self.max_in_flight = max_in_flight
+        self.stale_timeout = stale_timeout
+        self._pending = {}          # 毫秒时间戳 -> (帧时间, context, 提交时间)
+        self._last_timestamp_ms = -1
+        if model_path is None and os.path.exists(DEFAULT_TASK_MODEL):
+            model_path = DEFAULT_TASK_MODEL
+        if model_path is not None:
+            if not os.path.exists(model_path):
+                raise FileNotFoundError(f"找不到 HandLandmarker 模型 {model_path}，可从 {TASK_MODEL_URL} 下载")
+            model = base_options.BaseOptions(model_asset_path=model_path)
+        else:
+            model = base_options.BaseOptions(model_asset_buffer=bundled_task_model())
+        options = vision.HandLandmarkerOptions(
+            base_options=model,
+            running_mode=vision.RunningMode.LIVE_STREAM,
+            num_hands=max_num_hands,
+            min_hand_detection_confidence=min_detection_confidence,
+            min_hand_presence_confidence=min_tracking_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            result_callback=self._on_result)
+        self._landmarker = vision.HandLandmarker.create_from_options(options)
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    def _expire(self, now):
+        """丢弃超时没有回调的帧（调用时持有锁）"""
+        for timestamp_ms in [k for k, (_, _, submitted) in self._pending.items()
+                             if now - submitted > self.stale_timeout]:
+            del self._pending[timestamp_ms]
+            self.frames_dropped += 1
+
+    def submit(self, image_rgb, timestamp, context=None):
+        self.frames_submitted += 1
+        now = time.perf_counter()
+        with self._condition:
+            self._expire(now)
+            if len(self._pending) >= self.max_in_flight:
+                self.frames_dropped += 1
+                return False
+            # detect_async 要求毫秒时间戳严格递增；回放和同一毫秒内的帧顺延 1 毫秒
+            timestamp_ms = max(int(round(timestamp * 1000)), self._last_timestamp_ms + 1)
+            self._last_timestamp_ms = timestamp_ms
+            self._pending[timestamp_ms] = (timestamp, context, now)
+        image = mp.Image(image_format=mp.ImageFormat.SRGB, data=np.ascontiguousarray(image_rgb))
+        self._landmarker.detect_async(image, timestamp_ms)
+        return True
+
+    def _on_result(self, result, output_image, timestamp_ms):
+        # 在 MediaPipe 的线程中调用
+        results = to_solution_results(result)
+        with self._condition:
+            pending = self._pending.pop(timestamp_ms, None)
+        if pending is not None:
+            timestamp, context, submitted = pending
+            self._complete(timestamp, results, context, submitted)
+
+    def close(self):
+        self._landmarker.close()
+        with self._condition:
+            self._pending.clear()
+            self._condition.notify_all()
+
+
+def create_hand_detector(backend="legacy", model_path=None, **kwargs):
+    """
+    创建检测后端
+
+    参数:
+        backend: "legacy" 或 "tasks"，见本模块开头的说明
+        model_path: tasks 后端的 hand_landmarker.task 路径，见 LiveStreamHandDetector
+        kwargs: max_num_hands、min_detection_confidence、min_tracking_confidence 等
+    """
+    if backend == "legacy":
+        return LegacyHandDetector(**kwargs)
+    if backend == "tasks":
+        return LiveStreamHandDetector(model_path, **kwargs)
+    raise ValueError(f"未知的检测后端 {backend}，可选 {BACKENDS}")
+
+
+def measure_backend(backend, source="synthetic", realtime=True, work=0.0, model_path=None):
+    """
+    在帧来源上运行一个检测后端，测量吞吐和延迟
+
+    参数:
+        source: 帧来源（录像文件、图片目录或 "synthetic"），见 utils.frame_source
+        realtime: 是否按原始帧率读取（模拟摄像头）；False 时尽快读取
+        work: 每个检测结果之后模拟的识别耗时(秒)，在调用线程中忙等
+
+    返回:
+        {"frames", "completed", "dropped", "fps": 完成检测的帧率, "submit_ms": 调用线程每帧阻塞在 submit 中的时间,
+         "latency_ms": 帧时间到调用线程处理结果的延迟中位数}
+    """
+    from utils.frame_source import open_source
+    cv2 = LazyModule("cv2")
+    detector = create_hand_detector(backend, model_path)
+    detector.warm_up()
+    cap = open_source(source, realtime=realtime)
+    submit_times, latencies = [], []
+    read_timeout = 1.0 if detector.synchronous else 0.002
+
+    def handle(detections):
+        for timestamp, _, _ in detections:
+            latencies.append(time.time() - timestamp)
+            end = time.perf_counter() + work
+            while time.perf_counter() < end:
+                pass
+
+    start = time.perf_counter()
+    with detector:
+        while True:
+            success, image, timestamp = cap.read_timestamped(timeout=read_timeout)
+            if not success:
+                if not cap.isOpened():
+                    break
+                handle(detector.poll())
+                continue
+            image_rgb = cv2.cvtColor(cv2.flip(image, 1), cv2.COLOR_BGR2RGB)
+            submitted = time.perf_counter()
+            detector.submit(image_rgb, timestamp)
+            submit_times.append(time.perf_counter() - submitted)
+            handle(detector.poll())
+        handle(detector.drain())
+        elapsed = time.perf_counter() - start
+    cap.release()
+    return {"frames": detector.frames_submitted, "completed": detector.frames_completed,
+            "dropped": detector.frames_dropped, "fps": detector.frames_completed / elapsed,
+            "submit_ms": float(np.median(submit_times)) * 1000,
+            "latency_ms": float(np.median(latencies)) * 1000 if latencies else None}
+
+
+if __name__ == "__main__":
+    # 比较两个后端: python -m utils.hand_detector [录像文件] [每帧识别耗时(毫秒)]
+    import sys
+    source = sys.argv[1] if len(sys.argv) > 1 else "synthetic"
+    work = float(sys.argv[2]) / 1000 if len(sys.argv) > 2 else 0.0
+    for backend in BACKENDS:
+        result = measure_backend(backend, source, work=work)
+        print(f"{backend}: {result['completed']}/{result['frames']} 帧 (丢弃 {result['dropped']}), "
+              f"{result['fps']:.1f} FPS, 调用线程每帧阻塞 {result['submit_ms']:.2f} ms, "
+              f"延迟中位数 {result['latency_ms']:.1f} ms")
@@ -0,0 +1,116 @@
+import itertools
+import time
+
+import numpy as np
+
+
+class HandIdentityTracker:
+    """
+    为检测到的手分配跨帧稳定的ID
+
+    MediaPipe 结果中手的顺序在双手交叉或重新进入画面时会交换。这里按手部中心距离加上
+    左右手标签不一致的惩罚做最优匹配，短时间消失的手在 reid_timeout 内重新出现时沿用原ID。
+    ID 从0开始取最小的空闲值，两只手时始终为0和1。
+    """
+
+    def __init__(self, max_distance=0.25, handedness_penalty=0.1, reid_timeout=0.5, max_hands=2):
+        """
+        参数:
+            max_distance: 匹配代价超过该值时视为新出现的手（归一化坐标）
+            handedness_penalty: 左右手标签与跟踪记录不一致时增加的代价
+            reid_timeout: 手消失后保留其ID的时间(秒)
+            max_hands: ID 的数量上限，没有空闲ID时接管最久未出现的未匹配跟踪
+        """
+        self.max_distance = max_distance
+        self.handedness_penalty = handedness_penalty
+        self.reid_timeout = reid_timeout
+        self.max_hands = max_hands
+        self.tracks = {}   # {id: {"center": (x, y), "handedness": 标签, "last_seen": 时间}}
+        self.reordered_frames = 0   # ID 与 MediaPipe 原始顺序不一致的帧数（见指标和回放结果）
+
+    def reset(self):
+        self.tracks.clear()
+
+    @staticmethod
+    def _hand_info(results, i):
+        hand_landmarks = results.multi_hand_landmarks[i]
+        xs = [lm.x for lm in hand_landmarks.landmark]
+        ys = [lm.y for lm in hand_landmarks.landmark]
+        center = np.array([sum(xs) / len(xs), sum(ys) / len(ys)])
+        handedness = None
+        if getattr(results, "multi_handedness", None) and i < len(results.multi_handedness):
+            handedness = results.multi_handedness[i].classification[0].label
+        return center, handedness
+
+    def _best_assignment(self, cost):
+        """对很小的代价矩阵穷举求最优匹配，返回 [(检测索引, 跟踪索引), ...]"""
+        n_det, n_trk = cost.shape
+        best, best_pairs = None, []
+        if n_det <= n_trk:
+            for perm in itertools.permutations(range(n_trk), n_det):
+                pairs = list(zip(range(n_det), perm))
+                total = sum(min(cost[d, t], self.max_distance) for d, t in pairs)
+                if best is None or total < best:
+                    best, best_pairs = total, pairs
+        else:
+            for perm in itertools.permutations(range(n_det), n_trk):
+                pairs = list(zip(perm, range(n_trk)))
+                total = sum(min(cost[d, t], self.max_distance) for d, t in pairs)
+                if best is None or total < best:
+                    best, best_pairs = total, pairs
+        return [(d, t) for d, t in best_pairs if cost[d, t] <= self.max_distance]
+
+    def assign(self, results, timestamp=None):
+        """
+        为本帧的每只手分配ID
+
+        参数:
+            results: MediaPipe 手部检测结果
+            timestamp: 时间(秒)，默认为当前时间
+
+        返回:
+            与 results.multi_hand_landmarks 顺序一致的ID列表
+        """
+        if timestamp is None:
+            timestamp = time.time()
+
+        # 丢弃超时的跟踪
+        for track_id in [k for k, t in self.tracks.items() if timestamp - t["last_seen"] > self.reid_timeout]:
+            del self.tracks[track_id]
+
+        if not results.multi_hand_landmarks:
+            return []
+
+        detections = [self._hand_info(results, i) for i in range(len(results.multi_hand_landmarks))]
+        track_ids = list(self.tracks)
+        ids = [None] * len(detections)
+
+        if track_ids:
+            cost = np.empty((len(detections), len(track_ids)))
+            for d, (center, handedness) in enumerate(detections):
+                for t, track_id in enumerate(track_ids):
+                    track = self.tracks[track_id]
+                    cost[d, t] = np.linalg.norm(center - track["center"])
+                    if handedness and track["handedness"] and handedness != track["handedness"]:
+                        cost[d, t] += self.handedness_penalty
+            for d, t in self._best_assignment(cost):
+                ids[d] = track_ids[t]
+
+        # 未匹配的手分配最小的空闲ID
+        for d in range(len(detections)):
+            if ids[d] is None:
+                used = set(self.tracks) | {i for i in ids if i is not None}
+                free = next(i for i in itertools.count() if i not in used)
+                if free >= self.max_hands:
+                    # 没有空闲ID时接管最久未出现、且本帧未匹配的跟踪
+                    stale = [k for k in self.tracks if k not in ids]
+                    if stale:
+                        free = min(stale, key=lambda k: self.tracks[k]["last_seen"])
+                ids[d] = free
+
+        for d, (center, handedness) in enumerate(detections):
+            self.tracks[ids[d]] = {"center": center, "handedness": handedness, "last_seen": timestamp}
+
+        if any(track_id != d for d, track_id in enumerate(ids)):
+            self.reordered_frames += 1
+        return ids
@@ -0,0 +1,131 @@
+import numpy as np
+
+
+class KalmanTracker:
+    """
+    匀速/匀加速卡尔曼跟踪器，x、y、z 三个轴相互独立，同时向量化计算
+
+    状态为每个轴的 [位置, 速度] (cv) 或 [位置, 速度, 加速度] (ca)。
+    """
+
+    def __init__(self, model="cv", process_noise=10.0, measurement_noise=1e-4):
+        """
+        参数:
+            model: "cv" 匀速模型 或 "ca" 匀加速模型
+            process_noise: 过程噪声强度（cv为加速度、ca为加加速度的白噪声谱密度）
+            measurement_noise: 位置测量噪声方差
+        """
+        if model not in ("cv", "ca"):
+            raise ValueError(f"未知的运动模型: {model}")
+        self.model = model
+        self.order = 2 if model == "cv" else 3
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.x = None        # 状态 (3, order)
+        self.P = None        # 协方差 (3, order, order)
+        self.t_prev = None
+
+    def _transition(self, dt):
+        """状态转移矩阵"""
+        if self.order == 2:
+            return np.array([[1.0, dt], [0.0, 1.0]])
+        return np.array([[1.0, dt, 0.5 * dt * dt], [0.0, 1.0, dt], [0.0, 0.0, 1.0]])
+
+    def _process_covariance(self, dt):
+        """连续白噪声模型离散化后的过程噪声"""
+        q = self.process_noise
+        if self.order == 2:
+            return q * np.array([[dt ** 3 / 3, dt ** 2 / 2], [dt ** 2 / 2, dt]])
+        return q * np.array([
+            [dt ** 5 / 20, dt ** 4 / 8, dt ** 3 / 6],
+            [dt ** 4 / 8, dt ** 3 / 3, dt ** 2 / 2],
+            [dt ** 3 / 6, dt ** 2 / 2, dt],
+        ])
+
+    def update(self, position, timestamp):
+        """
+        用一次位置测量更新状态
+
+        参数:
+            position: (3,) 位置
+            timestamp: 测量时间(秒)
+        """
+        z = np.asarray(position, dtype=np.float64)
+        if self.x is None:
+            self.x = np.zeros((3, self.order))
+            self.x[:, 0] = z
+            self.P = np.tile(np.diag([self.measurement_noise] + [1.0] * (self.order - 1)), (3, 1, 1))
+            self.t_prev = timestamp
+            return
+
+        dt = timestamp - self.t_prev
+        if dt > 0:
+            F = self._transition(dt)
+            self.x = self.x @ F.T
+            self.P = F @ self.P @ F.T + self._process_covariance(dt)
+            self.t_prev = timestamp
+
+        # H = [1, 0, (0)]，只测量位置
+        S = self.P[:, 0, 0] + self.measurement_noise           # (3,)
+        K = self.P[:, :, 0] / S[:, None]                       # (3, order)
+        innovation = z - self.x[:, 0]
+        self.x = self.x + K * innovation[:, None]
+        self.P = self.P - K[:, :, None] * self.P[:, 0, :][:, None, :]
+
+    def predict(self, lookahead=0.0):
+        """
+        外推到最后一次测量之后 lookahead 秒
+
+        返回:
+            (位置 (3,), 速度 (3,))
+        """
+        if self.x is None:
+            return None, None
+        x = self.x @ self._transition(lookahead).T if lookahead > 0 else self.x
+        return x[:, 0].copy(), x[:, 1].copy()
+
+
+class HandPredictor:
+    """按手分别维护卡尔曼跟踪器，输出外推后的位置和速度"""
+
+    def __init__(self, lookahead=0.05, model="cv", process_noise=10.0, measurement_noise=1e-4,
+                 reset_timeout=0.5):
+        """
+        参数:
+            lookahead: 外推时间(秒)，通常设为测得的管线延迟
+            model, process_noise, measurement_noise: 见 KalmanTracker
+            reset_timeout: 某只手超过这个时间(秒)没有出现时重新初始化
+        """
+        self.lookahead = lookahead
+        self.model = model
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+        self.reset_timeout = reset_timeout
+        self.trackers = {}
+        self.last_seen = {}
+
+    def update(self, key, position, timestamp):
+        """
+        更新一只手并返回外推结果
+
+        参数:
+            key: 手的键
+            position: (x, y, z)
+            timestamp: 时间(秒)
+
+        返回:
+            (外推位置 (3,), 速度 (3,))
+        """
+        tracker = self.trackers.get(key)
+        if tracker is None or timestamp - self.last_seen.get(key, timestamp) > self.reset_timeout:
+            tracker = KalmanTracker(self.model, self.process_noise, self.measurement_noise)
+            self.trackers[key] = tracker
+        self.last_seen[key] = timestamp
+        tracker.update(position, timestamp)
+        return tracker.predict(self.lookahead)
+
+    def forget(self, timestamp):
+        """丢弃长时间未出现的手"""
+        for key in [k for k, t in self.last_seen.items() if timestamp - t > self.reset_timeout]:
+            del self.trackers[key]
+            del self.last_seen[key]
@@ -0,0 +1,315 @@
+import json
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# 本地关键点总线: 识别进程把每帧的关键点、手势、模型概率和时间戳写入共享内存中的环形缓冲区，
+# 任意数量的本地进程（发送器、录制、调试查看器）直接映射同一块内存读取，不需要自己的摄像头和 MediaPipe，
+# 也不经过管道或套接字复制。
+#
+# 布局: 固定大小的头部（帧序号、元数据版本和 JSON 元数据）后接 capacity 个定长槽位，第 n 帧写入 n % capacity 号槽位。
+# 每个槽位带一个序号（顺序锁）: 写入前置为 2n+1，写完置为 2n+2，读者复制槽位前后各读一次序号，
+# 两次相同且等于 2n+2 才说明读到的是完整的第 n 帧；读者落后超过 capacity 帧时旧帧已被覆盖，计入 missed。
+# 只有一个写者，读者从不写共享内存，所以不需要跨进程的锁。
+
+DEFAULT_NAME = "gesture_landmarks"
+MAX_HANDS = 2
+NAME_SIZE = 32          # 手势名的最大 UTF-8 字节数
+METADATA_SIZE = 4096    # 元数据（各模型的类别名）JSON 的最大字节数
+MAGIC = b"GSTRBUS1"
+
+_HEADER = np.dtype([
+    ("magic", "S8"),
+    ("capacity", "<u4"),
+    ("max_classes", "<u4"),
+    ("sequence", "<u8"),            # 已完整写入的帧数
+    ("metadata_version", "<u4"),
+    ("metadata_size", "<u4"),
+    ("metadata", f"S{METADATA_SIZE}"),
+], align=True)
+
+
+def slot_dtype(max_classes):
+    """一帧的槽位结构，probability_hands 为 0 表示本帧没有模型概率（原型或级联直接给出结果、没有检测到手）"""
+    return np.dtype([
+        ("sequence", "<u8"),
+        ("timestamp", "<f8"),       # 帧时间(秒)
+        ("published", "<f8"),       # 写入时的 time.monotonic()，跨进程可比，用于计算读者延迟
+        ("hand_count", "<u1"),
+        ("probability_hands", "<u1"),
+        ("hand_ids", "<i4", (MAX_HANDS,)),
+        ("handedness", "S8", (MAX_HANDS,)),
+        ("landmarks", "<f4", (MAX_HANDS, 21, 3)),   # 归一化坐标（滤波后）
+        ("raw_gesture", f"S{NAME_SIZE}"),
+        ("gesture", f"S{NAME_SIZE}"),
+        ("probabilities", "<f4", (max_classes,)),
+    ], align=True)
+
+
+def _encode_name(name):
+    # 按字符边界截断，不把多字节字符（如中文手势名）切成两半
+    return (name or "").encode('utf-8')[:NAME_SIZE].decode('utf-8', errors='ignore').encode('utf-8')
+
+
+_created = set()   # 本进程创建的总线名称，由写者负责删除
+
+
+def _attach(name):
+    """打开已存在的共享内存，不让本进程的 resource_tracker 在退出时删除它"""
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name)
+        if os.name == "posix" and name not in _created:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+class LandmarkBus:
+    """共享内存总线的写者（识别进程）"""
+
+    def __init__(self, name=DEFAULT_NAME, capacity=64, max_classes=32):
+        """
+        参数:
+            name: 共享内存名称，读者用同一名称连接；已存在同名的残留内存（上次异常退出）时替换
+            capacity: 环形缓冲区的帧数，读者落后不超过这么多帧时不丢帧
+            max_classes: 每帧可保存的模型类别数上限
+        """
+        self.name = name
+        self.capacity = capacity
+        self.max_classes = max_classes
+        self.frame_dtype = slot_dtype(max_classes)
+        size = _HEADER.itemsize + capacity * self.frame_dtype.itemsize
+        try:
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        _created.add(name)
+        self._header = np.ndarray((), _HEADER, self._shm.buf, 0)
+        self._slots = np.ndarray((capacity,), self.frame_dtype, self._shm.buf, _HEADER.itemsize)
+        self._slots["sequence"] = 0
+        self._header["capacity"] = capacity
+        self._header["max_classes"] = max_classes
+        self._header["sequence"] = 0
+        self._metadata = {"classes": {}}
+        self._write_metadata()
+        # 最后写入 magic，读者看到 magic 时头部已完整
+        self._header["magic"] = MAGIC
+        self.sequence = 0
+
+    def _write_metadata(self):
+        data = json.dumps(self._metadata, ensure_ascii=False).encode('utf-8')
+        if len(data) > METADATA_SIZE:
+            raise ValueError(f"总线元数据超过 {METADATA_SIZE} 字节")
+        self._header["metadata"] = data
+        self._header["metadata_size"] = len(data)
+        self._header["metadata_version"] += 1
+
+    def set_classes(self, hands, classes):
+        """设置单手（hands=1）或双手（hands=2）模型的类别名，与每帧 probabilities 的顺序一致"""
+        classes = [str(c) for c in classes]
+        if len(classes) > self.max_classes:
+            raise ValueError(f"类别数 {len(classes)} 超过 max_classes={self.max_classes}")
+        self._metadata["classes"][str(hands)] = classes
+        self._write_metadata()
+
+    def publish(self, timestamp, landmarks=(), hand_ids=(), handedness=(), raw_gesture=None, gesture=None,
+                probabilities=None):
+        """
+        写入一帧
+
+        参数:
+            timestamp: 帧时间(秒)
+            landmarks: 每只手的 (21, 3) 归一化坐标，最多 MAX_HANDS 只
+            hand_ids: 每只手的稳定ID
+            handedness: 每只手的 "Left"/"Right"
+            raw_gesture, gesture: 本帧的原始识别结果和稳定后的手势
+            probabilities: 本帧模型输出的概率（按 set_classes 的类别顺序），None 表示没有运行模型
+
+        返回:
+            本帧的序号（从 0 开始）
+        """
+        n = self.sequence
+        slot = self._slots[n % self.capacity]
+        slot["sequence"] = 2 * n + 1
+        count = min(len(landmarks), MAX_HANDS)
+        slot["timestamp"] = timestamp
+        slot["hand_count"] = count
+        if count:
+            slot["landmarks"][:count] = np.asarray(landmarks[:count])
+            slot["hand_ids"][:count] = hand_ids[:count]
+            slot["handedness"][:count] = [h.encode('utf-8') for h in handedness[:count]] \
+                if len(handedness) >= count else b""
+        slot["raw_gesture"] = _encode_name(raw_gesture)
+        slot["gesture"] = _encode_name(gesture)
+        if probabilities is None:
+            slot["probability_hands"] = 0
+        else:
+            slot["probability_hands"] = count
+            slot["probabilities"][:len(probabilities)] = probabilities
+            slot["probabilities"][len(probabilities):] = 0
+        slot["published"] = time.monotonic()
+        slot["sequence"] = 2 * n + 2
+        self.sequence = n + 1
+        self._header["sequence"] = self.sequence
+        return n
+
+    def close(self):
+        """释放并删除共享内存，之后已连接的读者读不到新帧"""
+        if self._shm is None:
+            return
+        self._header = self._slots = None
+        self._shm.close()
+        self._shm.unlink()
+        self._shm = None
+        _created.discard(self.name)
+
+
+class LandmarkBusReader:
+    """共享内存总线的读者，可以在任意数量的本地进程中同时使用"""
+
+    def __init__(self, name=DEFAULT_NAME, from_start=False):
+        """
+        参数:
+            name: 与 LandmarkBus 相同的共享内存名称，不存在时抛出 FileNotFoundError
+            from_start: 从缓冲区中最旧的帧开始读，默认只读连接之后的新帧
+        """
+        self._shm = _attach(name)
+        self._header = np.ndarray((), _HEADER, self._shm.buf, 0)
+        if self._header["magic"] != MAGIC:
+            self.close()
+            raise ValueError(f"共享内存 {name} 不是关键点总线")
+        self.capacity = int(self._header["capacity"])
+        self.frame_dtype = slot_dtype(int(self._header["max_classes"]))
+        self._slots = np.ndarray((self.capacity,), self.frame_dtype, self._shm.buf, _HEADER.itemsize)
+        head = int(self._header["sequence"])
+        self.next_sequence = max(head - self.capacity, 0) if from_start else head
+        self.missed = 0
+        self._metadata_version = None
+        self._metadata = {}
+
+    @property
+    def head(self):
+        """写者已完整写入的帧数"""
+        return int(self._header["sequence"])
+
+    def classes(self, hands):
+        """单手或双手模型的类别名，与 probabilities 的顺序一致；元数据更新后自动重新读取"""
+        version = int(self._header["metadata_version"])
+        if version != self._metadata_version:
+            size = int(self._header["metadata_size"])
+            self._metadata = json.loads(self._header["metadata"].tobytes()[:size].decode('utf-8'))
+            self._metadata_version = version
+        return self._metadata.get("classes", {}).get(str(hands), [])
+
+    def _copy(self, n):
+        """复制第 n 帧的槽位（约 1 KB），已被覆盖时返回 None"""
+        slot = self._slots[n % self.capacity]
+        expected = 2 * n + 2
+        while True:
+            before = int(slot["sequence"])
+            if before != expected:
+                return None
+            frame = slot.copy()
+            if int(slot["sequence"]) == before:
+                return frame
+
+    def read(self, max_frames=None):
+        """
+        读取上次调用之后的新帧
+
+        返回:
+            帧列表（slot_dtype 的结构化标量），写者覆盖了尚未读取的帧时跳过它们并累加 missed
+        """
+        head = self.head
+        if head - self.next_sequence > self.capacity:
+            self.missed += head - self.capacity - self.next_sequence
+            self.next_sequence = head - self.capacity
+        stop = head if max_frames is None else min(head, self.next_sequence + max_frames)
+        frames = []
+        for n in range(self.next_sequence, stop):
+            frame = self._copy(n)
+            if frame is None:
+                self.missed += 1
+            else:
+                frames.append(frame)
+        self.next_sequence = stop
+        return frames
+
+    def latest(self):
+        """最新的一帧，不影响 read 的位置；还没有帧时返回 None"""
+        head = self.head
+        while head:
+            frame = self._copy(head - 1)
+            if frame is not None:
+                return frame
+            head = self.head
+        return None
+
+    def wait(self, timeout=None, poll_interval=0.001):
+        """等待并返回新帧，超时返回空列表"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.head == self.next_sequence:
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+            time.sleep(poll_interval)
+        return self.read()
+
+    def close(self):
+        if self._shm is None:
+            return
+        self._header = self._slots = None
+        self._shm.close()
+        self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def frame_landmarks(frame):
+    """一帧中每只手的 (手部ID, handedness, (21, 3) 归一化坐标)"""
+    count = int(frame["hand_count"])
+    return [(int(frame["hand_ids"][i]), frame["handedness"][i].decode('utf-8', errors='replace'), frame["landmarks"][i])
+            for i in range(count)]
+
+
+def frame_probabilities(frame, reader):
+    """一帧的 {类别: 概率}，本帧没有运行模型时为空字典"""
+    hands = int(frame["probability_hands"])
+    if not hands:
+        return {}
+    classes = reader.classes(hands)
+    return dict(zip(classes, frame["probabilities"][:len(classes)].tolist()))
+
+
+if __name__ == "__main__":
+    # 连接正在运行的识别进程（Gesture_recognition.py --bus），打印手势变化和读取延迟
+    name = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_NAME
+    with LandmarkBusReader(name) as reader:
+        print(f"已连接总线 {name}（{reader.capacity} 帧），按 Ctrl+C 停止")
+        last = None
+        lags = []
+        try:
+            while True:
+                for frame in reader.wait(timeout=1.0):
+                    lags.append(time.monotonic() - float(frame["published"]))
+                    gesture = frame["gesture"].decode('utf-8', errors='replace')
+                    if gesture != last:
+                        print(f"[{float(frame['timestamp']):.3f}] {gesture} "
+                              f"(手数 {int(frame['hand_count'])}, 概率 {frame_probabilities(frame, reader)})")
+                        last = gesture
+        except KeyboardInterrupt:
+            pass
+        if lags:
+            print(f"读取 {len(lags)} 帧, 丢失 {reader.missed} 帧, 延迟中位数 {np.median(lags) * 1e6:.0f} us, "
+                  f"最大 {max(lags) * 1e6:.0f} us")
@@ -0,0 +1,153 @@
+import math
+import time
+
+import numpy as np
+
+
+def landmarks_to_array(hand_landmarks):
+    """把 MediaPipe 的 21 个关键点转换为 (21, 3) 数组"""
+    return np.array([(lm.x, lm.y, lm.z) for lm in hand_landmarks.landmark])
+
+
+class OneEuroFilter:
+    """
+    One-Euro 自适应低通滤波器，对整个数组向量化计算
+
+    静止时截止频率接近 min_cutoff，抑制抖动；移动越快截止频率越高，减少延迟。
+    速度按最后一维的模长计算，(21, 3) 的输入即每个关键点一个速度。
+    """
+
+    def __init__(self, min_cutoff=1.0, beta=1.0, d_cutoff=1.0):
+        """
+        参数:
+            min_cutoff: 最小截止频率(Hz)，越小静止时越平滑
+            beta: 速度系数，越大快速移动时延迟越小
+            d_cutoff: 速度估计的截止频率(Hz)
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset()
+
+    def reset(self):
+        """清除滤波状态"""
+        self.x_prev = None
+        self.dx_prev = None
+        self.t_prev = None
+
+    @staticmethod
+    def _alpha(dt, cutoff):
+        tau = 1.0 / (2 * math.pi * cutoff)
+        return 1.0 / (1.0 + tau / dt)
+
+    def __call__(self, x, timestamp):
+        """
+        滤波一个新样本
+
+        参数:
+            x: 新样本数组
+            timestamp: 样本时间(秒)
+
+        返回:
+            滤波后的数组
+        """
+        x = np.asarray(x, dtype=np.float64)
+        if self.x_prev is None:
+            self.x_prev = x.copy()
+            self.dx_prev = np.zeros_like(x)
+            self.t_prev = timestamp
+            return x
+
+        dt = timestamp - self.t_prev
+        if dt <= 0:
+            # 时间戳未前进时按30fps估计，避免除零
+            dt = 1.0 / 30.0
+
+        dx = (x - self.x_prev) / dt
+        a_d = self._alpha(dt, self.d_cutoff)
+        dx_hat = a_d * dx + (1 - a_d) * self.dx_prev
+
+        speed = np.linalg.norm(dx_hat, axis=-1, keepdims=True) if x.ndim > 1 else np.abs(dx_hat)
+        cutoff = self.min_cutoff + self.beta * speed
+        tau = 1.0 / (2 * math.pi * cutoff)
+        a = 1.0 / (1.0 + tau / dt)
+        x_hat = a * x + (1 - a) * self.x_prev
+
+        self.x_prev = x_hat
+        self.dx_prev = dx_hat
+        self.t_prev = timestamp
+        return x_hat
+
+
+class LandmarkFilter:
+    """按手分别维护 One-Euro 滤波器，对检测结果中的 21x3 关键点滤波"""
+
+    def __init__(self, min_cutoff=1.0, beta=1.0, d_cutoff=1.0, reset_timeout=0.5):
+        """
+        参数:
+            min_cutoff, beta, d_cutoff: 见 OneEuroFilter
+            reset_timeout: 某只手超过这个时间(秒)没有出现时丢弃其滤波状态
+        """
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+        self.reset_timeout = reset_timeout
+        self.filters = {}     # {手的键: OneEuroFilter}
+        self.last_seen = {}   # {手的键: 最后出现的时间}
+
+    def reset(self):
+        """清除所有手的滤波状态"""
+        self.filters.clear()
+        self.last_seen.clear()
+
+    def filter(self, key, landmarks, timestamp):
+        """
+        对一只手的关键点滤波
+
+        参数:
+            key: 手的键（如手的索引或跟踪ID）
+            landmarks: (21, 3) 数组
+            timestamp: 时间(秒)
+
+        返回:
+            滤波后的 (21, 3) 数组
+        """
+        one_euro = self.filters.get(key)
+        if one_euro is None or timestamp - self.last_seen.get(key, timestamp) > self.reset_timeout:
+            one_euro = OneEuroFilter(self.min_cutoff, self.beta, self.d_cutoff)
+            self.filters[key] = one_euro
+        self.last_seen[key] = timestamp
+        return one_euro(landmarks, timestamp)
+
+    def filter_results(self, results, timestamp=None, keys=None):
+        """
+        对 MediaPipe 检测结果中的所有手滤波，并把滤波后的坐标写回结果对象
+
+        后续的手势分类、位置发送和绘制都直接使用写回后的结果。
+
+        参数:
+            results: MediaPipe 手部检测结果
+            timestamp: 时间(秒)，默认为当前时间
+            keys: 每只手的键，默认使用手在结果中的索引
+
+        返回:
+            滤波后的关键点数组列表
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        if not results.multi_hand_landmarks:
+            return []
+
+        filtered_hands = []
+        for i, hand_landmarks in enumerate(results.multi_hand_landmarks):
+            key = keys[i] if keys is not None else i
+            filtered = self.filter(key, landmarks_to_array(hand_landmarks), timestamp)
+            for lm, (x, y, z) in zip(hand_landmarks.landmark, filtered):
+                lm.x, lm.y, lm.z = x, y, z
+            filtered_hands.append(filtered)
+
+        # 丢弃长时间未出现的手
+        for key in [k for k, t in self.last_seen.items() if timestamp - t > self.reset_timeout]:
+            del self.filters[key]
+            del self.last_seen[key]
+        return filtered_hands
@@ -0,0 +1,190 @@
+import json
+import os
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+# 录制的关键点流: 把 hand_tracking_data.json 或 gesture_data 会话文件转换为
+# 与 MediaPipe 检测结果结构相同的对象，用于离线评估各个处理模块
+
+DEFAULT_TRACKING_FILE = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    "MediapipeHand", "hand_tracking_data.json")
+
+
+def make_results(hands):
+    """
+    构造与 MediaPipe Hands.process 返回值结构相同的结果对象
+
+    参数:
+        hands: [(handedness, score, landmarks (21, 3)), ...]
+
+    返回:
+        具有 multi_hand_landmarks 和 multi_handedness 属性的对象，没有手时均为 None
+    """
+    if not hands:
+        return SimpleNamespace(multi_hand_landmarks=None, multi_handedness=None)
+
+    multi_hand_landmarks = []
+    multi_handedness = []
+    for handedness, score, landmarks in hands:
+        points = [SimpleNamespace(x=float(x), y=float(y), z=float(z)) for x, y, z in landmarks]
+        multi_hand_landmarks.append(SimpleNamespace(landmark=points))
+        multi_handedness.append(SimpleNamespace(
+            classification=[SimpleNamespace(label=handedness, score=float(score), index=0)]))
+    return SimpleNamespace(multi_hand_landmarks=multi_hand_landmarks, multi_handedness=multi_handedness)
+
+
+def results_to_hands(results):
+    """make_results 的逆操作，从检测结果提取 [(handedness, score, landmarks), ...]"""
+    if not results.multi_hand_landmarks:
+        return []
+    hands = []
+    for i, hand_landmarks in enumerate(results.multi_hand_landmarks):
+        if results.multi_handedness and i < len(results.multi_handedness):
+            classification = results.multi_handedness[i].classification[0]
+            handedness, score = classification.label, classification.score
+        else:
+            handedness, score = "Unknown", 1.0
+        landmarks = np.array([[lm.x, lm.y, lm.z] for lm in hand_landmarks.landmark])
+        hands.append((handedness, score, landmarks))
+    return hands
+
+
+def load_tracking_stream(path=DEFAULT_TRACKING_FILE, fps=30.0):
+    """
+    读取 hand_tracker 输出的跟踪数据
+
+    返回:
+        [(timestamp, hands), ...]，hands 格式同 make_results 的参数
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    stream = []
+    for i, frame_data in enumerate(data["frames"]):
+        hands = []
+        for hand_data in frame_data.get("hands", []):
+            landmarks = np.array([[lm["x"], lm["y"], lm["z"]] for lm in hand_data["landmarks"]])
+            hands.append((hand_data["handedness"], hand_data.get("confidence", 1.0), landmarks))
+        stream.append((frame_data.get("frame", i) / fps, hands))
+    return stream
+
+
+def load_session_stream(path, fps=30.0):
+    """
+    读取 gesture_data 中的一个会话文件
+
+    会话文件没有时间戳和左右手信息，按固定帧率生成时间戳，hand1/hand2 依次标为 Left/Right。
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    stream = []
+    for i, sample in enumerate(data["samples"]):
+        hands = []
+        for key, handedness in (("hand1", "Left"), ("hand2", "Right")):
+            if sample.get(key):
+                landmarks = np.array([[lm["x"], lm["y"], lm["z"]] for lm in sample[key]])
+                hands.append((handedness, 1.0, landmarks))
+        stream.append((i / fps, hands))
+    return stream
+
+
+def load_recorded_stream(path):
+    """
+    读取 LandmarkRecorder 保存的录制文件
+
+    返回:
+        [(timestamp, hands), ...]，时间戳为录制时的时间(秒)
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    stream = []
+    for frame_data in data["frames"]:
+        hands = [(hand["handedness"], hand["score"], np.array(hand["landmarks"], dtype=np.float64))
+                 for hand in frame_data["hands"]]
+        stream.append((frame_data["t"], hands))
+    return stream
+
+
+def load_stream(path, fps=30.0, session_fps=10.0):
+    """
+    按文件内容自动选择读取方式
+
+    参数:
+        path: LandmarkRecorder 录制文件、hand_tracking_data.json 或 gesture_data 会话文件
+        fps: 跟踪数据的帧率
+        session_fps: 会话文件的采样率（数据采集每隔0.1秒保存一个样本）
+    """
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if data.get("format") == "landmark_recording":
+        return load_recorded_stream(path)
+    if "samples" in data:
+        return load_session_stream(path, session_fps)
+    return load_tracking_stream(path, fps)
+
+
+def load_sequence_data(base_dir="gesture_sequences"):
+    """
+    读取 GestureDataCollector.collect_sequence_data 录制的动态手势序列
+
+    目录结构与 gesture_data 相同（双手手势的文件夹带 _TwoHands 后缀），每个会话文件的
+    samples 中每一项是一次完整动作 {"timestamps": [...], "frames": [样本, ...]}。
+
+    返回:
+        [{"gesture", "is_two_hands", "session", "timestamps": (T,), "points": (T, hands, 21, 3)}, ...]
+    """
+    sequences = []
+    if not os.path.isdir(base_dir):
+        return sequences
+    for folder in sorted(os.listdir(base_dir)):
+        folder_path = os.path.join(base_dir, folder)
+        if not os.path.isdir(folder_path):
+            continue
+        for filename in sorted(f for f in os.listdir(folder_path) if f.endswith('.json')):
+            path = os.path.join(folder_path, filename)
+            with open(path, 'r') as f:
+                data = json.load(f)
+            keys = ("hand1", "hand2") if data["is_two_hands"] else ("hand1",)
+            for sequence in data["samples"]:
+                points = np.array([[[[lm["x"], lm["y"], lm["z"]] for lm in frame[key]] for key in keys]
+                                   for frame in sequence["frames"]])
+                sequences.append({"gesture": data["gesture"], "is_two_hands": data["is_two_hands"], "session": path,
+                                  "timestamps": np.asarray(sequence["timestamps"], dtype=np.float64),
+                                  "points": points})
+    return sequences
+
+
+class LandmarkRecorder:
+    """录制带时间戳的 MediaPipe 检测结果，供回放和离线评估使用"""
+
+    def __init__(self):
+        self.frames = []
+
+    def record(self, results, timestamp=None):
+        """
+        记录一帧检测结果，需在滤波等会修改结果的处理之前调用
+
+        参数:
+            results: MediaPipe 手部检测结果
+            timestamp: 帧时间(秒)，默认为当前时间
+        """
+        self.frames.append((time.time() if timestamp is None else timestamp, results_to_hands(results)))
+
+    def save(self, path):
+        """保存为JSON，返回保存的帧数"""
+        frames = []
+        for timestamp, hands in self.frames:
+            frames.append({
+                "t": timestamp,
+                "hands": [{"handedness": handedness, "score": float(score),
+                           "landmarks": np.round(landmarks, 6).tolist()}
+                          for handedness, score, landmarks in hands],
+            })
+        with open(path, 'w') as f:
+            json.dump({"format": "landmark_recording", "frames": frames}, f)
+        return len(frames)
@@ -0,0 +1,251 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+# 结构化异步日志: 调用方只把日志记录放入有界队列，格式化和控制台/文件输出都在后台线程完成，
+# 队列满时丢弃记录而不阻塞。每条日志带一个事件名 (event)，可以按事件限频或抽样，
+# 并可同时写入 JSONL 文件供演出后分析。
+#
+# 用法:
+#     log = get_logger("recognizer")
+#     log_event(log, "single.recognized", "识别到单手手势: %(gesture)s (置信度: %(confidence).2f)",
+#               gesture=gesture, confidence=confidence)
+
+# 默认的按事件限频/抽样规则: interval 为同一事件两次输出的最小间隔(秒)，sample 为保留比例
+DEFAULT_EVENT_RULES = {
+    "single.recognized": {"interval": 1.0},
+    "single.low_confidence": {"interval": 1.0},
+    "two_hands.recognized": {"interval": 1.0},
+    "two_hands.low_confidence": {"interval": 1.0},
+    "two_hands.overconfident": {"interval": 5.0},
+    "two_hands.probabilities": {"sample": 0.05},
+    "network.not_connected": {"interval": 5.0},
+    "network.send_error": {"interval": 1.0},
+    "position.not_connected": {"interval": 5.0},
+    "transport.queue_full": {"interval": 1.0},
+    "transport.send_error": {"interval": 1.0},
+    "fixed_rate.tick_error": {"interval": 1.0},
+    "prototype.recognized": {"interval": 1.0},
+    "prototype.rejected": {"interval": 1.0},
+    "cascade.accepted": {"interval": 1.0},
+    "cascade.rejected": {"interval": 1.0},
+}
+
+_lock = threading.Lock()
+_listener = None
+_queue_handler = None
+
+
+class EventLimiter:
+    """按事件名限频和抽样，在创建日志记录之前执行，被过滤的日志几乎没有开销"""
+
+    def __init__(self, rules=None, seed=None):
+        self.rules = dict(DEFAULT_EVENT_RULES if rules is None else rules)
+        self.last_emit = {}
+        self.suppressed = {}
+        self._random = random.Random(seed)
+
+    def allow(self, event):
+        """
+        返回:
+            None 表示丢弃；否则为上次输出以来被丢弃的条数
+        """
+        rule = self.rules.get(event)
+        if rule is None:
+            return 0
+        if "sample" in rule and self._random.random() >= rule["sample"]:
+            self.suppressed[event] = self.suppressed.get(event, 0) + 1
+            return None
+        if "interval" in rule:
+            now = time.monotonic()
+            if now - self.last_emit.get(event, float("-inf")) < rule["interval"]:
+                self.suppressed[event] = self.suppressed.get(event, 0) + 1
+                return None
+            self.last_emit[event] = now
+        return self.suppressed.pop(event, 0)
+
+
+_limiter = EventLimiter()
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """队列满时丢弃记录，调用方永不阻塞；参数在后台线程中才格式化"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条记录一行 JSON: 时间、级别、模块、事件、消息和结构化字段"""
+
+    def format(self, record):
+        entry = {
+            "t": record.created,
+            "level": record.levelname,
+            "logger": record.name,
+            "event": getattr(record, "event", None),
+            "message": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry["fields"] = {k: v if isinstance(v, (int, float, str, bool, type(None))) else str(v)
+                               for k, v in fields.items()}
+        if getattr(record, "suppressed", 0):
+            entry["suppressed"] = record.suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class ConsoleFormatter(logging.Formatter):
+    """控制台输出与原来的 print 一致，警告和错误加级别前缀"""
+
+    def format(self, record):
+        message = record.getMessage()
+        if getattr(record, "suppressed", 0):
+            message += f" (另有 {record.suppressed} 条相同事件被限频)"
+        if record.levelno >= logging.WARNING:
+            message = f"[{record.levelname}] {message}"
+        if record.exc_info:
+            message += "\n" + self.formatException(record.exc_info)
+        return message
+
+
+def setup_logging(level=None, jsonl_path=None, console=True, rules=None, queue_size=10000):
+    """
+    配置 gesture 日志: 队列处理器 + 后台输出线程
+
+    参数:
+        level: 日志级别，默认取环境变量 GESTURE_LOG_LEVEL，否则为 INFO
+        jsonl_path: JSONL 文件路径，默认取环境变量 GESTURE_LOG_JSONL，None 表示不写文件
+        console: 是否输出到控制台
+        rules: 按事件限频/抽样规则，默认 DEFAULT_EVENT_RULES
+        queue_size: 队列长度，满时丢弃新记录
+
+    返回:
+        gesture 根日志器
+    """
+    global _listener, _queue_handler, _limiter
+    with _lock:
+        shutdown_logging()
+        _limiter = EventLimiter(rules)
+        root = logging.getLogger("gesture")
+        root.setLevel(level or os.environ.get("GESTURE_LOG_LEVEL", "INFO").upper())
+        root.propagate = False
+
+        handlers = []
+        if console:
+            stream_handler = logging.StreamHandler(sys.stdout)
+            stream_handler.setFormatter(ConsoleFormatter())
+            handlers.append(stream_handler)
+        jsonl_path = jsonl_path or os.environ.get("GESTURE_LOG_JSONL")
+        if jsonl_path:
+            file_handler = logging.FileHandler(jsonl_path, encoding="utf-8")
+            file_handler.setFormatter(JsonLinesFormatter())
+            handlers.append(file_handler)
+
+        log_queue = queue.Queue(maxsize=queue_size)
+        _queue_handler = _NonBlockingQueueHandler(log_queue)
+        root.addHandler(_queue_handler)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        return root
+
+
+def shutdown_logging():
+    """停止后台线程并输出队列中剩余的记录"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger("gesture").removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+atexit.register(shutdown_logging)
+
+
+def get_logger(name):
+    """获取 gesture.<name> 日志器，首次使用时按默认配置启动日志线程"""
+    if _listener is None:
+        with _lock:
+            needs_setup = _listener is None
+        if needs_setup:
+            setup_logging()
+    return logging.getLogger(f"gesture.{name}")
+
+
+def log_event(logger, event, message, level=logging.INFO, **fields):
+    """
+    记录一条结构化日志
+
+    参数:
+        logger: get_logger 返回的日志器
+        event: 事件名，用于限频、抽样和离线分析
+        message: %-格式的消息模板，用字段名引用，如 "%(gesture)s"；在后台线程中格式化
+        level: 日志级别
+        fields: 结构化字段
+    """
+    if not logger.isEnabledFor(level):
+        return
+    suppressed = _limiter.allow(event)
+    if suppressed is None:
+        return
+    # 直接构造记录，跳过 logger.log 中查找调用位置的栈遍历
+    record = logger.makeRecord(logger.name, level, "", 0, message, (fields,) if fields else (), None,
+                               extra={"event": event, "fields": fields, "suppressed": suppressed})
+    logger.handle(record)
+
+
+def dropped_records():
+    """因队列满被丢弃的记录数"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+
+if __name__ == "__main__":
+    # 比较直接 print 和队列日志在调用线程上的耗时（print 使用行缓冲，与终端一样每行一次写入）
+    import contextlib
+
+    n = 20000
+    with open(os.devnull, 'w', buffering=1) as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        for i in range(n):
+            print(f"识别到单手手势: Bird (置信度: {0.9:.2f})")
+        print_us = (time.perf_counter() - start) / n * 1e6
+
+    setup_logging(console=False, rules={})
+    log = get_logger("bench")
+    start = time.perf_counter()
+    for i in range(n):
+        log_event(log, "single.recognized", "识别到单手手势: %(gesture)s (置信度: %(confidence).2f)",
+                  gesture="Bird", confidence=0.9)
+    log_us = (time.perf_counter() - start) / n * 1e6
+
+    setup_logging(console=False)
+    start = time.perf_counter()
+    for i in range(n):
+        log_event(log, "single.recognized", "识别到单手手势: %(gesture)s (置信度: %(confidence).2f)",
+                  gesture="Bird", confidence=0.9)
+    limited_us = (time.perf_counter() - start) / n * 1e6
+    shutdown_logging()
+    print(f"print: {print_us:.2f} us/条, 队列日志: {log_us:.2f} us/条, 限频丢弃: {limited_us:.2f} us/条")
@@ -0,0 +1,73 @@
+import random
+import select
+import socket
+import threading
+
+
+class LossyProxy:
+    """
+    本地 UDP 中继，按概率丢弃数据包，用于测量丢包下的同步行为
+
+    发送方把数据包发到 proxy.port，中继转发给目标；目标的回复（如确认）经同一中继按概率丢弃后转发回发送方。
+    """
+
+    def __init__(self, target_host, target_port, loss=0.2, reply_loss=None, seed=None, host='127.0.0.1'):
+        """
+        参数:
+            target_host, target_port: 真正的接收方
+            loss: 发往目标的数据包的丢弃概率
+            reply_loss: 回复的丢弃概率，None 表示与 loss 相同
+            seed: 随机种子
+        """
+        self.target = (target_host, target_port)
+        self.loss = loss
+        self.reply_loss = loss if reply_loss is None else reply_loss
+        self._random = random.Random(seed)
+        self.front = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.front.bind((host, 0))
+        self.back = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.back.bind((host, 0))
+        self.host, self.port = self.front.getsockname()
+        self.client = None
+        self.forwarded = self.dropped = 0
+        self.replies_forwarded = self.replies_dropped = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"LossyProxy:{self.port}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join(timeout=1.0)
+        self.front.close()
+        self.back.close()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            readable, _, _ = select.select([self.front, self.back], [], [], 0.05)
+            for sock in readable:
+                try:
+                    data, address = sock.recvfrom(65535)
+                except OSError:
+                    continue
+                if sock is self.front:
+                    self.client = address
+                    if self._random.random() < self.loss:
+                        self.dropped += 1
+                        continue
+                    self.back.sendto(data, self.target)
+                    self.forwarded += 1
+                elif self.client is not None:
+                    if self._random.random() < self.reply_loss:
+                        self.replies_dropped += 1
+                        continue
+                    self.front.sendto(data, self.client)
+                    self.replies_forwarded += 1
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
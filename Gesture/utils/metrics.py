@@ -0,0 +1,302 @@
+import bisect
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# 运行时指标: 计数器、仪表和直方图，通过本地 HTTP 端点以 Prometheus 文本格式提供，
+# 或定期以 JSON 数据包经 UDP 发送。每帧的记录只做整数加法和一次二分查找，
+# 需要读取其他对象状态的指标（如已发送的数据包数）在抓取时通过回调计算。
+
+
+class Counter:
+    """单调递增计数器，可以直接增加，也可以在抓取时由回调函数读取其他对象的累计值"""
+
+    def __init__(self, name, help_text="", fn=None):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        return [(self.name, {}, self.fn() if self.fn else self.value)]
+
+    kind = "counter"
+
+
+class Gauge:
+    """仪表，可以直接设置，也可以在抓取时由回调函数计算"""
+
+    def __init__(self, name, help_text="", fn=None):
+        self.name = name
+        self.help = help_text
+        self.fn = fn
+        self.value = 0.0
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        return [(self.name, {}, self.fn() if self.fn else self.value)]
+
+    kind = "gauge"
+
+
+class Histogram:
+    """固定分桶的直方图"""
+
+    def __init__(self, name, help_text="", buckets=(0.001, 0.0025, 0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 1.0)):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q):
+        """按分桶估计分位数（返回所在桶的上界）"""
+        if self.count == 0:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+    def samples(self):
+        samples = []
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            samples.append((self.name + "_bucket", {"le": repr(bound)}, cumulative))
+        samples.append((self.name + "_bucket", {"le": "+Inf"}, self.count))
+        samples.append((self.name + "_sum", {}, self.sum))
+        samples.append((self.name + "_count", {}, self.count))
+        return samples
+
+    kind = "histogram"
+
+
+class MetricsRegistry:
+    """指标集合"""
+
+    def __init__(self, prefix=""):
+        self.prefix = prefix
+        self.metrics = {}
+
+    def _add(self, metric):
+        metric.name = self.prefix + metric.name
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text="", fn=None):
+        return self._add(Counter(name, help_text, fn))
+
+    def gauge(self, name, help_text="", fn=None):
+        if name.endswith("_total"):
+            # Prometheus 命名约定中 _total 只用于计数器
+            raise ValueError(f"仪表 {name} 不能以 _total 结尾，累计值请使用计数器")
+        return self._add(Gauge(name, help_text, fn))
+
+    def histogram(self, name, help_text="", buckets=None):
+        if buckets is None:
+            return self._add(Histogram(name, help_text))
+        return self._add(Histogram(name, help_text, buckets))
+
+    def render_prometheus(self):
+        """生成 Prometheus 文本格式"""
+        lines = []
+        for metric in self.metrics.values():
+            if metric.help:
+                lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """生成用于 UDP 统计包的扁平字典"""
+        data = {}
+        for metric in self.metrics.values():
+            if metric.kind == "histogram":
+                data[metric.name + "_count"] = metric.count
+                data[metric.name + "_p50"] = metric.quantile(0.5)
+                data[metric.name + "_p95"] = metric.quantile(0.95)
+            else:
+                data[metric.name] = metric.samples()[0][2]
+        return data
+
+
+def parse_prometheus(text):
+    """解析 Prometheus 文本格式，返回 {带标签的名称: 值}，用于本地抓取测试"""
+    values = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        name, value = line.rsplit(" ", 1)
+        values[name] = float(value)
+    return values
+
+
+class MetricsServer:
+    """在后台线程中提供 /metrics 的本地 HTTP 服务"""
+
+    def __init__(self, registry, host="127.0.0.1", port=9100):
+        """
+        参数:
+            registry: MetricsRegistry
+            port: 监听端口，0 表示由系统分配（分配后见 self.port）
+        """
+        self.registry = registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split("?")[0] != "/metrics":
+                    handler.send_error(404)
+                    return
+                body = registry.render_prometheus().encode('utf-8')
+                handler.send_response(200)
+                handler.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                handler.send_header("Content-Length", str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+
+            def log_message(handler, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.host, self.port = self.server.server_address[:2]
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        print(f"MetricsServer: 指标地址 http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class UdpStatsReporter:
+    """定期把指标快照以 JSON 发送到 UDP 端口，格式为 stats|{json}"""
+
+    def __init__(self, registry, host="127.0.0.1", port=9101, interval=1.0):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self.interval = interval
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def send_once(self):
+        message = "stats|" + json.dumps(self.registry.snapshot())
+        self.sock.sendto(message.encode('utf-8'), (self.host, self.port))
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.send_once()
+            except OSError as e:
+                print(f"UdpStatsReporter: 发送错误 - {e}")
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="UdpStatsReporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+        self.sock.close()
+
+
+class RecognitionMetrics:
+    """手势识别的运行时指标"""
+
+    def __init__(self, registry=None):
+        self.registry = registry or MetricsRegistry(prefix="gesture_")
+        r = self.registry
+        self.frames = r.counter("frames_total", "处理的帧数")
+        self.frames_with_hands = r.counter("frames_with_hands_total", "检测到手的帧数")
+        self.unknown = r.counter("unknown_total", "识别结果为 Unknown 的帧数")
+        self.recognized = r.counter("recognized_total", "进行了手势识别的帧数")
+        self.switches = r.counter("stable_switches_total", "稳定手势切换次数")
+        self.frame_interval = r.histogram("frame_interval_seconds", "相邻帧的时间间隔",
+                                          (0.008, 0.017, 0.025, 0.034, 0.05, 0.067, 0.1, 0.2, 0.5))
+        self.inference = r.histogram("inference_seconds", "识别器推理耗时（含特征构建）")
+        self.fps = r.gauge("fps", "最近的帧率（指数平均）")
+        r.gauge("hands_detected_ratio", "检测到手的帧占比",
+                lambda: self.frames_with_hands.value / self.frames.value if self.frames.value else 0.0)
+        r.gauge("unknown_ratio", "识别为 Unknown 的比例",
+                lambda: self.unknown.value / self.recognized.value if self.recognized.value else 0.0)
+        self._last_frame_time = None
+        self._fps_ema = 0.0
+        self._last_gesture = None
+
+    def watch(self, name, help_text, fn, counter=False):
+        """
+        添加在抓取时计算的指标
+
+        参数:
+            fn: 无参函数，返回当前值
+            counter: True 时作为计数器（fn 返回单调递增的累计值，如数据包数和丢帧数，名称以 _total 结尾），
+                     否则作为仪表（如队列深度）
+        """
+        if counter:
+            self.registry.counter(name, help_text, fn)
+        else:
+            self.registry.gauge(name, help_text, fn)
+
+    def record_frame(self, timestamp, hand_count):
+        self.frames.inc()
+        if hand_count:
+            self.frames_with_hands.inc()
+        if self._last_frame_time is not None:
+            interval = timestamp - self._last_frame_time
+            if interval > 0:
+                self.frame_interval.observe(interval)
+                rate = 1.0 / interval
+                self._fps_ema = rate if self._fps_ema == 0 else 0.9 * self._fps_ema + 0.1 * rate
+                self.fps.set(self._fps_ema)
+        self._last_frame_time = timestamp
+
+    def record_recognition(self, raw_gesture, seconds):
+        self.recognized.inc()
+        self.inference.observe(seconds)
+        if raw_gesture == "Unknown":
+            self.unknown.inc()
+
+    def record_stable_gesture(self, gesture):
+        if self._last_gesture is not None and gesture != self._last_gesture:
+            self.switches.inc()
+        self._last_gesture = gesture
+
+
+if __name__ == "__main__":
+    # 测量每帧记录的开销
+    metrics = RecognitionMetrics()
+    n = 100000
+    start = time.perf_counter()
+    for i in range(n):
+        metrics.record_frame(i / 30.0, 1)
+        metrics.record_recognition("Bird", 0.004)
+        metrics.record_stable_gesture("Bird")
+    per_frame = (time.perf_counter() - start) / n * 1e6
+    print(f"每帧记录开销 {per_frame:.2f} us（30 FPS 时占帧时间 {per_frame / 33333 * 100:.4f}%）")
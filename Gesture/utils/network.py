@@ -1,62 +1,106 @@
-import socket
+import logging
+
+from utils.log import get_logger, log_event
+from utils.profiler import span
+from utils.udp_transport import UdpTransport
+
+log = get_logger("network")
 
 class NetworkManager:
     """网络通信管理器，负责与Unity通信"""
     
-    def __init__(self, host='127.0.0.1', port=8000):
+    def __init__(self, host='127.0.0.1', port=8000, transport=None):
+        """
+        参数:
+            host, port: Unity 接收手势的地址
+            transport: 共享的 UdpTransport（目的地 "gesture"）；None 时创建自己的
+        """
         self.host = host
         self.port = port
-        self.sock = None
+        self.owns_transport = transport is None
+        self.transport = UdpTransport() if transport is None else transport
         self.is_connected = False
+        self.packets_sent = 0   # 放入发送队列的消息数，实际发出的见 transport
+        self.bytes_sent = 0
+    
+    def _sendto(self, message):
+        """放入发送队列，不等待网络；手势变化不合并，按顺序全部发送"""
+        data = message.encode('utf-8')
+        if not self.transport.send("gesture", data):
+            return False
+        self.packets_sent += 1
+        self.bytes_sent += len(data)
+        return True
     
     def connect(self):
         """建立网络连接"""
         try:
-            # 初始化UDP套接字
-            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            # 不绑定本地地址，因为我们只是发送方
+            if not self.transport.add_destination("gesture", self.host, self.port):
+                return False
+            self.transport.start()
             self.is_connected = True
             # 测试发送一条消息
-            test_message = "test_gesture|Unknown"
-            self.sock.sendto(test_message.encode('utf-8'), (self.host, self.port))
-            print(f"NetworkManager: 成功连接并向{self.host}:{self.port}发送测试消息")
+            self.transport.send("gesture", "test_gesture|Unknown")
+            log_event(log, "network.connected", "NetworkManager: 成功连接并向%(host)s:%(port)d发送测试消息",
+                      host=self.host, port=self.port)
             return True
         except Exception as e:
-            print(f"NetworkManager: 连接错误 - {e}")
+            log_event(log, "network.connect_error", "NetworkManager: 连接错误 - %(error)s", logging.ERROR,
+                      error=e)
             return False
     
     def disconnect(self):
         """断开网络连接"""
-        if self.sock:
-            self.sock.close()
-            self.sock = None
+        if self.owns_transport:
+            self.transport.stop()
+        else:
+            # 先发完队列中的手势（如最后的 HandDetectionStatus），移除目的地后它们会被丢弃
+            self.transport.flush(0.5, destination="gesture")
+            self.transport.remove_destination("gesture")
         self.is_connected = False
-        print("NetworkManager: 已断开连接")
+        log_event(log, "network.disconnected", "NetworkManager: 已断开连接")
     
     def send_gesture(self, gesture_type):
         """发送手势类型"""
         if not self.is_connected:
-            print("NetworkManager: 未连接，请先调用 connect() 方法")
+            log_event(log, "network.not_connected", "NetworkManager: 未连接，请先调用 connect() 方法",
+                      logging.WARNING)
             return False
         
         try:
             message = f"gesture|{gesture_type}"
-            self.sock.sendto(message.encode('utf-8'), (self.host, self.port))
-            return True
+            with span("udp.send_gesture"):
+                return self._sendto(message)
         except Exception as e:
-            print(f"NetworkManager: 发送错误 - {e}")
+            log_event(log, "network.send_error", "NetworkManager: 发送错误 - %(error)s", logging.ERROR, error=e)
+            return False
+
+    def send_status(self, status):
+        """发送识别端状态 "status|状态"，如启动完成时的 Ready（Unity 见 InputManager.OnRecognizerStatusChanged）"""
+        if not self.is_connected:
+            log_event(log, "network.not_connected", "NetworkManager: 未连接，请先调用 connect() 方法",
+                      logging.WARNING)
+            return False
+        return self._sendto(f"status|{status}")
+
+    def send_motion(self, motion):
+        """发送识别到的动态手势 "motion|名称"，不改变 Unity 当前的静态手势（见 InputManager.OnMotionReceived）"""
+        if not self.is_connected:
+            log_event(log, "network.not_connected", "NetworkManager: 未连接，请先调用 connect() 方法",
+                      logging.WARNING)
             return False
+        return self._sendto(f"motion|{motion}")
 
     def send_position_and_gesture(self, gesture_type, x, y, confidence=0.9):
         """发送位置和手势类型"""
         if not self.is_connected:
-            print("NetworkManager: 未连接，请先调用 connect() 方法")
+            log_event(log, "network.not_connected", "NetworkManager: 未连接，请先调用 connect() 方法",
+                      logging.WARNING)
             return False
         
         try:
             message = f"{gesture_type}|{x}|{y}|{confidence}"
-            self.sock.sendto(message.encode('utf-8'), (self.host, self.port))
-            return True
+            return self._sendto(message)
         except Exception as e:
-            print(f"NetworkManager: 发送错误 - {e}")
+            log_event(log, "network.send_error", "NetworkManager: 发送错误 - %(error)s", logging.ERROR, error=e)
             return False
\ No newline at end of file
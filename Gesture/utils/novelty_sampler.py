@@ -0,0 +1,101 @@
+import numpy as np
+
+# 基于新颖度的样本采集: 把关键点归一化（以手腕为原点、按手掌大小缩放）后，
+# 与最近接受的若干样本比较，只有和它们都足够不同的帧才被接受。
+# 用来代替固定的采集间隔，手不动时不重复采集，手在变化时可以每帧采集。
+
+WRIST = 0
+MIDDLE_MCP = 9
+
+
+def normalize_hand(points):
+    """
+    归一化一只手的关键点
+
+    参数:
+        points: (21, 3) 关键点
+
+    返回:
+        以手腕为原点、按手腕到中指根部的距离缩放后的 (21, 3) 数组
+    """
+    points = np.asarray(points, dtype=float)
+    centered = points - points[WRIST]
+    scale = np.linalg.norm(centered[MIDDLE_MCP, :2])
+    return centered / scale if scale > 1e-6 else centered
+
+
+def sample_features(hands):
+    """
+    把一帧中的一只或两只手转换为比较用的特征
+
+    参数:
+        hands: [(21, 3) 关键点, ...]，双手时顺序应固定（如按左右手）
+
+    返回:
+        (N, 3) 数组: 每只手归一化后的关键点，双手时再加上第二只手腕相对第一只手腕的位移
+    """
+    rows = [normalize_hand(points) for points in hands]
+    if len(hands) > 1:
+        first = np.asarray(hands[0], dtype=float)
+        scale = np.linalg.norm(first[MIDDLE_MCP, :2] - first[WRIST, :2])
+        for points in hands[1:]:
+            offset = (np.asarray(points, dtype=float)[WRIST] - first[WRIST]) / max(scale, 1e-6)
+            rows.append(offset[np.newaxis])
+    return np.concatenate(rows)
+
+
+class NoveltySampler:
+    """与最近接受的样本比较，接受足够新颖的帧"""
+
+    def __init__(self, threshold=0.05, history=64):
+        """
+        参数:
+            threshold: 接受所需的最小距离（各关键点归一化后位移的平均值，单位为手掌大小），0 表示全部接受
+            history: 参与比较的最近样本数
+        """
+        self.threshold = threshold
+        self.history = history
+        self.accepted = 0
+        self.rejected = 0
+        self._buffer = None
+        self._count = 0
+        self._next = 0
+
+    def reset(self):
+        self.accepted = 0
+        self.rejected = 0
+        self._buffer = None
+        self._count = 0
+        self._next = 0
+
+    def distance(self, features):
+        """与最近样本的最小距离，没有历史样本时为无穷大"""
+        if self._count == 0 or self._buffer.shape[1:] != features.shape:
+            return float("inf")
+        recent = self._buffer[:self._count]
+        return float(np.linalg.norm(recent - features, axis=2).mean(axis=1).min())
+
+    def accept(self, hands):
+        """
+        判断一帧是否作为新样本
+
+        参数:
+            hands: [(21, 3) 关键点, ...]
+
+        返回:
+            是否接受（接受的样本加入比较历史）
+        """
+        features = sample_features(hands)
+        if self.distance(features) < self.threshold:
+            self.rejected += 1
+            return False
+
+        if self._buffer is None or self._buffer.shape[1:] != features.shape:
+            self._buffer = np.empty((self.history,) + features.shape)
+            self._count = 0
+            self._next = 0
+        self._buffer[self._next] = features
+        self._next = (self._next + 1) % self.history
+        self._count = min(self._count + 1, self.history)
+        self.accepted += 1
+        return True
@@ -0,0 +1,221 @@
+import itertools
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+# 分阶段计时: 用 perf_counter_ns 记录每个阶段的起止时间，写入固定大小的环形缓冲区。
+# 未启用时 span() 返回一个空操作的上下文对象，lap() 直接返回，几乎没有开销。
+# 设置环境变量 GESTURE_PROFILE=1 或调用 profiler.enable() 启用。
+
+
+class _NullSpan:
+    """未启用时使用的空上下文"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("profiler", "stage", "start")
+
+    def __init__(self, profiler, stage):
+        self.profiler = profiler
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.stage, self.start, time.perf_counter_ns())
+        return False
+
+
+class StageProfiler:
+    """
+    分阶段计时器
+
+    两种用法:
+        with profiler.span("hands.process"):
+            ...
+    或在主循环中按顺序打点，每次 lap 记录从上一次打点到现在的时间:
+        profiler.start_frame()
+        ...; profiler.lap("cap.read")
+        ...; profiler.lap("hands.process")
+    """
+
+    def __init__(self, enabled=False, capacity=4096, report_interval=5.0):
+        """
+        参数:
+            enabled: 是否启用
+            capacity: 环形缓冲区大小（每个阶段保留的耗时样本数，事件缓冲区为其8倍）
+            report_interval: 周期性打印统计的间隔(秒)，0 表示不打印
+        """
+        self.enabled = enabled
+        self.capacity = capacity
+        self.report_interval = report_interval
+        self.reset()
+
+    def reset(self):
+        """清空所有记录"""
+        self._stage_index = {}    # {阶段名: 索引}
+        self._durations = []      # 每个阶段的耗时环形缓冲 (capacity,) int64
+        self._counts = []         # 每个阶段的累计次数
+        event_capacity = self.capacity * 8
+        self._event_stage = np.zeros(event_capacity, dtype=np.int32)
+        self._event_start = np.zeros(event_capacity, dtype=np.int64)
+        self._event_dur = np.zeros(event_capacity, dtype=np.int64)
+        self._event_tid = np.zeros(event_capacity, dtype=np.int64)
+        self._event_counter = itertools.count()
+        self._events = 0
+        self._lock = threading.Lock()
+        self._lap_start = None
+        self._last_report = time.perf_counter()
+        self._origin_ns = time.perf_counter_ns()
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+
+    def span(self, stage):
+        """返回记录一个阶段耗时的上下文对象"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self, stage)
+
+    def start_frame(self):
+        """开始一帧的打点计时"""
+        if self.enabled:
+            self._lap_start = time.perf_counter_ns()
+
+    def lap(self, stage):
+        """记录从上一次打点到现在的耗时，并作为下一阶段的起点（只在一个线程中使用）"""
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        if self._lap_start is not None:
+            self.record(stage, self._lap_start, now)
+        self._lap_start = now
+
+    def _stage(self, stage):
+        index = self._stage_index.get(stage)
+        if index is None:
+            with self._lock:
+                index = self._stage_index.get(stage)
+                if index is None:
+                    self._durations.append(np.zeros(self.capacity, dtype=np.int64))
+                    self._counts.append(0)
+                    index = len(self._counts) - 1
+                    self._stage_index[stage] = index
+        return index
+
+    def record(self, stage, start_ns, end_ns):
+        """记录一个阶段的起止时间(纳秒)"""
+        index = self._stage(stage)
+        count = self._counts[index]
+        self._durations[index][count % self.capacity] = end_ns - start_ns
+        self._counts[index] = count + 1
+
+        # itertools.count 的 next 在 GIL 下是原子的，多线程写事件缓冲不会冲突
+        slot = next(self._event_counter)
+        i = slot % len(self._event_stage)
+        self._event_stage[i] = index
+        self._event_start[i] = start_ns
+        self._event_dur[i] = end_ns - start_ns
+        self._event_tid[i] = threading.get_ident()
+        self._events = slot + 1
+
+    def summary(self):
+        """
+        各阶段最近 capacity 次的耗时统计
+
+        返回:
+            {阶段名: {"count": 累计次数, "p50_ms": 中位数, "p95_ms": 95分位, "mean_ms": 平均}}
+        """
+        stats = {}
+        for stage, index in list(self._stage_index.items()):
+            count = self._counts[index]
+            if count == 0:
+                continue
+            samples = self._durations[index][:min(count, self.capacity)] / 1e6
+            p50, p95 = np.percentile(samples, [50, 95])
+            stats[stage] = {"count": count, "p50_ms": float(p50), "p95_ms": float(p95),
+                            "mean_ms": float(samples.mean())}
+        return stats
+
+    def format_summary(self):
+        stats = self.summary()
+        if not stats:
+            return "没有计时记录"
+        lines = [f"{'阶段':<24}{'次数':>8}{'p50(ms)':>10}{'p95(ms)':>10}"]
+        for stage, s in sorted(stats.items(), key=lambda item: -item[1]["p50_ms"]):
+            lines.append(f"{stage:<24}{s['count']:>8}{s['p50_ms']:>10.3f}{s['p95_ms']:>10.3f}")
+        return "\n".join(lines)
+
+    def maybe_report(self):
+        """距上次打印超过 report_interval 时打印滚动统计，在主循环每帧调用"""
+        if not self.enabled or not self.report_interval:
+            return
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            print(self.format_summary())
+
+    def export_chrome_trace(self, path):
+        """
+        导出 Chrome trace / Perfetto 可读取的 JSON（chrome://tracing 或 ui.perfetto.dev 打开）
+
+        只包含事件缓冲区中保留的最近事件。
+
+        返回:
+            导出的事件数
+        """
+        n = min(self._events, len(self._event_stage))
+        names = {index: stage for stage, index in self._stage_index.items()}
+        order = np.argsort(self._event_start[:n], kind="stable")
+        pid = os.getpid()
+        events = []
+        for i in order:
+            events.append({
+                "name": names[int(self._event_stage[i])],
+                "ph": "X",
+                "ts": (int(self._event_start[i]) - self._origin_ns) / 1000.0,
+                "dur": int(self._event_dur[i]) / 1000.0,
+                "pid": pid,
+                "tid": int(self._event_tid[i]),
+            })
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+        return len(events)
+
+
+# 全局计时器，各模块共用
+profiler = StageProfiler(enabled=os.environ.get("GESTURE_PROFILE", "") not in ("", "0"))
+span = profiler.span
+
+
+if __name__ == "__main__":
+    # 测量计时器本身的开销
+    n = 100000
+    for enabled in (False, True):
+        p = StageProfiler(enabled=enabled)
+        start = time.perf_counter()
+        for _ in range(n):
+            with p.span("noop"):
+                pass
+        span_ns = (time.perf_counter() - start) / n * 1e9
+        start = time.perf_counter()
+        p.start_frame()
+        for _ in range(n):
+            p.lap("noop")
+        lap_ns = (time.perf_counter() - start) / n * 1e9
+        print(f"{'启用' if enabled else '未启用'}: span {span_ns:.0f} ns/次, lap {lap_ns:.0f} ns/次")
@@ -0,0 +1,86 @@
+import json
+import os
+import queue
+import threading
+import time
+
+# 后台会话写入: 采集循环只把样本放入队列，JSON 编码和写文件在后台线程中完成。
+# 样本分批追加到 "samples" 数组末尾，每批写完后补上结尾的 "]}" 并刷新，
+# 所以文件在任何时刻都是完整的 JSON，采集中途退出也不会丢失已写入的样本。
+
+_CLOSING = b"]}"
+
+
+class SessionWriter:
+    """增量写入 gesture_data 会话文件 {"gesture", "is_two_hands", "samples": [...]}"""
+
+    def __init__(self, path, header, encode=None, flush_interval=0.5, batch_size=50):
+        """
+        参数:
+            path: 会话文件路径
+            header: samples 之外的字段，如 {"gesture": "Deer", "is_two_hands": False}
+            encode: 在后台线程中把样本转换为可 JSON 序列化的对象，None 表示原样写入
+            flush_interval: 最长刷新间隔(秒)
+            batch_size: 累积多少个样本后立即写入
+        """
+        self.path = path
+        self.encode = encode
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.written = 0
+        self.error = None
+        self._queue = queue.Queue()
+        self._stop = object()
+
+        self._file = open(path, 'wb')
+        prefix = json.dumps(header)[:-1] + (', ' if header else '') + '"samples": ['
+        self._file.write(prefix.encode('utf-8') + _CLOSING)
+        self._file.flush()
+        self._thread = threading.Thread(target=self._run, name="SessionWriter", daemon=True)
+        self._thread.start()
+
+    def write(self, sample):
+        """添加一个样本，不阻塞"""
+        self._queue.put(sample)
+
+    def _append(self, batch):
+        encoded = [json.dumps(self.encode(sample) if self.encode else sample) for sample in batch]
+        # 覆盖上次写入的结尾 "]}"
+        self._file.seek(-len(_CLOSING), os.SEEK_END)
+        text = (", " if self.written else "") + ", ".join(encoded)
+        self._file.write(text.encode('utf-8') + _CLOSING)
+        self._file.flush()
+        self.written += len(batch)
+
+    def _run(self):
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self._queue.get(timeout=max(deadline - time.monotonic(), 0.0))
+            except queue.Empty:
+                item = None
+            stopping = item is self._stop
+            if item is not None and not stopping:
+                batch.append(item)
+
+            now = time.monotonic()
+            if batch and (stopping or len(batch) >= self.batch_size or now >= deadline):
+                try:
+                    self._append(batch)
+                except Exception as e:
+                    self.error = e
+                    print(f"SessionWriter: 写入 {self.path} 失败 - {e}")
+                batch = []
+            if now >= deadline:
+                deadline = now + self.flush_interval
+            if stopping:
+                break
+        self._file.close()
+
+    def close(self):
+        """写入剩余样本并关闭文件，返回写入的样本数"""
+        if self._thread.is_alive():
+            self._queue.put(self._stop)
+            self._thread.join()
+        return self.written
@@ -0,0 +1,59 @@
+import importlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# 快速启动: 重量级模块（cv2、mediapipe，以及加载模型时才导入的 sklearn）延迟到第一次使用时导入；
+# 帧来源、MediaPipe 图和识别模型在后台线程中并行初始化，各自在空白数据上预热一次，
+# 避免第一帧承担图初始化和首次推理的额外耗时。
+
+
+class LazyModule:
+    """第一次访问属性时才导入的模块代理，用于模块顶层的 cv2、mediapipe 等"""
+
+    def __init__(self, name):
+        self._name = name
+        self._module = None
+
+    def _load(self):
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attr):
+        value = getattr(self._load(), attr)
+        # 缓存到实例上，之后的访问不再经过 __getattr__
+        setattr(self, attr, value)
+        return value
+
+    def __repr__(self):
+        state = "已导入" if self._module is not None else "未导入"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def run_startup_tasks(tasks, parallel=True):
+    """
+    执行初始化任务
+
+    参数:
+        tasks: {名称: 无参函数}
+        parallel: True 时每个任务一个线程并行执行，False 时按顺序执行
+
+    返回:
+        ({名称: 返回值}, {名称: 耗时(秒)})；任一任务出错时在全部结束后抛出第一个异常
+    """
+    durations = {}
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        try:
+            return fn()
+        finally:
+            durations[name] = time.perf_counter() - start
+
+    if not parallel:
+        return {name: timed(name, fn) for name, fn in tasks.items()}, durations
+
+    with ThreadPoolExecutor(max_workers=len(tasks), thread_name_prefix="startup") as executor:
+        futures = {name: executor.submit(timed, name, fn) for name, fn in tasks.items()}
+    # 离开 with 时所有任务都已结束
+    return {name: future.result() for name, future in futures.items()}, durations
@@ -0,0 +1,267 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+import numpy as np
+
+from utils.log import get_logger, log_event
+
+log = get_logger("network")
+
+# 基于 UDP 的状态同步: 发送完整的带版本号的状态快照，而不是只发送一次的变化事件。
+# 状态变化时立即发送，之后在接下来的几帧中按 repeat_interval 重复发送，再以低频心跳持续发送当前状态，
+# 丢失一个数据包最多让接收方晚一次重复或一次心跳收到，而不是一直停留在旧状态，也没有 TCP 的队头阻塞。
+# 接收方可以回复确认，确认了当前版本的目的地地址不再重复发送（心跳照常，用于接收方重启后恢复）。
+#
+# 状态消息: "state|纪元|版本|键=值|键=值..."，纪元在发送方每次启动时随机生成，接收方遇到新纪元时接受任意版本；
+# 确认消息: "ack|纪元|版本"，版本为接收方已有的最新版本。
+# Unity 端的去重、应用和确认见 GestureReceiver.cs 的 HandleStateSnapshot / ApplyStateSnapshot。
+
+STATE_PREFIX = "state"
+ACK_PREFIX = "ack"
+
+
+def format_state(epoch, version, fields):
+    return "|".join([STATE_PREFIX, epoch, str(version)] + [f"{k}={v}" for k, v in sorted(fields.items())])
+
+
+def parse_state(message):
+    """
+    返回:
+        (纪元, 版本, {键: 值})，不是状态消息时为 None
+    """
+    parts = message.split("|")
+    if len(parts) < 3 or parts[0] != STATE_PREFIX:
+        return None
+    try:
+        version = int(parts[2])
+    except ValueError:
+        return None
+    fields = dict(part.split("=", 1) for part in parts[3:] if "=" in part)
+    return parts[1], version, fields
+
+
+def parse_ack(message):
+    """
+    返回:
+        (纪元, 版本)，不是确认消息时为 None
+    """
+    parts = message.split("|")
+    if len(parts) != 3 or parts[0] != ACK_PREFIX:
+        return None
+    try:
+        return parts[1], int(parts[2])
+    except ValueError:
+        return None
+
+
+class StateSyncSender:
+    """通过 UdpTransport 发送带冗余的状态快照"""
+
+    def __init__(self, transport, destination="gesture", repeats=3, repeat_interval=0.03,
+                 heartbeat_interval=1.0, epoch=None):
+        """
+        参数:
+            transport: UdpTransport，快照发送到其中名为 destination 的目的地（可以有多个地址）
+            repeats: 状态变化后重复发送的次数（不含第一次），0 表示只发送一次
+            repeat_interval: 重复发送的最小间隔(秒)，在 tick 中检查，即每帧最多重复一次
+            heartbeat_interval: 心跳间隔(秒)，None 表示不发送心跳
+            epoch: 发送方纪元，None 时随机生成
+        """
+        self.transport = transport
+        self.destination = destination
+        self.repeats = repeats
+        self.repeat_interval = repeat_interval
+        self.heartbeat_interval = heartbeat_interval
+        self.epoch = epoch or os.urandom(4).hex()
+        self.version = 0
+        self.state = {}
+        self.pending_repeats = 0
+        self.last_sent = None
+        self.acked = {}              # 地址 -> 已确认的最新版本
+        # 统计
+        self.snapshots_sent = 0
+        self.acks_received = 0
+        self.repeats_skipped = 0     # 因全部目的地已确认而省去的重复发送
+
+    def update(self, timestamp=None, **fields):
+        """
+        设置状态字段，状态变化时版本号加一并立即发送
+
+        返回:
+            状态是否变化
+        """
+        state = dict(self.state, **{key: str(value) for key, value in fields.items()})
+        if state == self.state and self.version:
+            return False
+        self.state = state
+        self.version += 1
+        self.pending_repeats = self.repeats
+        self._send(time.time() if timestamp is None else timestamp)
+        return True
+
+    def fully_acked(self):
+        """全部目的地地址都已确认当前版本"""
+        addresses = self.transport.addresses(self.destination)
+        return bool(addresses) and all(self.acked.get(address, 0) >= self.version for address in addresses)
+
+    def tick(self, timestamp=None):
+        """每帧调用: 处理确认，按需要重复发送或发送心跳"""
+        if not self.version:
+            return
+        timestamp = time.time() if timestamp is None else timestamp
+        self.handle_acks()
+        elapsed = timestamp - self.last_sent
+        if self.pending_repeats > 0 and elapsed >= self.repeat_interval:
+            self.pending_repeats -= 1
+            if self.fully_acked():
+                self.repeats_skipped += 1 + self.pending_repeats
+                self.pending_repeats = 0
+            else:
+                self._send(timestamp)
+                return
+        if self.heartbeat_interval is not None and elapsed >= self.heartbeat_interval:
+            self._send(timestamp)
+
+    def handle_acks(self):
+        for data, address in self.transport.receive():
+            ack = parse_ack(data.decode('utf-8', errors='replace'))
+            if ack is None or ack[0] != self.epoch:
+                continue
+            self.acks_received += 1
+            self.acked[address] = max(self.acked.get(address, 0), ack[1])
+
+    def _send(self, timestamp):
+        # 同一目的地只保留最新的未发送快照
+        self.transport.send(self.destination, format_state(self.epoch, self.version, self.state), key="state")
+        self.last_sent = timestamp
+        self.snapshots_sent += 1
+
+
+class StateSyncReceiver:
+    """接收方的状态: 只接受更新的版本，并生成确认消息"""
+
+    def __init__(self):
+        self.epoch = None
+        self.version = 0
+        self.state = {}
+        self.updates = 0
+        self.duplicates = 0
+
+    def handle(self, message):
+        """
+        处理一条消息
+
+        返回:
+            (更新后的状态或 None, 确认消息或 None)；不是状态消息时为 (None, None)
+        """
+        parsed = parse_state(message)
+        if parsed is None:
+            return None, None
+        epoch, version, fields = parsed
+        if epoch != self.epoch:
+            if self.epoch is not None:
+                log_event(log, "state_sync.new_epoch", "StateSyncReceiver: 发送方已重启 (纪元 %(epoch)s)",
+                          logging.INFO, epoch=epoch)
+            self.epoch = epoch
+            self.version = 0
+        updated = None
+        if version > self.version:
+            self.version = version
+            self.state = fields
+            self.updates += 1
+            updated = fields
+        else:
+            self.duplicates += 1
+        return updated, f"{ACK_PREFIX}|{self.epoch}|{self.version}"
+
+
+def measure_convergence(loss=0.2, changes=30, change_interval=0.3, frame_interval=1 / 30, ack=True,
+                        repeats=3, repeat_interval=0.03, heartbeat_interval=1.0, seed=0):
+    """
+    通过本地丢包中继测量状态变化到达接收方的时间
+
+    参数:
+        loss: 中继双向的丢包概率
+        changes: 状态变化次数，每 change_interval 秒一次
+        frame_interval: 调用 tick 的间隔(秒)，模拟摄像头帧
+        ack: 接收方是否回复确认
+        repeats, repeat_interval, heartbeat_interval: 见 StateSyncSender
+
+    返回:
+        {"median_ms", "p99_ms": 已收到的版本的收敛时间, "unconverged": 被下一次变化覆盖前仍未收到的版本比例,
+         "packets_per_change": 每次变化发送的快照数}
+    """
+    from utils.lossy_proxy import LossyProxy
+    from utils.udp_transport import UdpTransport
+
+    receiver_sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver_sock.bind(("127.0.0.1", 0))
+    receiver_sock.settimeout(0.05)
+    arrivals = {}   # 版本 -> 首次收到的时间
+    stop_event = threading.Event()
+
+    def receive():
+        receiver = StateSyncReceiver()
+        while not stop_event.is_set():
+            try:
+                data, address = receiver_sock.recvfrom(65535)
+            except socket.timeout:
+                continue
+            updated, reply = receiver.handle(data.decode('utf-8'))
+            if updated is not None:
+                arrivals.setdefault(receiver.version, time.perf_counter())
+            if ack and reply:
+                receiver_sock.sendto(reply.encode('utf-8'), address)
+
+    thread = threading.Thread(target=receive, daemon=True)
+    thread.start()
+    proxy = LossyProxy(*receiver_sock.getsockname(), loss=loss, seed=seed).start()
+    transport = UdpTransport().start()
+    transport.add_destination("state", proxy.host, proxy.port)
+    sender = StateSyncSender(transport, "state", repeats=repeats, repeat_interval=repeat_interval,
+                             heartbeat_interval=heartbeat_interval)
+
+    changed_at = {}
+    start = time.perf_counter()
+    next_frame = start
+    for i in range(changes):
+        change_time = start + i * change_interval
+        while time.perf_counter() < change_time:
+            sender.tick(time.perf_counter())
+            next_frame += frame_interval
+            time.sleep(max(next_frame - time.perf_counter(), 0.0))
+        now = time.perf_counter()
+        sender.update(now, gesture=f"G{i % 7}", change=i)
+        changed_at[sender.version] = now
+    # 最后一次变化之后再运行一段时间
+    end = time.perf_counter() + change_interval
+    while time.perf_counter() < end:
+        sender.tick(time.perf_counter())
+        time.sleep(frame_interval)
+
+    transport.stop()
+    proxy.stop()
+    stop_event.set()
+    thread.join()
+    receiver_sock.close()
+
+    delays = np.array([arrivals[v] - t for v, t in changed_at.items() if v in arrivals]) * 1000
+    return {"median_ms": float(np.median(delays)) if len(delays) else float("nan"),
+            "p99_ms": float(np.percentile(delays, 99)) if len(delays) else float("nan"),
+            "unconverged": 1.0 - len(delays) / changes,
+            "packets_per_change": sender.snapshots_sent / changes,
+            "repeats_skipped": sender.repeats_skipped}
+
+
+if __name__ == "__main__":
+    # 比较只发送一次、冗余重发和冗余重发+确认在丢包下的收敛时间和发送量
+    for loss in (0.1, 0.3):
+        for name, kwargs in (("只发送一次", {"repeats": 0, "heartbeat_interval": None, "ack": False}),
+                             ("冗余", {"ack": False}),
+                             ("冗余+确认", {"ack": True})):
+            r = measure_convergence(loss=loss, **kwargs)
+            print(f"丢包 {loss:.0%} {name:<8}: 未收到 {r['unconverged']:.1%}, 收敛中位数 {r['median_ms']:.1f} ms, "
+                  f"p99 {r['p99_ms']:.1f} ms, 每次变化 {r['packets_per_change']:.2f} 个包")
@@ -0,0 +1,236 @@
+import collections
+import logging
+import select
+import socket
+import threading
+import time
+
+from utils.log import get_logger, log_event
+
+log = get_logger("network")
+
+# 共享的 UDP 发送服务: 手势、位置等所有发送方共用一个非阻塞套接字和一个发送线程。
+# 调用方的 send 只把消息放入有界队列就返回，摄像头循环从不等待网络；
+# 带 key 的消息（如每只手的位置）在队列中按 (目的地, key) 合并，还没发出的旧消息直接被新消息替换，
+# 发送跟不上时每只手只保留最新的位置，不会积压过时的数据。不带 key 的消息（手势变化）按顺序全部发送，
+# 队列满时丢弃新消息并计数。
+
+
+class UdpTransport:
+    """非阻塞 UDP 发送服务，可被多个发送方共享"""
+
+    def __init__(self, max_queue=256, send_timeout=0.05):
+        """
+        参数:
+            max_queue: 队列中最多的待发送消息数
+            send_timeout: 套接字发送缓冲区满时，发送线程等待可写的最长时间(秒)，超时后丢弃这条消息
+        """
+        self.max_queue = max_queue
+        self.send_timeout = send_timeout
+        self.sock = None
+        self._destinations = {}       # 名称 -> [(host, port), ...]
+        self._queue = collections.deque()
+        self._keyed = {}              # (目的地, key) -> 队列中的条目 [目的地, key, 数据]
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self._sending = False         # 发送线程正在发送刚取出的消息
+        # 统计
+        self.packets_sent = 0
+        self.bytes_sent = 0
+        self.dropped = 0              # 队列满时丢弃的消息数
+        self.coalesced = 0            # 被同 key 新消息替换的消息数
+        self.send_errors = 0
+        self.max_queue_depth = 0
+        self.destination_stats = {}   # 名称 -> {"packets", "bytes"}
+
+    @property
+    def queue_depth(self):
+        return len(self._queue)
+
+    @property
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def add_destination(self, name, host, port):
+        """
+        为目的地名称添加一个地址，同一名称可以添加多个地址（同一消息发送到每个地址）
+
+        返回:
+            地址能否解析
+        """
+        try:
+            address = socket.getaddrinfo(host, port, socket.AF_INET, socket.SOCK_DGRAM)[0][4]
+        except OSError as e:
+            log_event(log, "transport.resolve_error", "UdpTransport: 无法解析 %(host)s:%(port)s - %(error)s",
+                      logging.ERROR, host=host, port=port, error=e)
+            return False
+        with self._condition:
+            addresses = self._destinations.setdefault(name, [])
+            if address not in addresses:
+                addresses.append(address)
+            self.destination_stats.setdefault(name, {"packets": 0, "bytes": 0})
+        return True
+
+    def remove_destination(self, name):
+        with self._condition:
+            self._destinations.pop(name, None)
+
+    def addresses(self, name):
+        """目的地名称对应的地址列表"""
+        with self._condition:
+            return list(self._destinations.get(name, ()))
+
+    def start(self):
+        """创建套接字并启动发送线程（已启动时不做任何事）"""
+        if self.is_running:
+            return self
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.sock.setblocking(False)
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="UdpTransport", daemon=True)
+        self._thread.start()
+        return self
+
+    def send(self, destination, message, key=None):
+        """
+        放入发送队列，不阻塞
+
+        参数:
+            destination: add_destination 的名称
+            message: 字符串或 bytes
+            key: 合并键，队列中同一目的地、同一 key 的未发送消息被这条替换；None 表示不合并
+
+        返回:
+            是否已放入队列（队列满时为 False）
+        """
+        data = message.encode('utf-8') if isinstance(message, str) else message
+        with self._condition:
+            if key is not None:
+                entry = self._keyed.get((destination, key))
+                if entry is not None:
+                    entry[2] = data
+                    self.coalesced += 1
+                    return True
+            if len(self._queue) >= self.max_queue:
+                self.dropped += 1
+                log_event(log, "transport.queue_full", "UdpTransport: 发送队列已满，丢弃消息",
+                          logging.WARNING, destination=destination)
+                return False
+            entry = [destination, key, data]
+            self._queue.append(entry)
+            if key is not None:
+                self._keyed[(destination, key)] = entry
+            self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+            self._condition.notify()
+        return True
+
+    def receive(self, max_packets=64):
+        """
+        非阻塞地读取接收方发回本套接字的数据包（如状态同步的确认），没有数据时立即返回
+
+        返回:
+            [(bytes, 来源地址), ...]
+        """
+        packets = []
+        if self.sock is None:
+            return packets
+        for _ in range(max_packets):
+            try:
+                packets.append(self.sock.recvfrom(65535))
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                # 目的地端口未监听时 Linux 会在下一次读取时报告 ICMP 端口不可达，忽略即可
+                continue
+        return packets
+
+    def flush(self, timeout=1.0, destination=None):
+        """
+        等待队列发送完（最多 timeout 秒），返回是否已发完
+
+        参数:
+            destination: 只等待该目的地的消息，None 表示整个队列
+        """
+        def pending():
+            if destination is None:
+                return bool(self._queue)
+            return any(entry[0] == destination for entry in self._queue)
+
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while (pending() or self._sending) and time.monotonic() < deadline:
+                self._condition.wait(0.01)
+            return not pending()
+
+    def _sendto(self, data, address):
+        """在发送线程中发送一个数据包，发送缓冲区满时最多等待 send_timeout"""
+        try:
+            self.sock.sendto(data, address)
+            return True
+        except BlockingIOError:
+            _, writable, _ = select.select([], [self.sock], [], self.send_timeout)
+            if writable:
+                try:
+                    self.sock.sendto(data, address)
+                    return True
+                except OSError as e:
+                    error = e
+            else:
+                error = "发送缓冲区已满"
+        except OSError as e:
+            error = e
+        self.send_errors += 1
+        log_event(log, "transport.send_error", "UdpTransport: 发送到 %(address)s 失败 - %(error)s", logging.ERROR,
+                  address=address, error=error)
+        return False
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._stopping:
+                    self._condition.wait()
+                if not self._queue:
+                    break
+                destination, key, data = self._queue.popleft()
+                if key is not None:
+                    del self._keyed[(destination, key)]
+                addresses = list(self._destinations.get(destination, ()))
+                self._sending = True
+            sent = 0
+            for address in addresses:
+                if self._sendto(data, address):
+                    sent += 1
+            with self._condition:
+                self._sending = False
+                self.packets_sent += sent
+                self.bytes_sent += sent * len(data)
+                stats = self.destination_stats.get(destination)
+                if stats is not None:
+                    stats["packets"] += sent
+                    stats["bytes"] += sent * len(data)
+                self._condition.notify_all()
+
+    def stop(self, flush_timeout=0.5):
+        """发送完队列中的消息（最多 flush_timeout 秒）后停止发送线程并关闭套接字"""
+        if self._thread is not None:
+            self.flush(flush_timeout)
+            with self._condition:
+                self._stopping = True
+                self._queue.clear()
+                self._keyed.clear()
+                self._condition.notify_all()
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def stats(self):
+        """统计快照"""
+        with self._condition:
+            return {"queue_depth": len(self._queue), "max_queue_depth": self.max_queue_depth,
+                    "packets_sent": self.packets_sent, "bytes_sent": self.bytes_sent, "dropped": self.dropped,
+                    "coalesced": self.coalesced, "send_errors": self.send_errors,
+                    "destinations": {name: dict(s) for name, s in self.destination_stats.items()}}
@@ -0,0 +1,173 @@
+import numpy as np
+
+# 批量的四元数与骨骼变换计算（纯NumPy，不依赖bpy）
+# 四元数统一使用 Blender 的 (w, x, y, z) 顺序
+
+
+def quat_normalize(q):
+    """归一化四元数 (..., 4)"""
+    q = np.asarray(q, dtype=np.float64)
+    norm = np.linalg.norm(q, axis=-1, keepdims=True)
+    return q / np.where(norm > 1e-12, norm, 1.0)
+
+
+def quat_multiply(a, b):
+    """四元数乘法 a * b，支持广播"""
+    aw, ax, ay, az = np.moveaxis(np.asarray(a, dtype=np.float64), -1, 0)
+    bw, bx, by, bz = np.moveaxis(np.asarray(b, dtype=np.float64), -1, 0)
+    return np.stack([
+        aw * bw - ax * bx - ay * by - az * bz,
+        aw * bx + ax * bw + ay * bz - az * by,
+        aw * by - ax * bz + ay * bw + az * bx,
+        aw * bz + ax * by - ay * bx + az * bw,
+    ], axis=-1)
+
+
+def quat_to_matrix(q):
+    """四元数转旋转矩阵 (..., 4) -> (..., 3, 3)"""
+    w, x, y, z = np.moveaxis(quat_normalize(q), -1, 0)
+    m = np.empty(w.shape + (3, 3))
+    m[..., 0, 0] = 1 - 2 * (y * y + z * z)
+    m[..., 0, 1] = 2 * (x * y - w * z)
+    m[..., 0, 2] = 2 * (x * z + w * y)
+    m[..., 1, 0] = 2 * (x * y + w * z)
+    m[..., 1, 1] = 1 - 2 * (x * x + z * z)
+    m[..., 1, 2] = 2 * (y * z - w * x)
+    m[..., 2, 0] = 2 * (x * z - w * y)
+    m[..., 2, 1] = 2 * (y * z + w * x)
+    m[..., 2, 2] = 1 - 2 * (x * x + y * y)
+    return m
+
+
+def rotation_difference(a, b):
+    """
+    批量计算把向量 a 旋转到向量 b 的最短旋转，对应 mathutils.Vector.rotation_difference
+
+    参数:
+        a, b: 向量 (..., 3)
+
+    返回:
+        四元数 (..., 4)
+    """
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    a_n = a / np.maximum(np.linalg.norm(a, axis=-1, keepdims=True), 1e-12)
+    b_n = b / np.maximum(np.linalg.norm(b, axis=-1, keepdims=True), 1e-12)
+
+    w = 1.0 + np.sum(a_n * b_n, axis=-1)
+    xyz = np.cross(a_n, b_n)
+
+    # 方向相反时旋转轴不唯一，选一个与 a 垂直的轴旋转180度
+    opposite = w < 1e-8
+    if np.any(opposite):
+        ao = a_n[opposite]
+        axis = np.cross(ao, np.array([1.0, 0.0, 0.0]))
+        small = np.linalg.norm(axis, axis=-1) < 1e-6
+        axis[small] = np.cross(ao[small], np.array([0.0, 1.0, 0.0]))
+        xyz[opposite] = axis
+        w = np.where(opposite, 0.0, w)
+
+    return quat_normalize(np.concatenate([w[..., None], xyz], axis=-1))
+
+
+def quat_angle_between(a, b):
+    """两个四元数之间的旋转角度（弧度），q 与 -q 视为相同"""
+    dot = np.abs(np.sum(quat_normalize(a) * quat_normalize(b), axis=-1))
+    return 2.0 * np.arccos(np.clip(dot, 0.0, 1.0))
+
+
+def compose_matrices(location, rotation, scale):
+    """
+    由位置、四元数、缩放批量组合 4x4 变换矩阵
+
+    参数:
+        location: (..., 3)
+        rotation: (..., 4)
+        scale: (..., 3)
+
+    返回:
+        (..., 4, 4)
+    """
+    location = np.asarray(location, dtype=np.float64)
+    rot = quat_to_matrix(rotation) * np.asarray(scale, dtype=np.float64)[..., None, :]
+    m = np.zeros(rot.shape[:-2] + (4, 4))
+    m[..., :3, :3] = rot
+    m[..., :3, 3] = location
+    m[..., 3, 3] = 1.0
+    return m
+
+
+def forward_kinematics(rest_matrices, parents, basis_matrices):
+    """
+    批量计算所有帧的姿态矩阵，对应 Blender 的 pose_bone.matrix
+
+    参数:
+        rest_matrices: 骨架空间的静止矩阵 bone.matrix_local (B, 4, 4)
+        parents: 每个骨骼父骨骼的索引，根骨骼为 -1，需按父骨骼在前的顺序排列
+        basis_matrices: 每帧每个骨骼的局部变换 (F, B, 4, 4)
+
+    返回:
+        姿态矩阵 (F, B, 4, 4)
+    """
+    rest_matrices = np.asarray(rest_matrices, dtype=np.float64)
+    basis_matrices = np.asarray(basis_matrices, dtype=np.float64)
+    pose = np.empty_like(basis_matrices)
+    for b, parent in enumerate(parents):
+        if parent < 0:
+            pose[:, b] = rest_matrices[b] @ basis_matrices[:, b]
+        else:
+            offset = np.linalg.inv(rest_matrices[parent]) @ rest_matrices[b]
+            pose[:, b] = pose[:, parent] @ offset @ basis_matrices[:, b]
+    return pose
+
+
+def bone_heads_tails(pose_matrices, lengths):
+    """
+    由姿态矩阵计算骨骼头尾位置
+
+    参数:
+        pose_matrices: (F, B, 4, 4)
+        lengths: 骨骼长度 (B,)
+
+    返回:
+        heads, tails: (F, B, 3)
+    """
+    heads = pose_matrices[..., :3, 3]
+    tails = heads + pose_matrices[..., :3, 1] * np.asarray(lengths)[None, :, None]
+    return heads, tails
+
+
+def quat_make_continuous(q):
+    """翻转符号使相邻四元数位于同一半球，避免逐分量插值时绕远路 (F, 4)"""
+    q = np.array(q, dtype=np.float64)
+    if len(q) < 2:
+        return q
+    dots = np.sum(q[1:] * q[:-1], axis=-1)
+    # 累计翻转次数的奇偶决定每帧的符号
+    flips = np.concatenate([[0], np.cumsum(dots < 0)]) % 2
+    q[flips == 1] *= -1.0
+    return q
+
+
+def quat_nlerp(a, b, t):
+    """逐分量线性插值后归一化，与 Blender/Unity 逐分量四元数曲线的播放结果一致"""
+    t = np.asarray(t, dtype=np.float64)[..., None]
+    return quat_normalize(np.asarray(a) * (1.0 - t) + np.asarray(b) * t)
+
+
+def quat_slerp(a, b, t):
+    """球面线性插值，支持广播"""
+    a = quat_normalize(a)
+    b = quat_normalize(b)
+    t = np.asarray(t, dtype=np.float64)[..., None]
+    dot = np.sum(a * b, axis=-1, keepdims=True)
+    b = np.where(dot < 0, -b, b)
+    dot = np.abs(dot)
+    theta = np.arccos(np.clip(dot, -1.0, 1.0))
+    sin_theta = np.sin(theta)
+    # 夹角很小时退化为线性插值
+    small = sin_theta < 1e-6
+    safe = np.where(small, 1.0, sin_theta)
+    wa = np.where(small, 1.0 - t, np.sin((1.0 - t) * theta) / safe)
+    wb = np.where(small, t, np.sin(t * theta) / safe)
+    return quat_normalize(wa * a + wb * b)
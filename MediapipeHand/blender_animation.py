@@ -2,6 +2,15 @@ import bpy
 import json
 import mathutils
 import os
+import sys
+import numpy as np
+
+# 允许在Blender中导入同目录下的纯NumPy模块
+_module_dir = os.path.dirname(os.path.abspath(__file__))
+if _module_dir not in sys.path:
+    sys.path.append(_module_dir)
+from keyframe_reduction import reduce_channels, compress_quaternion_track
+from stage_profiler import profiler
 
 # 手指关键点与骨骼的映射关系
 # MediaPipe使用21个关键点表示一只手
@@ -178,7 +187,93 @@ def calculate_bone_rotation(start_pos, end_pos, rest_direction=mathutils.Vector(
     # 计算从休息状态到目标方向的旋转
     return rest_direction.rotation_difference(direction)
 
-def apply_tracking_data(armature, tracking_data):
+def _read_fcurve(fcu):
+    """一次读取曲线所有关键帧 (K, 2)"""
+    co = np.empty(len(fcu.keyframe_points) * 2, dtype=np.float32)
+    fcu.keyframe_points.foreach_get('co', co)
+    return co.reshape(-1, 2)
+
+def _write_fcurve(fcu, frames, values):
+    """用给定的关键帧替换曲线内容，使用线性插值以保证精简时的误差上限"""
+    keys = np.column_stack([frames, values]).astype(np.float32)
+    fcu.keyframe_points.clear()
+    fcu.keyframe_points.add(len(keys))
+    fcu.keyframe_points.foreach_set('co', keys.ravel())
+    fcu.keyframe_points.foreach_set('interpolation', [1] * len(keys))  # 'LINEAR'
+    fcu.update()
+
+def reduce_action_keyframes(armature, angle_tolerance_deg=1.0, location_tolerance=0.002,
+                            quantize_bits=None):
+    """
+    对骨架动作做误差有界的关键帧精简
+    
+    旋转曲线按四元数角度误差精简（可选最小三分量量化），位置和缩放曲线按逐通道绝对误差精简。
+    
+    参数:
+        armature: 骨架对象
+        angle_tolerance_deg: 旋转允许的最大角度误差（度）
+        location_tolerance: 位置和缩放允许的最大绝对误差
+        quantize_bits: 四元数量化位数，None 表示不量化
+    
+    返回:
+        报告字典: 原始关键帧数、精简后关键帧数、压缩率、最大角度误差
+    """
+    if not armature.animation_data or not armature.animation_data.action:
+        return None
+    action = armature.animation_data.action
+    
+    # 按属性路径把曲线分组，同一属性的各分量一起精简
+    channels = {}
+    for fcu in action.fcurves:
+        channels.setdefault(fcu.data_path, {})[fcu.array_index] = fcu
+    
+    original_keys = 0
+    reduced_keys = 0
+    max_angle = 0.0
+    for data_path, curves in channels.items():
+        indices = sorted(curves)
+        arrays = [_read_fcurve(curves[i]) for i in indices]
+        # 各分量的关键帧在烘焙时同时插入，帧号应当一致
+        frames = arrays[0][:, 0]
+        if len(frames) < 3 or any(len(a) != len(frames) or not np.array_equal(a[:, 0], frames)
+                                  for a in arrays):
+            continue
+        values = np.column_stack([a[:, 1] for a in arrays])
+        
+        if data_path.endswith('rotation_quaternion') and len(indices) == 4:
+            kept_frames, kept_values, report = compress_quaternion_track(
+                frames, values, angle_tolerance_deg, quantize_bits)
+            max_angle = max(max_angle, report["max_angle_deg"])
+        else:
+            keep = reduce_channels(frames, values, location_tolerance)
+            kept_frames, kept_values = frames[keep], values[keep]
+        
+        for column, i in enumerate(indices):
+            _write_fcurve(curves[i], kept_frames, kept_values[:, column])
+        original_keys += len(frames) * len(indices)
+        reduced_keys += len(kept_frames) * len(indices)
+    
+    report = {
+        "original_keys": original_keys,
+        "reduced_keys": reduced_keys,
+        "compression_ratio": original_keys / max(reduced_keys, 1),
+        "max_angle_deg": max_angle,
+    }
+    print(f"{armature.name}: 关键帧 {original_keys} -> {reduced_keys}, "
+          f"压缩率 {report['compression_ratio']:.1f}, 最大角度误差 {max_angle:.2f} 度")
+    return report
+
+def apply_tracking_data(armature, tracking_data, reduce_keyframes=False, angle_tolerance_deg=1.0,
+                        location_tolerance=0.002, quantize_bits=None):
+    """
+    将跟踪数据烘焙为左右手骨架动画
+    
+    参数:
+        armature: 未使用，骨架会重新创建
+        tracking_data: hand_tracker 输出的跟踪数据
+        reduce_keyframes: 烘焙后是否做误差有界的关键帧精简
+        angle_tolerance_deg, location_tolerance, quantize_bits: 见 reduce_action_keyframes
+    """
     # 首先，清除所有现有的骨架和标记
     # 查找并删除所有之前创建的对象
     objects_to_remove = []
@@ -321,6 +416,12 @@ def apply_tracking_data(armature, tracking_data):
     
     print(f"动画已应用于 {len(frames)} 帧，并添加了可视化标记")
     
+    # 精简烘焙出的动作曲线
+    if reduce_keyframes:
+        with profiler.span("reduce_keyframes"):
+            for target in [left_armature, right_armature]:
+                reduce_action_keyframes(target, angle_tolerance_deg, location_tolerance, quantize_bits)
+    
     # 调整视图
     bpy.ops.view3d.view_all(center=True)
 
@@ -330,8 +431,12 @@ def main():
         json_path = r"D:\College\Game\ShadowTheatre\MediapipeHand\hand_tracking_data.json"
         
         # 加载跟踪数据并应用到骨骼
-        tracking_data = load_tracking_data(json_path)
-        apply_tracking_data(None, tracking_data)
+        with profiler.span("load_tracking_data"):
+            tracking_data = load_tracking_data(json_path)
+        with profiler.span("apply_tracking_data"):
+            apply_tracking_data(None, tracking_data, reduce_keyframes=True)
+        if profiler.enabled:
+            print(profiler.format_summary())
         
         # 设置一些渲染选项
         for area in bpy.context.screen.areas:
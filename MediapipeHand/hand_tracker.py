@@ -4,11 +4,19 @@ import json
 import numpy as np
 import os
 
+from stage_profiler import profiler
+
 # 初始化MediaPipe手部解决方案
 mp_hands = mp.solutions.hands
 mp_drawing = mp.solutions.drawing_utils
 
-def process_video(video_path, output_json_path):
+def process_video(video_path, output_json_path, trace_path=None):
+    """
+    逐帧检测视频中的手部关键点并保存为JSON
+    
+    参数:
+        trace_path: 设置环境变量 GESTURE_PROFILE=1 时导出 Chrome trace 的路径
+    """
     # 保存所有帧的手部关键点
     frames_data = []
     
@@ -24,15 +32,19 @@ def process_video(video_path, output_json_path):
         min_tracking_confidence=0.5) as hands:
         
         while cap.isOpened():
+            profiler.start_frame()
             success, image = cap.read()
             if not success:
                 break
+            profiler.lap("cap.read")
                 
             # 将BGR图像转换为RGB
             image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+            profiler.lap("cvtColor")
             
             # 处理图像
             results = hands.process(image_rgb)
+            profiler.lap("hands.process")
             
             # 存储当前帧数据
             frame_data = {"frame": frame_count, "hands": []}
@@ -72,6 +84,7 @@ def process_video(video_path, output_json_path):
                         mp_drawing.DrawingSpec(color=color, thickness=2))
             
             frames_data.append(frame_data)
+            profiler.lap("collect+draw")
             
             # 显示结果（可选）- 添加帧编号和检测到的手数
             hand_count = len(frame_data["hands"])
@@ -79,7 +92,10 @@ def process_video(video_path, output_json_path):
             cv2.putText(image, status_text, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 255), 2)
             
             cv2.imshow('MediaPipe Hands', image)
-            if cv2.waitKey(5) & 0xFF == 27:  # ESC键退出
+            key = cv2.waitKey(5) & 0xFF
+            profiler.lap("imshow")
+            profiler.maybe_report()
+            if key == 27:  # ESC键退出
                 break
                 
             frame_count += 1
@@ -88,12 +104,18 @@ def process_video(video_path, output_json_path):
     cv2.destroyAllWindows()
     
     # 将数据保存为JSON文件
-    with open(output_json_path, 'w') as f:
-        json.dump({"frames": frames_data}, f, indent=2)
+    with profiler.span("json.dump"):
+        with open(output_json_path, 'w') as f:
+            json.dump({"frames": frames_data}, f, indent=2)
+    
+    if profiler.enabled:
+        print(profiler.format_summary())
+        if trace_path:
+            profiler.export_chrome_trace(trace_path)
     
     print(f"处理完成！共 {frame_count} 帧。数据已保存到 {output_json_path}")
 
 if __name__ == "__main__":
     video_path = "VID_20250327_204737.mp4"  # 替换为你的视频路径
     output_json_path = "hand_tracking_data.json"
-    process_video(video_path, output_json_path)
\ No newline at end of file
+    process_video(video_path, output_json_path, trace_path="hand_tracker_trace.json")
\ No newline at end of file
@@ -0,0 +1,210 @@
+import numpy as np
+
+from anim_math import quat_make_continuous, quat_nlerp, quat_slerp, quat_angle_between
+
+# 带误差上限的关键帧精简与四元数量化（纯NumPy，不依赖bpy）
+# blender_animation.apply_tracking_data 烘焙后调用这里的函数精简动作曲线
+
+
+def _rdp(times, values, error_fn, tolerance):
+    """
+    Ramer-Douglas-Peucker 关键帧精简
+
+    参数:
+        times: 帧时间 (K,)
+        values: 每帧的值 (K, C)
+        error_fn: error_fn(times, values, lo, hi) 返回区间 [lo, hi] 内各点
+                  相对于两端插值结果的误差 (hi - lo + 1,)
+        tolerance: 允许的最大误差
+
+    返回:
+        保留的关键帧索引（升序）
+    """
+    n = len(times)
+    if n <= 2:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        lo, hi = stack.pop()
+        if hi - lo < 2:
+            continue
+        err = error_fn(times, values, lo, hi)
+        split = int(np.argmax(err[1:-1])) + 1
+        if err[split] > tolerance:
+            mid = lo + split
+            keep[mid] = True
+            stack.append((lo, mid))
+            stack.append((mid, hi))
+    return np.nonzero(keep)[0]
+
+
+def _linear_error(times, values, lo, hi):
+    """逐通道线性插值的最大绝对误差"""
+    t = (times[lo:hi + 1] - times[lo]) / (times[hi] - times[lo])
+    interp = values[lo] + (values[hi] - values[lo]) * t[:, None]
+    return np.max(np.abs(values[lo:hi + 1] - interp), axis=1)
+
+
+def _quat_error_fn(use_slerp):
+    interpolate = quat_slerp if use_slerp else quat_nlerp
+
+    def error(times, values, lo, hi):
+        t = (times[lo:hi + 1] - times[lo]) / (times[hi] - times[lo])
+        interp = interpolate(values[lo], values[hi], t)
+        return quat_angle_between(values[lo:hi + 1], interp)
+
+    return error
+
+
+def reduce_channels(times, values, tolerance):
+    """
+    对多通道曲线（位置、缩放、关键点坐标等）做误差有界的精简
+
+    参数:
+        times: 帧时间 (K,)
+        values: (K, C)
+        tolerance: 任一通道允许的最大绝对误差
+
+    返回:
+        保留的关键帧索引
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64).reshape(len(times), -1)
+    return _rdp(times, values, _linear_error, tolerance)
+
+
+def reduce_quaternions(times, quats, max_angle_deg=1.0, use_slerp=False):
+    """
+    对四元数曲线做角度误差有界的精简
+
+    参数:
+        times: 帧时间 (K,)
+        quats: (K, 4)，(w, x, y, z)
+        max_angle_deg: 允许的最大角度误差（度）
+        use_slerp: 误差按球面插值计算，默认按逐分量插值计算（与 Blender 播放一致）
+
+    返回:
+        (保留的关键帧索引, 处理过符号连续性的四元数)
+    """
+    times = np.asarray(times, dtype=np.float64)
+    quats = quat_make_continuous(quats)
+    keep = _rdp(times, quats, _quat_error_fn(use_slerp), np.radians(max_angle_deg))
+    return keep, quats
+
+
+def quantize_quaternions(quats, bits=16):
+    """
+    "最小三分量"量化: 丢弃绝对值最大的分量，其余三个分量量化为定点整数
+
+    参数:
+        quats: (K, 4)
+        bits: 每个分量的位数（不超过16）
+
+    返回:
+        (最大分量索引 uint8 (K,), 量化分量 int16 (K, 3))
+    """
+    q = quat_make_continuous(quats)
+    q = q / np.linalg.norm(q, axis=1, keepdims=True)
+    largest = np.argmax(np.abs(q), axis=1)
+    # 使被丢弃的分量为正，解码时可由其余分量恢复
+    sign = np.where(q[np.arange(len(q)), largest] < 0, -1.0, 1.0)
+    q = q * sign[:, None]
+
+    mask = np.ones_like(q, dtype=bool)
+    mask[np.arange(len(q)), largest] = False
+    rest = q[mask].reshape(-1, 3)
+
+    # 其余分量的取值范围为 [-1/sqrt(2), 1/sqrt(2)]
+    scale = (2 ** (bits - 1) - 1) / np.sqrt(0.5)
+    packed = np.rint(rest * scale).astype(np.int16)
+    return largest.astype(np.uint8), packed
+
+
+def dequantize_quaternions(largest, packed, bits=16):
+    """quantize_quaternions 的逆操作"""
+    scale = (2 ** (bits - 1) - 1) / np.sqrt(0.5)
+    rest = packed.astype(np.float64) / scale
+    missing = np.sqrt(np.clip(1.0 - np.sum(rest * rest, axis=1), 0.0, 1.0))
+
+    q = np.empty((len(rest), 4))
+    mask = np.ones_like(q, dtype=bool)
+    mask[np.arange(len(q)), largest] = False
+    q[mask] = rest.ravel()
+    q[np.arange(len(q)), largest] = missing
+    return q
+
+
+def evaluate_reduced_quaternions(times, reduced_times, reduced_quats, use_slerp=False):
+    """在原始帧时间上重建精简后的四元数曲线"""
+    times = np.asarray(times, dtype=np.float64)
+    seg = np.clip(np.searchsorted(reduced_times, times, side='right') - 1, 0, len(reduced_times) - 2)
+    span = reduced_times[seg + 1] - reduced_times[seg]
+    t = np.clip((times - reduced_times[seg]) / np.where(span > 0, span, 1.0), 0.0, 1.0)
+    interpolate = quat_slerp if use_slerp else quat_nlerp
+    return interpolate(reduced_quats[seg], reduced_quats[seg + 1], t)
+
+
+def compress_quaternion_track(times, quats, max_angle_deg=1.0, quantize_bits=None, use_slerp=False):
+    """
+    精简并可选量化一条四元数曲线，报告压缩率和最大角度误差
+
+    返回:
+        (保留帧时间, 保留四元数, 报告字典)
+    """
+    times = np.asarray(times, dtype=np.float64)
+    keep, continuous = reduce_quaternions(times, quats, max_angle_deg, use_slerp)
+    reduced_times = times[keep]
+    reduced = continuous[keep]
+
+    if quantize_bits:
+        reduced = dequantize_quaternions(*quantize_quaternions(reduced, quantize_bits), quantize_bits)
+        reduced = quat_make_continuous(reduced)
+
+    if len(reduced_times) >= 2:
+        rebuilt = evaluate_reduced_quaternions(times, reduced_times, reduced, use_slerp)
+    else:
+        rebuilt = np.repeat(reduced, len(times), axis=0)
+    max_error = float(np.degrees(quat_angle_between(continuous, rebuilt)).max()) if len(times) else 0.0
+
+    # 原始数据按4个float32计算，量化后按1字节索引加3个int16计算
+    original_bytes = len(times) * 4 * 4
+    key_bytes = 1 + 3 * 2 if quantize_bits else 4 * 4
+    report = {
+        "original_keys": len(times),
+        "reduced_keys": len(reduced_times),
+        "compression_ratio": original_bytes / max(len(reduced_times) * key_bytes, 1),
+        "max_angle_deg": max_error,
+    }
+    return reduced_times, reduced, report
+
+
+def reduce_landmark_track(times, landmarks, tolerance=0.002):
+    """
+    对整条关键点轨迹做误差有界的精简，所有关键点共用一组保留帧
+
+    参数:
+        times: 帧时间 (F,)
+        landmarks: (F, 21, 3)
+        tolerance: 任一坐标允许的最大绝对误差（归一化坐标）
+
+    返回:
+        (保留的帧索引, 压缩率)
+    """
+    landmarks = np.asarray(landmarks, dtype=np.float64)
+    keep = reduce_channels(times, landmarks.reshape(len(landmarks), -1), tolerance)
+    return keep, len(landmarks) / max(len(keep), 1)
+
+
+if __name__ == "__main__":
+    # 在合成的旋转曲线上演示压缩效果
+    rng = np.random.default_rng(0)
+    frames = np.arange(600, dtype=np.float64)
+    angles = np.sin(frames / 40.0) * 1.2 + rng.normal(scale=0.002, size=len(frames))
+    axis = np.array([0.3, 0.8, 0.5]) / np.linalg.norm([0.3, 0.8, 0.5])
+    quats = np.concatenate([np.cos(angles / 2)[:, None], np.sin(angles / 2)[:, None] * axis], axis=1)
+    for bits in (None, 16, 12):
+        _, _, report = compress_quaternion_track(frames, quats, max_angle_deg=1.0, quantize_bits=bits)
+        print(f"量化位数 {bits}: {report}")
@@ -0,0 +1,333 @@
+import json
+import time
+import warnings
+import numpy as np
+
+# 离线关键点清理（纯NumPy，不依赖bpy/cv2）
+# 对整条跟踪数据做: 左右手交换修正 -> 骨长异常剔除 -> 短缺口插值 -> 零相位低通滤波
+# 输出既可以写回 hand_tracking_data.json 的格式供 blender_animation 导入，
+# 也可以转换为 gesture_data 的会话格式供 GestureTrainer 训练
+
+HAND_SLOTS = ["Left", "Right"]
+
+# MediaPipe关键点连接，与 blender_animation.HAND_CONNECTIONS 相同
+HAND_CONNECTIONS = [
+    (0, 1), (1, 2), (2, 3), (3, 4),         # 拇指
+    (0, 5), (5, 6), (6, 7), (7, 8),         # 食指
+    (0, 9), (9, 10), (10, 11), (11, 12),    # 中指
+    (0, 13), (13, 14), (14, 15), (15, 16),  # 环指
+    (0, 17), (17, 18), (18, 19), (19, 20)   # 小指
+]
+
+
+def load_tracks(tracking_data):
+    """
+    将跟踪数据转换为数组
+
+    参数:
+        tracking_data: {"frames": [{"frame": i, "hands": [...]}, ...]}
+
+    返回:
+        landmarks: (F, 2, 21, 3)，第二维按 HAND_SLOTS 排列，缺失为 NaN
+        confidence: (F, 2)，缺失为 0
+    """
+    frames = tracking_data["frames"]
+    landmarks = np.full((len(frames), 2, 21, 3), np.nan)
+    confidence = np.zeros((len(frames), 2))
+
+    for f, frame_data in enumerate(frames):
+        for hand_data in frame_data.get("hands", []):
+            slot = 0 if hand_data["handedness"] == "Left" else 1
+            # 两只手被标为同一侧时，第二只手放到空闲的槽位
+            if confidence[f, slot] > 0:
+                slot = 1 - slot
+                if confidence[f, slot] > 0:
+                    continue
+            landmarks[f, slot] = [[lm["x"], lm["y"], lm["z"]] for lm in hand_data["landmarks"]]
+            confidence[f, slot] = hand_data.get("confidence", 1.0)
+
+    return landmarks, confidence
+
+
+def _valid(landmarks):
+    """每帧每只手是否有数据 (F, 2)"""
+    return ~np.isnan(landmarks).any(axis=(-1, -2))
+
+
+def _forward_fill_index(valid, max_age=None):
+    """每帧之前（含当前帧）最近一个有效帧的索引，没有或超过 max_age 为 -1"""
+    frames = np.arange(len(valid)).reshape((-1,) + (1,) * (valid.ndim - 1))
+    idx = np.maximum.accumulate(np.where(valid, frames, -1), axis=0)
+    if max_age is not None:
+        idx = np.where((idx >= 0) & (frames - idx <= max_age), idx, -1)
+    return idx
+
+
+def _backward_fill_index(valid):
+    """每帧之后（含当前帧）最近一个有效帧的索引，没有为 -1"""
+    rev = _forward_fill_index(valid[::-1])
+    n = len(valid)
+    return np.where(rev >= 0, n - 1 - rev, -1)[::-1]
+
+
+def resolve_handedness(landmarks, confidence=None, window=9, margin=0.8):
+    """
+    按时间连续性修正左右手标签的闪烁
+
+    先对每个槽位的手部中心做滑动窗口中值，得到不受短暂闪烁影响的参考轨迹；
+    再对每一帧比较"保持标签"和"交换标签"两种分配与参考轨迹的距离，交换明显更近时翻转该帧。
+    持续时间超过半个窗口的标签变化视为真实变化，不做修正。
+
+    参数:
+        landmarks: (F, 2, 21, 3)
+        confidence: (F, 2)，与关键点一起交换
+        window: 中值窗口帧数
+        margin: 交换后的代价需小于保持代价的这个比例才翻转
+
+    返回:
+        (修正后的 landmarks, confidence, 被翻转的帧数)
+    """
+    n = len(landmarks)
+    if n < 2:
+        return landmarks, confidence, 0
+
+    centers = landmarks[..., :2].mean(axis=2)   # (F, 2, 2)，缺失的手为 NaN
+    half = window // 2
+    padded = np.concatenate([np.full((half, 2, 2), np.nan), centers, np.full((half, 2, 2), np.nan)])
+    windows = np.lib.stride_tricks.sliding_window_view(padded, 2 * half + 1, axis=0)
+    with warnings.catch_warnings():
+        # 整个窗口都没有数据时结果为 NaN，不需要警告
+        warnings.simplefilter("ignore", RuntimeWarning)
+        reference = np.nanmedian(windows, axis=-1)   # (F, 2, 2)
+
+    def dist(a, b):
+        return np.linalg.norm(a - b, axis=-1)
+
+    # 每只手分别计算保持标签和交换标签时与参考轨迹的距离
+    keep_terms = np.stack([dist(centers[:, 0], reference[:, 0]), dist(centers[:, 1], reference[:, 1])], axis=1)
+    swap_terms = np.stack([dist(centers[:, 0], reference[:, 1]), dist(centers[:, 1], reference[:, 0])], axis=1)
+
+    # 只比较两种分配都能计算的手，避免一侧缺失时误判
+    comparable = ~np.isnan(keep_terms) & ~np.isnan(swap_terms)
+    keep_cost = np.where(comparable, keep_terms, 0.0).sum(axis=1)
+    swap_cost = np.where(comparable, swap_terms, 0.0).sum(axis=1)
+    flip = comparable.any(axis=1) & (swap_cost < keep_cost * margin)
+
+    landmarks = landmarks.copy()
+    landmarks[flip] = landmarks[flip][:, ::-1]
+    if confidence is not None:
+        confidence = confidence.copy()
+        confidence[flip] = confidence[flip][:, ::-1]
+    return landmarks, confidence, int(flip.sum())
+
+
+def bone_lengths(landmarks):
+    """每帧每只手的20段骨长 (F, 2, 20)"""
+    starts = [a for a, _ in HAND_CONNECTIONS]
+    ends = [b for _, b in HAND_CONNECTIONS]
+    return np.linalg.norm(landmarks[..., ends, :] - landmarks[..., starts, :], axis=-1)
+
+
+def reject_bone_outliers(landmarks, threshold=6.0):
+    """
+    剔除骨长比例异常的帧
+
+    骨长除以手掌长度（手腕到中指根部）消除与摄像头距离的影响，
+    再按每只手每段骨骼的中位数和MAD计算稳健z分数，超过阈值的整帧置为缺失。
+
+    返回:
+        (处理后的 landmarks, 被剔除的帧数)
+    """
+    lengths = bone_lengths(landmarks)
+    palm = np.linalg.norm(landmarks[..., 9, :] - landmarks[..., 0, :], axis=-1)
+    ratios = np.log(np.maximum(lengths, 1e-9) / np.maximum(palm, 1e-9)[..., None])
+
+    with warnings.catch_warnings():
+        # 从未检测到的手整列为 NaN，结果为 NaN，不需要警告
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(ratios, axis=0, keepdims=True)
+        mad = np.nanmedian(np.abs(ratios - median), axis=0, keepdims=True) * 1.4826
+    z = np.abs(ratios - median) / np.maximum(mad, 1e-6)
+    outlier = np.nanmax(np.where(np.isnan(z), 0.0, z), axis=-1) > threshold   # (F, 2)
+
+    landmarks = landmarks.copy()
+    landmarks[outlier] = np.nan
+    return landmarks, int(outlier.sum())
+
+
+def fill_gaps(landmarks, max_gap=5):
+    """
+    对不超过 max_gap 帧的缺口做线性插值
+
+    返回:
+        (插值后的 landmarks, 被填补的帧数)
+    """
+    n = len(landmarks)
+    valid = _valid(landmarks)
+    prev_idx = _forward_fill_index(valid)
+    next_idx = _backward_fill_index(valid)
+
+    gap = next_idx - prev_idx - 1
+    fill = ~valid & (prev_idx >= 0) & (next_idx >= 0) & (gap <= max_gap)
+    if not fill.any():
+        return landmarks, 0
+
+    frames = np.arange(n)[:, None]
+    span = np.where(fill, next_idx - prev_idx, 1)
+    t = np.where(fill, (frames - prev_idx) / span, 0.0)
+
+    slots = np.broadcast_to(np.arange(2), (n, 2))
+    before = landmarks[np.maximum(prev_idx, 0), slots]
+    after = landmarks[np.maximum(next_idx, 0), slots]
+    interp = before + (after - before) * t[..., None, None]
+
+    landmarks = landmarks.copy()
+    landmarks[fill] = interp[fill]
+    return landmarks, int(fill.sum())
+
+
+def lowpass_kernel(fps, cutoff_hz, taps=None):
+    """对称的加窗sinc低通FIR核，对称核即零相位"""
+    if taps is None:
+        taps = int(np.ceil(fps / cutoff_hz)) * 2 + 1
+    taps = taps | 1
+    n = np.arange(taps) - taps // 2
+    fc = cutoff_hz / fps
+    kernel = 2 * fc * np.sinc(2 * fc * n) * np.hamming(taps)
+    return kernel / kernel.sum()
+
+
+def zero_phase_lowpass(landmarks, fps=30.0, cutoff_hz=6.0):
+    """
+    零相位低通滤波，用FFT一次卷积所有手、关键点和坐标通道
+
+    缺失帧先用最近的有效值临时填充，滤波后恢复为缺失，避免NaN扩散。
+    """
+    n = len(landmarks)
+    kernel = lowpass_kernel(fps, cutoff_hz)
+    half = len(kernel) // 2
+    if n < 2:
+        return landmarks
+
+    valid = _valid(landmarks)
+    prev_idx = _forward_fill_index(valid)
+    next_idx = _backward_fill_index(valid)
+    nearest = np.where(prev_idx >= 0, prev_idx, next_idx)
+    has_data = nearest >= 0
+    slots = np.broadcast_to(np.arange(2), (n, 2))
+    filled = landmarks[np.maximum(nearest, 0), slots]
+    filled = np.where(has_data[..., None, None], filled, 0.0)
+
+    # 反射填充边界，避免首尾被拉向0
+    pad = min(half, n - 1)
+    signal = np.concatenate([filled[pad:0:-1], filled, filled[-2:-pad - 2:-1]], axis=0)
+    size = len(signal) + len(kernel) - 1
+    nfft = 1 << (size - 1).bit_length()
+    spectrum = np.fft.rfft(signal, nfft, axis=0)
+    spectrum *= np.fft.rfft(kernel, nfft)[:, None, None, None]
+    smoothed = np.fft.irfft(spectrum, nfft, axis=0)[half + pad:half + pad + n]
+
+    return np.where(valid[..., None, None], smoothed, np.nan)
+
+
+def clean_tracks(landmarks, confidence=None, fps=30.0, max_gap=5, cutoff_hz=6.0,
+                 outlier_threshold=6.0):
+    """
+    完整的离线清理流程
+
+    返回:
+        (landmarks, confidence, 统计信息字典)
+    """
+    stats = {"frames": len(landmarks)}
+    start = time.perf_counter()
+    landmarks, confidence, stats["handedness_flipped"] = resolve_handedness(landmarks, confidence)
+    landmarks, stats["outliers_rejected"] = reject_bone_outliers(landmarks, outlier_threshold)
+    landmarks, stats["gaps_filled"] = fill_gaps(landmarks, max_gap)
+    landmarks = zero_phase_lowpass(landmarks, fps, cutoff_hz)
+    stats["seconds"] = time.perf_counter() - start
+
+    if confidence is not None:
+        # 被剔除或新插值的帧同步更新置信度
+        valid = _valid(landmarks)
+        confidence = np.where(valid, np.where(confidence > 0, confidence, 1.0), 0.0)
+    return landmarks, confidence, stats
+
+
+def to_tracking_data(landmarks, confidence=None):
+    """转换回 hand_tracker 的输出格式，供 blender_animation 导入"""
+    valid = _valid(landmarks)
+    frames = []
+    for f in range(len(landmarks)):
+        hands = []
+        for slot in range(2):
+            if not valid[f, slot]:
+                continue
+            hands.append({
+                "handedness": HAND_SLOTS[slot],
+                "confidence": float(confidence[f, slot]) if confidence is not None else 1.0,
+                "landmarks": [{"id": i, "x": float(x), "y": float(y), "z": float(z), "visibility": 1.0}
+                              for i, (x, y, z) in enumerate(landmarks[f, slot])]
+            })
+        frames.append({"frame": f, "hands": hands})
+    return {"frames": frames}
+
+
+def to_gesture_session(landmarks, gesture_name, is_two_hands=False):
+    """
+    转换为 gesture_data 的会话格式，供 GestureTrainer 训练
+
+    单手手势使用每帧第一只有数据的手，双手手势只保留两只手都有数据的帧。
+    """
+    valid = _valid(landmarks)
+
+    def to_list(hand):
+        return [{"x": float(x), "y": float(y), "z": float(z)} for x, y, z in hand]
+
+    samples = []
+    for f in range(len(landmarks)):
+        if is_two_hands:
+            if valid[f].all():
+                samples.append({"hand1": to_list(landmarks[f, 0]), "hand2": to_list(landmarks[f, 1]),
+                                "is_two_hands": True})
+        elif valid[f].any():
+            slot = 0 if valid[f, 0] else 1
+            samples.append({"hand1": to_list(landmarks[f, slot]), "hand2": None, "is_two_hands": False})
+    return {"gesture": gesture_name, "is_two_hands": is_two_hands, "samples": samples}
+
+
+def benchmark_cleanup(hours=1.0, fps=30.0, seed=0):
+    """在合成数据上测试清理速度"""
+    rng = np.random.default_rng(seed)
+    n = int(hours * 3600 * fps)
+    t = np.arange(n) / fps
+    base = rng.normal(scale=0.03, size=(1, 2, 21, 3))
+    motion = 0.2 * np.sin(t * 0.7)[:, None, None, None]
+    landmarks = base + motion + np.array([0.3, 0.7])[None, :, None, None]
+    landmarks = landmarks + rng.normal(scale=0.003, size=landmarks.shape)
+    # 随机丢失和左右手闪烁
+    landmarks[rng.random((n, 2)) < 0.05] = np.nan
+    swap = rng.random(n) < 0.01
+    landmarks[swap] = landmarks[swap][:, ::-1]
+
+    _, _, stats = clean_tracks(landmarks, fps=fps)
+    print(f"{hours:.1f} 小时 ({n} 帧): {stats['seconds']:.2f} 秒, {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    import os
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    input_path = os.path.join(current_dir, "hand_tracking_data.json")
+    output_path = os.path.join(current_dir, "hand_tracking_data_clean.json")
+
+    with open(input_path, 'r') as f:
+        raw = json.load(f)
+    landmarks, confidence = load_tracks(raw)
+    landmarks, confidence, stats = clean_tracks(landmarks, confidence)
+    print(f"清理完成: {stats}")
+
+    with open(output_path, 'w') as f:
+        json.dump(to_tracking_data(landmarks, confidence), f)
+    print(f"已保存到 {output_path}")
+
+    benchmark_cleanup()
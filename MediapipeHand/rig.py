@@ -1,7 +1,20 @@
 import bpy
 import mathutils
+import time
 import bmesh
 import re
+import os
+import sys
+import numpy as np
+
+# 允许在Blender中导入同目录下的纯NumPy模块
+_module_dir = os.path.dirname(os.path.abspath(__file__))
+if _module_dir not in sys.path:
+    sys.path.append(_module_dir)
+
+from skin_weights import compute_bone_weights, group_by_weight
+from anim_math import (compose_matrices, forward_kinematics, bone_heads_tails,
+                       rotation_difference, quat_angle_between)
 
 def create_vertex_groups(model, armature):
     """为模型创建与骨骼对应的顶点组"""
@@ -72,122 +85,130 @@ def detect_finger_bones(armature):
     
     return result
 
-def auto_weight_hand_model(model, armature, finger_definitions):
-    """为手部模型自动分配权重"""
+def _finger_layout(finger_name, bbox_min, bbox_center, bbox_size, wrist_pos):
+    """根据包围盒估计手指的中心位置和影响半径"""
+    if finger_name == "thumb":
+        # 拇指通常在X轴负方向（假设右手）
+        center = (bbox_min[0] + bbox_size[0] * 0.2, wrist_pos[1] + bbox_size[1] * 0.3, bbox_center[2])
+        radius = bbox_size[0] * 0.25
+    elif finger_name == "index":
+        center = (bbox_min[0] + bbox_size[0] * 0.3, wrist_pos[1] + bbox_size[1] * 0.5, bbox_center[2])
+        radius = bbox_size[0] * 0.15
+    elif finger_name == "middle":
+        center = (bbox_center[0], wrist_pos[1] + bbox_size[1] * 0.5, bbox_center[2])
+        radius = bbox_size[0] * 0.15
+    elif finger_name == "ring":
+        center = (bbox_min[0] + bbox_size[0] * 0.7, wrist_pos[1] + bbox_size[1] * 0.5, bbox_center[2])
+        radius = bbox_size[0] * 0.15
+    elif finger_name == "pinky":
+        center = (bbox_min[0] + bbox_size[0] * 0.85, wrist_pos[1] + bbox_size[1] * 0.5, bbox_center[2])
+        radius = bbox_size[0] * 0.15
+    else:
+        return None, None
+    return np.array(center, dtype=np.float32), radius
+
+def auto_weight_hand_model(model, armature, finger_definitions, use_kdtree=False,
+                           use_armature_bones=False, weight_levels=256):
+    """
+    为手部模型自动分配权重
+
+    顶点坐标通过 foreach_get 一次读入NumPy，所有骨骼的距离在一次向量化计算中完成，
+    权重按骨骼分组写回顶点组。
+
+    参数:
+        model: 网格对象
+        armature: 骨架对象
+        finger_definitions: detect_finger_bones 的结果
+        use_kdtree: 是否使用KD树截断只计算影响范围内的顶点
+        use_armature_bones: 是否使用骨架中真实的骨骼线段，默认沿用基于包围盒估计的骨骼位置
+        weight_levels: 写回时的权重量化级数
+    """
     # 确保在对象模式
     if bpy.context.mode != 'OBJECT':
         bpy.ops.object.mode_set(mode='OBJECT')
     
-    # 取消所有选择
-    bpy.ops.object.select_all(action='DESELECT')
-    
-    # 选择模型并设置为活动对象
-    model.select_set(True)
-    bpy.context.view_layer.objects.active = model
-    
-    # 进入编辑模式
-    bpy.ops.object.mode_set(mode='EDIT')
-    bpy.ops.mesh.select_all(action='DESELECT')
-    
-    # 获取网格数据
+    # 一次读取所有顶点坐标（无需进入编辑模式）
     mesh = model.data
-    bm = bmesh.from_edit_mesh(mesh)
+    coords = np.empty(len(mesh.vertices) * 3, dtype=np.float32)
+    mesh.vertices.foreach_get('co', coords)
+    coords = coords.reshape(-1, 3)
+    if len(coords) == 0:
+        print(f"警告: 模型 {model.name} 没有顶点")
+        return
     
     # 使用边界框确定手部方向和大小
-    bbox_min = mathutils.Vector((float('inf'), float('inf'), float('inf')))
-    bbox_max = mathutils.Vector((float('-inf'), float('-inf'), float('-inf')))
-    
-    for v in bm.verts:
-        for i in range(3):
-            bbox_min[i] = min(bbox_min[i], v.co[i])
-            bbox_max[i] = max(bbox_max[i], v.co[i])
-    
+    bbox_min = coords.min(axis=0)
+    bbox_max = coords.max(axis=0)
     bbox_center = (bbox_min + bbox_max) / 2
     bbox_size = bbox_max - bbox_min
     
     # 确定手腕位置
-    wrist_pos = mathutils.Vector((bbox_center.x, bbox_min.y, bbox_center.z))
+    wrist_pos = np.array((bbox_center[0], bbox_min[1], bbox_center[2]), dtype=np.float32)
     
     # 确定手指方向
-    finger_direction = mathutils.Vector((0, 1, 0))  # 假设手指沿Y轴正方向
+    finger_direction = np.array((0.0, 1.0, 0.0), dtype=np.float32)  # 假设手指沿Y轴正方向
     
     # 获取所有可用的顶点组
     vertex_groups = model.vertex_groups
     available_groups = [vg.name for vg in vertex_groups]
     
-    # 创建一个临时字典来存储权重数据
-    # 格式: {vertex_index: {bone_name: weight, ...}, ...}
-    weights_data = {}
+    # 骨骼到网格局部空间的变换
+    to_mesh = model.matrix_world.inverted() @ armature.matrix_world
     
+    # 收集所有骨骼线段
+    bone_names = []
+    heads = []
+    tails = []
+    radii = []
     for finger_name, bones in finger_definitions.items():
         if not bones:  # 跳过没有骨骼的手指
             continue
-            
-        # 确定此手指的大致位置和区域
-        if finger_name == "thumb":
-            # 拇指通常在X轴负方向（假设右手）
-            finger_center = mathutils.Vector((bbox_min.x + bbox_size.x * 0.2, 
-                                             wrist_pos.y + bbox_size.y * 0.3, 
-                                             bbox_center.z))
-            radius = bbox_size.x * 0.25
-        elif finger_name == "index":
-            finger_center = mathutils.Vector((bbox_min.x + bbox_size.x * 0.3, 
-                                             wrist_pos.y + bbox_size.y * 0.5, 
-                                             bbox_center.z))
-            radius = bbox_size.x * 0.15
-        elif finger_name == "middle":
-            finger_center = mathutils.Vector((bbox_center.x, 
-                                             wrist_pos.y + bbox_size.y * 0.5, 
-                                             bbox_center.z))
-            radius = bbox_size.x * 0.15
-        elif finger_name == "ring":
-            finger_center = mathutils.Vector((bbox_min.x + bbox_size.x * 0.7, 
-                                             wrist_pos.y + bbox_size.y * 0.5, 
-                                             bbox_center.z))
-            radius = bbox_size.x * 0.15
-        elif finger_name == "pinky":
-            finger_center = mathutils.Vector((bbox_min.x + bbox_size.x * 0.85, 
-                                             wrist_pos.y + bbox_size.y * 0.5, 
-                                             bbox_center.z))
-            radius = bbox_size.x * 0.15
         
-        # 计算每段骨骼的位置
-        bone_positions = []
-        for i, bone_name in enumerate(bones):
-            if bone_name in available_groups:  # 确保顶点组存在
-                pos = finger_center + finger_direction * (i * bbox_size.y * 0.25)
-                bone_positions.append((bone_name, pos))
+        finger_center, radius = _finger_layout(finger_name, bbox_min, bbox_center, bbox_size, wrist_pos)
+        if finger_center is None:
+            continue
         
-        # 为每个顶点计算权重
-        for v in bm.verts:
-            for bone_name, bone_pos in bone_positions:
-                # 计算顶点到骨骼的距离
-                dist = (v.co - bone_pos).length
-                
-                # 如果顶点在骨骼影响范围内
-                if dist < radius:
-                    # 计算权重 (距离越近权重越大)
-                    weight = 1.0 - (dist / radius)
-                    
-                    # 存储权重数据
-                    if v.index not in weights_data:
-                        weights_data[v.index] = {}
-                    
-                    # 如果已经有权重，使用较大的值
-                    current_weight = weights_data[v.index].get(bone_name, 0.0)
-                    weights_data[v.index][bone_name] = max(current_weight, weight)
-    
-    # 更新网格
-    bmesh.update_edit_mesh(mesh)
-    
-    # 返回对象模式
-    bpy.ops.object.mode_set(mode='OBJECT')
-    
-    # 应用权重数据
-    for vertex_idx, bones_weights in weights_data.items():
-        for bone_name, weight in bones_weights.items():
-            vgroup = vertex_groups[bone_name]
-            vgroup.add([vertex_idx], weight, 'REPLACE')
+        for i, bone_name in enumerate(bones):
+            if bone_name not in available_groups:  # 确保顶点组存在
+                continue
+            if use_armature_bones and bone_name in armature.data.bones:
+                bone = armature.data.bones[bone_name]
+                head = np.array(to_mesh @ bone.head_local, dtype=np.float32)
+                tail = np.array(to_mesh @ bone.tail_local, dtype=np.float32)
+            else:
+                # 估计的骨骼位置是一个点，线段退化
+                head = finger_center + finger_direction * (i * bbox_size[1] * 0.25)
+                tail = head
+            bone_names.append(bone_name)
+            heads.append(head)
+            tails.append(tail)
+            radii.append(radius)
+    
+    if not bone_names:
+        print("警告: 没有可用于分配权重的骨骼")
+        return
+    
+    # 向量化计算所有权重
+    bone_weights = compute_bone_weights(np.asarray(coords), np.asarray(heads), np.asarray(tails),
+                                        np.asarray(radii), use_kdtree=use_kdtree)
+    
+    # 同一骨骼出现多次时取较大的权重
+    merged = {}
+    for bone_name, (indices, weights) in zip(bone_names, bone_weights):
+        if bone_name in merged:
+            dense = merged[bone_name]
+            dense[indices] = np.maximum(dense[indices], weights)
+        else:
+            dense = np.zeros(len(coords), dtype=np.float32)
+            dense[indices] = weights
+            merged[bone_name] = dense
+    
+    # 按骨骼分组写回权重，相同权重的顶点一次添加
+    for bone_name, dense in merged.items():
+        vgroup = vertex_groups[bone_name]
+        indices = np.nonzero(dense > 0.0)[0]
+        for weight, members in group_by_weight(indices, dense[indices], levels=weight_levels):
+            vgroup.add(members, weight, 'REPLACE')
 
 def bind_hand_model(model_name, armature_name="RightHand"):
     """将手部模型绑定到骨架"""
@@ -245,8 +266,15 @@ def bind_hand_model(model_name, armature_name="RightHand"):
     print(f"已将模型 {model_name} 绑定到骨架 {armature_name}")
     return True
 
-def create_hand_rotation_animation(armature_name="RightHand"):
-    """修改骨骼动画为旋转控制而非位置控制"""
+def create_hand_rotation_animation(armature_name="RightHand", offline=False):
+    """
+    修改骨骼动画为旋转控制而非位置控制
+    
+    参数:
+        armature_name: 骨架名称
+        offline: 是否使用离线转换，直接对原始曲线求值并批量写入关键帧，
+                 不再逐帧调用 frame_set 和切换模式
+    """
     # 获取骨架对象
     armature = bpy.data.objects.get(armature_name)
     if not armature:
@@ -283,6 +311,9 @@ def create_hand_rotation_animation(armature_name="RightHand"):
     for bone in armature.pose.bones:
         bone.rotation_mode = 'QUATERNION'
     
+    if offline:
+        return _convert_rotation_offline(armature, keyframes, finger_definitions)
+    
     # 遍历所有关键帧
     for frame in keyframes:
         bpy.context.scene.frame_set(frame)
@@ -329,6 +360,173 @@ def create_hand_rotation_animation(armature_name="RightHand"):
     print(f"已将 {armature_name} 的位置动画转换为旋转动画")
     return True
 
+def _bone_order(armature):
+    """按父骨骼在前的顺序返回姿态骨骼列表和父骨骼索引"""
+    ordered = []
+    visited = set()
+    
+    def visit(pose_bone):
+        if pose_bone.name in visited:
+            return
+        if pose_bone.parent:
+            visit(pose_bone.parent)
+        visited.add(pose_bone.name)
+        ordered.append(pose_bone)
+    
+    for pose_bone in armature.pose.bones:
+        visit(pose_bone)
+    
+    index = {pb.name: i for i, pb in enumerate(ordered)}
+    parents = [index[pb.parent.name] if pb.parent else -1 for pb in ordered]
+    return ordered, parents
+
+def _evaluate_channel(action, data_path, size, default, frames):
+    """对动作中某个属性的所有分量在所有帧上求值，没有曲线的分量使用当前值"""
+    values = np.empty((len(frames), size))
+    for i in range(size):
+        fcu = action.fcurves.find(data_path, index=i)
+        if fcu is None:
+            values[:, i] = default[i]
+        else:
+            values[:, i] = [fcu.evaluate(f) for f in frames]
+    return values
+
+def _write_fcurve_samples(action, data_path, frames, values, group_name):
+    """
+    批量写入关键帧，同一帧上已有的关键帧会被替换
+    
+    参数:
+        action: 目标动作
+        data_path: 属性路径
+        frames: 帧号 (K,)
+        values: 每个分量的值 (K, C)
+        group_name: 曲线分组名称（骨骼名）
+    """
+    frames = np.asarray(frames, dtype=np.float32)
+    for i in range(values.shape[1]):
+        fcu = action.fcurves.find(data_path, index=i)
+        if fcu is None:
+            fcu = action.fcurves.new(data_path, index=i, action_group=group_name)
+        
+        # 合并已有关键帧，新值覆盖同一帧的旧值
+        count = len(fcu.keyframe_points)
+        merged = {}
+        if count:
+            old = np.empty(count * 2, dtype=np.float32)
+            fcu.keyframe_points.foreach_get('co', old)
+            old = old.reshape(-1, 2)
+            merged = dict(zip(old[:, 0].tolist(), old[:, 1].tolist()))
+        merged.update(zip(frames.tolist(), values[:, i].astype(np.float32).tolist()))
+        
+        keys = np.array(sorted(merged.items()), dtype=np.float32)
+        fcu.keyframe_points.clear()
+        fcu.keyframe_points.add(len(keys))
+        fcu.keyframe_points.foreach_set('co', keys.ravel())
+        fcu.update()
+
+def _convert_rotation_offline(armature, keyframes, finger_definitions):
+    """
+    离线转换: 对原始曲线在所有关键帧上一次求值，批量计算父子骨骼的旋转差并写回曲线
+    
+    与逐帧模式不同，求值只使用转换前的原始曲线，不受转换过程中已写入的旋转关键帧影响。
+    """
+    action = armature.animation_data.action
+    frames = np.asarray(keyframes, dtype=np.float64)
+    
+    ordered, parents = _bone_order(armature)
+    index = {pb.name: i for i, pb in enumerate(ordered)}
+    
+    # 对每个骨骼的局部变换曲线求值
+    basis = np.empty((len(frames), len(ordered), 4, 4))
+    for b, pose_bone in enumerate(ordered):
+        prefix = f'pose.bones["{pose_bone.name}"]'
+        location = _evaluate_channel(action, prefix + '.location', 3, pose_bone.location, frames)
+        rotation = _evaluate_channel(action, prefix + '.rotation_quaternion', 4,
+                                     pose_bone.rotation_quaternion, frames)
+        scale = _evaluate_channel(action, prefix + '.scale', 3, pose_bone.scale, frames)
+        basis[:, b] = compose_matrices(location, rotation, scale)
+    
+    # 批量正向运动学得到所有帧的骨骼头尾位置
+    rest = np.array([np.array(pb.bone.matrix_local) for pb in ordered])
+    lengths = np.array([pb.bone.length for pb in ordered])
+    heads, tails = bone_heads_tails(forward_kinematics(rest, parents, basis), lengths)
+    
+    converted = 0
+    for finger, bones in finger_definitions.items():
+        if len(bones) < 2:  # 需要至少两个骨骼才能计算旋转
+            continue
+        
+        for i in range(len(bones)-1):
+            if bones[i] not in index or bones[i+1] not in index:
+                continue
+            p = index[bones[i]]
+            c = index[bones[i+1]]
+            
+            # 计算骨骼方向向量
+            parent_dir = tails[:, p] - heads[:, p]
+            child_dir = tails[:, c] - tails[:, p]
+            valid = (np.linalg.norm(parent_dir, axis=1) > 0) & (np.linalg.norm(child_dir, axis=1) > 0)
+            if not np.any(valid):
+                continue
+            
+            rot_diff = rotation_difference(parent_dir[valid], child_dir[valid])
+            data_path = f'pose.bones["{bones[i]}"].rotation_quaternion'
+            _write_fcurve_samples(action, data_path, frames[valid], rot_diff, bones[i])
+            converted += 1
+    
+    print(f"已将 {armature.name} 的位置动画离线转换为旋转动画 ({len(frames)} 帧, {converted} 段骨骼)")
+    return True
+
+def compare_rotation_conversion(armature_name="RightHand"):
+    """
+    在动作的两个副本上分别运行逐帧转换和离线转换，比较耗时与结果差异
+    
+    返回:
+        {"frame_set": 秒, "offline": 秒, "max_angle_deg": 两种结果的最大角度差}
+    """
+    armature = bpy.data.objects.get(armature_name)
+    if not armature or not armature.animation_data or not armature.animation_data.action:
+        print(f"错误：骨架 {armature_name} 没有动作")
+        return None
+    
+    source = armature.animation_data.action
+    legacy_action = source.copy()
+    offline_action = source.copy()
+    
+    try:
+        armature.animation_data.action = legacy_action
+        start = time.perf_counter()
+        create_hand_rotation_animation(armature_name)
+        legacy_time = time.perf_counter() - start
+        
+        armature.animation_data.action = offline_action
+        start = time.perf_counter()
+        create_hand_rotation_animation(armature_name, offline=True)
+        offline_time = time.perf_counter() - start
+    finally:
+        armature.animation_data.action = source
+    
+    # 比较两种结果在所有关键帧上的差异
+    max_angle = 0.0
+    for fcu in offline_action.fcurves:
+        if not fcu.data_path.endswith('rotation_quaternion') or fcu.array_index != 0:
+            continue
+        frames = [kp.co[0] for kp in fcu.keyframe_points]
+        a = np.array([[offline_action.fcurves.find(fcu.data_path, index=i).evaluate(f)
+                       for i in range(4)] for f in frames])
+        if legacy_action.fcurves.find(fcu.data_path, index=0) is None:
+            continue
+        b = np.array([[legacy_action.fcurves.find(fcu.data_path, index=i).evaluate(f)
+                       for i in range(4)] for f in frames])
+        max_angle = max(max_angle, float(np.degrees(quat_angle_between(a, b)).max()))
+    
+    bpy.data.actions.remove(legacy_action)
+    bpy.data.actions.remove(offline_action)
+    
+    print(f"逐帧转换: {legacy_time:.2f} 秒, 离线转换: {offline_time:.2f} 秒, "
+          f"加速 {legacy_time / max(offline_time, 1e-9):.1f} 倍, 最大角度差 {max_angle:.2f} 度")
+    return {"frame_set": legacy_time, "offline": offline_time, "max_angle_deg": max_angle}
+
 # 用法示例
 if __name__ == "__main__":
     # 确保在对象模式
@@ -347,7 +545,7 @@ if __name__ == "__main__":
         
         # 可选：转换为旋转动画
         # 如果要运行此功能，请取消下面一行的注释
-        # create_hand_rotation_animation(right_hand_armature.name)
+        # create_hand_rotation_animation(right_hand_armature.name, offline=True)
         
         print("操作完成")
     else:
@@ -0,0 +1,208 @@
+import time
+import numpy as np
+
+# 纯NumPy的蒙皮权重计算，不依赖bpy，可以在Blender外单独运行和测试
+# rig.auto_weight_hand_model 读取顶点坐标后调用这里的函数
+
+
+def point_segment_distances(coords, heads, tails):
+    """
+    计算每个顶点到每段骨骼线段的最短距离
+
+    参数:
+        coords: 顶点坐标 (N, 3)
+        heads: 骨骼线段起点 (B, 3)
+        tails: 骨骼线段终点 (B, 3)，与起点相同时退化为点
+
+    返回:
+        距离矩阵 (N, B)
+    """
+    coords = np.asarray(coords, dtype=np.float32)
+    heads = np.asarray(heads, dtype=np.float32)
+    tails = np.asarray(tails, dtype=np.float32)
+
+    seg = tails - heads                               # (B, 3)
+    seg_len_sq = np.einsum('ij,ij->i', seg, seg)      # (B,)
+    # 避免除零，退化线段的投影参数恒为0
+    safe_len_sq = np.where(seg_len_sq > 1e-12, seg_len_sq, 1.0)
+
+    rel = coords[:, None, :] - heads[None, :, :]       # (N, B, 3)
+    t = np.einsum('nbk,bk->nb', rel, seg) / safe_len_sq
+    t = np.clip(t, 0.0, 1.0)
+    t[:, seg_len_sq <= 1e-12] = 0.0
+
+    closest = rel - t[:, :, None] * seg[None, :, :]
+    return np.sqrt(np.einsum('nbk,nbk->nb', closest, closest))
+
+
+def falloff_weights(distances, radii):
+    """
+    线性衰减权重: 距离越近权重越大，超出半径为0
+
+    参数:
+        distances: 距离矩阵 (N, B)
+        radii: 每段骨骼的影响半径 (B,)
+
+    返回:
+        权重矩阵 (N, B)
+    """
+    radii = np.asarray(radii, dtype=np.float32)
+    weights = 1.0 - distances / radii[None, :]
+    return np.clip(weights, 0.0, 1.0, out=weights)
+
+
+def candidate_vertices(coords, heads, tails, radii):
+    """
+    KD树截断: 找出每段骨骼影响范围内可能受影响的顶点
+
+    优先使用 scipy 的 cKDTree，Blender 中则使用 mathutils.kdtree，
+    两者都不可用时退化为向量化的包围盒筛选。
+
+    返回:
+        每段骨骼一个顶点索引数组的列表
+    """
+    coords = np.asarray(coords, dtype=np.float32)
+    heads = np.asarray(heads, dtype=np.float32)
+    tails = np.asarray(tails, dtype=np.float32)
+    radii = np.asarray(radii, dtype=np.float32)
+
+    # 以线段中点为球心，半段长度加影响半径为查询半径，覆盖整个影响区域
+    centers = (heads + tails) * 0.5
+    reach = np.linalg.norm(tails - heads, axis=1) * 0.5 + radii
+
+    try:
+        from scipy.spatial import cKDTree
+        tree = cKDTree(coords)
+        return [np.asarray(idx, dtype=np.int64)
+                for idx in tree.query_ball_point(centers, reach)]
+    except ImportError:
+        pass
+
+    try:
+        from mathutils import kdtree
+        tree = kdtree.KDTree(len(coords))
+        for i, co in enumerate(coords):
+            tree.insert(co, i)
+        tree.balance()
+        return [np.fromiter((idx for _, idx, _ in tree.find_range(c, r)), dtype=np.int64)
+                for c, r in zip(centers, reach)]
+    except ImportError:
+        pass
+
+    result = []
+    for c, r in zip(centers, reach):
+        mask = np.all(np.abs(coords - c) <= r, axis=1)
+        result.append(np.nonzero(mask)[0])
+    return result
+
+
+def compute_bone_weights(coords, heads, tails, radii, use_kdtree=False, chunk_size=200000):
+    """
+    一次向量化计算所有顶点对所有骨骼的权重
+
+    参数:
+        coords: 顶点坐标 (N, 3)
+        heads, tails: 骨骼线段端点 (B, 3)
+        radii: 影响半径 (B,)
+        use_kdtree: 是否先用KD树截断只计算影响范围内的顶点
+        chunk_size: 分块大小，限制 (N, B, 3) 中间数组的内存
+
+    返回:
+        每段骨骼一个 (顶点索引, 权重) 元组的列表，只包含权重大于0的顶点
+    """
+    coords = np.asarray(coords, dtype=np.float32)
+    heads = np.asarray(heads, dtype=np.float32)
+    tails = np.asarray(tails, dtype=np.float32)
+    radii = np.asarray(radii, dtype=np.float32)
+    n_bones = len(heads)
+
+    if use_kdtree:
+        result = []
+        candidates = candidate_vertices(coords, heads, tails, radii)
+        for b, idx in enumerate(candidates):
+            if len(idx) == 0:
+                result.append((idx, np.zeros(0, dtype=np.float32)))
+                continue
+            dist = point_segment_distances(coords[idx], heads[b:b+1], tails[b:b+1])
+            w = falloff_weights(dist, radii[b:b+1])[:, 0]
+            keep = w > 0.0
+            result.append((idx[keep], w[keep]))
+        return result
+
+    indices = [[] for _ in range(n_bones)]
+    weights = [[] for _ in range(n_bones)]
+    for start in range(0, len(coords), chunk_size):
+        block = coords[start:start + chunk_size]
+        w = falloff_weights(point_segment_distances(block, heads, tails), radii)
+        rows, cols = np.nonzero(w > 0.0)
+        values = w[rows, cols]
+        # 按骨骼分组
+        order = np.argsort(cols, kind='stable')
+        rows, cols, values = rows[order], cols[order], values[order]
+        bounds = np.searchsorted(cols, np.arange(n_bones + 1))
+        for b in range(n_bones):
+            lo, hi = bounds[b], bounds[b + 1]
+            if hi > lo:
+                indices[b].append(rows[lo:hi] + start)
+                weights[b].append(values[lo:hi])
+
+    result = []
+    for b in range(n_bones):
+        if indices[b]:
+            result.append((np.concatenate(indices[b]), np.concatenate(weights[b])))
+        else:
+            result.append((np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)))
+    return result
+
+
+def group_by_weight(indices, weights, levels=256):
+    """
+    将权重量化后按相同权重分组，使每组只需调用一次 vertex_group.add
+
+    参数:
+        indices: 顶点索引 (K,)
+        weights: 权重 (K,)
+        levels: 量化级数
+
+    返回:
+        [(权重, 顶点索引列表), ...]
+    """
+    if len(indices) == 0:
+        return []
+    q = np.rint(np.asarray(weights) * levels).astype(np.int64)
+    # 量化后为0但原权重大于0的顶点保留最小权重
+    q = np.maximum(q, 1)
+    values, inverse = np.unique(q, return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(values) + 1))
+    groups = []
+    for i, v in enumerate(values):
+        members = np.asarray(indices)[order[bounds[i]:bounds[i + 1]]]
+        groups.append((float(v) / levels, members.tolist()))
+    return groups
+
+
+def benchmark_weighting(sizes=(10000, 100000, 1000000), n_bones=20, repeat=3, seed=0):
+    """在随机顶点上测试权重计算耗时"""
+    rng = np.random.default_rng(seed)
+    heads = rng.uniform(-1.0, 1.0, size=(n_bones, 3)).astype(np.float32)
+    tails = heads + rng.normal(scale=0.2, size=(n_bones, 3)).astype(np.float32)
+    radii = np.full(n_bones, 0.3, dtype=np.float32)
+
+    results = {}
+    for n in sizes:
+        coords = rng.uniform(-1.0, 1.0, size=(n, 3)).astype(np.float32)
+        for use_kdtree in (False, True):
+            best = float('inf')
+            for _ in range(repeat):
+                start = time.perf_counter()
+                compute_bone_weights(coords, heads, tails, radii, use_kdtree=use_kdtree)
+                best = min(best, time.perf_counter() - start)
+            results[(n, use_kdtree)] = best
+            label = "KD树" if use_kdtree else "全量"
+            print(f"{n:>8} 顶点 x {n_bones} 骨骼 ({label}): {best * 1000:.1f} ms")
+    return results
+
+
+if __name__ == "__main__":
+    benchmark_weighting()
@@ -0,0 +1,27 @@
+import importlib.util
+import os
+import sys
+
+# 分阶段计时器与 Gesture 共用同一实现（Gesture/utils/profiler.py，只依赖标准库和 NumPy）。
+# 按文件路径加载并以唯一的模块名注册，不把 Gesture 目录加入 sys.path:
+# 那样 Gesture 的顶层包 utils 会与 Blender 等环境中同名的包互相遮蔽。
+
+_MODULE_NAME = "shadow_theatre_profiler"
+_PROFILER_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "Gesture", "utils", "profiler.py")
+
+
+def _load():
+    module = sys.modules.get(_MODULE_NAME)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(_MODULE_NAME, _PROFILER_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[_MODULE_NAME] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+_module = _load()
+StageProfiler = _module.StageProfiler
+profiler = _module.profiler
+span = _module.span
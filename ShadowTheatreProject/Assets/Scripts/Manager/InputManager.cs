@@ -39,6 +39,9 @@ public class InputManager : MonoBehaviour
     // 手部检测状态
     private bool handDetected = true;
 
+    // 识别端状态（如 "Ready"），由 status 消息更新
+    private string recognizerStatus = "";
+
     // 当前选择的阴影类型
     private ShadowType currentShadowType = ShadowType.None;
 
@@ -56,6 +59,8 @@ public class InputManager : MonoBehaviour
     public event Action<GestureData> OnGestureUpdated;
     public event Action<string, float> OnGestureTypeReceived;
     public event Action<bool> OnHandDetectionChanged;
+    public event Action<string> OnRecognizerStatusChanged;
+    public event Action<string> OnMotionReceived;
 
     private GestureData currentGesture = new GestureData();
 
@@ -269,6 +274,27 @@ public class InputManager : MonoBehaviour
         NotifyGestureListeners();
     }
 
+    /// <summary>
+    /// 处理来自GestureReceiver的识别端状态（启动完成时的 "Ready"，没有可用模型时的 "NoModels"）
+    /// </summary>
+    public void UpdateRecognizerStatus(string status)
+    {
+        if (status == recognizerStatus) return;
+
+        recognizerStatus = status;
+        Debug.Log($"[InputManager] 识别端状态: {status}");
+        OnRecognizerStatusChanged?.Invoke(status);
+    }
+
+    /// <summary>
+    /// 处理来自GestureReceiver的动态手势（一次性的动作，不改变当前手势类型）
+    /// </summary>
+    public void UpdateMotion(string motion)
+    {
+        Debug.Log($"[InputManager] 接收到动态手势: {motion}, 触发OnMotionReceived事件");
+        OnMotionReceived?.Invoke(motion);
+    }
+
     /// <summary>
     /// 处理位置数据，转换为3D世界坐标
     /// </summary>
@@ -394,6 +420,12 @@ public class InputManager : MonoBehaviour
         return handDetected;
     }
 
+    // 公共API: 识别端是否已完成启动
+    public bool IsRecognizerReady()
+    {
+        return recognizerStatus == "Ready";
+    }
+
     // 添加缺失的 NotifyGestureListeners 方法
     private void NotifyGestureListeners()
     {
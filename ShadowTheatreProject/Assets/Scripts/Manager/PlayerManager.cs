@@ -80,6 +80,8 @@ public class PlayerManager : MonoBehaviour
             Debug.Log("PlayerManager: 订阅InputManager.OnGestureTypeReceived事件");
             // 订阅手势类型事件
             inputManager.OnGestureTypeReceived += HandleGestureType;
+            // 订阅动态手势事件
+            inputManager.OnMotionReceived += HandleMotion;
         }
         else
         {
@@ -110,6 +112,15 @@ public class PlayerManager : MonoBehaviour
         }
     }
 
+    /// <summary>
+    /// 处理动态手势消息，通过事件中心广播 "{动作名}Motion"（如 "FlapMotion"）
+    /// </summary>
+    private void HandleMotion(string motion)
+    {
+        Debug.Log($"[PlayerManager] 收到动态手势 {motion}, 当前阴影类型: {currentShadowType}");
+        EventCenter.Instance.Publish($"{motion}Motion");
+    }
+
     /// <summary>
     /// 将手势类型字符串映射到阴影类型枚举
     /// </summary>
@@ -283,6 +294,7 @@ public class PlayerManager : MonoBehaviour
         if (inputManager != null)
         {
             inputManager.OnGestureTypeReceived -= HandleGestureType;
+            inputManager.OnMotionReceived -= HandleMotion;
         }
     }
 }
\ No newline at end of file
@@ -24,6 +24,8 @@ public class GestureReceiver : MonoBehaviour
     [SerializeField] private bool autoConnect = true;
     [SerializeField] private bool logMessages = true;
     [SerializeField] private string messageDelimiter = "|";
+    [Tooltip("确认收到的手势状态快照，发送方收到确认后不再重复发送")]
+    [SerializeField] private bool acknowledgeState = true;
 
     // 位置数据连接状态
     private bool isPositionConnected = false;
@@ -46,6 +48,12 @@ public class GestureReceiver : MonoBehaviour
     private ConcurrentQueue<string> positionMessageQueue = new ConcurrentQueue<string>();
     private ConcurrentQueue<string> gestureMessageQueue = new ConcurrentQueue<string>();
 
+    // 手势状态快照: "state|纪元|版本|gesture=Bird|hands=1"，发送方会冗余重发并定期发送心跳。
+    // 接收线程只把更新的版本放入队列（重复的快照不进入主线程），并回复 "ack|纪元|版本"
+    private ConcurrentQueue<Dictionary<string, string>> stateQueue = new ConcurrentQueue<Dictionary<string, string>>();
+    private string stateEpoch = null;
+    private long stateVersion = 0;
+
     private void Start()
     {
         // 尝试获取InputManager引用
@@ -83,6 +91,12 @@ public class GestureReceiver : MonoBehaviour
         {
             ProcessGestureMessageInMainThread(message);
         }
+
+        // 处理手势状态快照
+        while (stateQueue.TryDequeue(out Dictionary<string, string> state))
+        {
+            ApplyStateSnapshot(state);
+        }
     }
 
     public void ConnectAll()
@@ -195,6 +209,13 @@ public class GestureReceiver : MonoBehaviour
                 byte[] data = gestureUdpClient.Receive(ref gestureEndPoint);
                 string message = Encoding.UTF8.GetString(data);
 
+                // 状态快照在接收线程中去重并确认
+                if (message.StartsWith("state" + messageDelimiter))
+                {
+                    HandleStateSnapshot(message, gestureEndPoint);
+                    continue;
+                }
+
                 // 记录接收到的消息
                 Debug.Log($"GestureReceiver: 接收到原始手势类型消息: {message}");
 
@@ -213,6 +234,81 @@ public class GestureReceiver : MonoBehaviour
         Debug.Log("GestureReceiver: 停止监听手势类型数据");
     }
 
+    /// <summary>
+    /// 在接收线程中处理状态快照: 只接受同一纪元中更新的版本，并回复确认
+    /// </summary>
+    private void HandleStateSnapshot(string message, IPEndPoint sender)
+    {
+        string[] parts = message.Split(messageDelimiter[0]);
+        if (parts.Length < 3 || !long.TryParse(parts[2], out long version))
+        {
+            return;
+        }
+
+        // 新纪元表示发送方重启，接受任意版本
+        if (parts[1] != stateEpoch)
+        {
+            stateEpoch = parts[1];
+            stateVersion = 0;
+        }
+
+        if (version > stateVersion)
+        {
+            stateVersion = version;
+            Dictionary<string, string> state = new Dictionary<string, string>();
+            for (int i = 3; i < parts.Length; i++)
+            {
+                int separator = parts[i].IndexOf('=');
+                if (separator > 0)
+                {
+                    state[parts[i].Substring(0, separator)] = parts[i].Substring(separator + 1);
+                }
+            }
+            stateQueue.Enqueue(state);
+        }
+
+        if (acknowledgeState)
+        {
+            byte[] ack = Encoding.UTF8.GetBytes($"ack{messageDelimiter}{stateEpoch}{messageDelimiter}{stateVersion}");
+            gestureUdpClient.Send(ack, ack.Length, sender);
+        }
+    }
+
+    /// <summary>
+    /// 在主线程中应用新版本的状态快照: 手部检测状态和稳定手势
+    /// </summary>
+    private void ApplyStateSnapshot(Dictionary<string, string> state)
+    {
+        if (inputManager == null)
+        {
+            inputManager = InputManager.Instance;
+            if (inputManager == null)
+            {
+                Debug.LogError("无法获取InputManager实例!");
+                return;
+            }
+        }
+
+        if (logMessages)
+        {
+            Debug.Log($"GestureReceiver: 状态快照 v{stateVersion}: {string.Join(", ", state)}");
+        }
+
+        if (state.TryGetValue("hands", out string hands))
+        {
+            bool detected = hands == "1";
+            Dictionary<string, float> detectionData = new Dictionary<string, float> { { "detected", detected ? 1.0f : 0.0f } };
+            inputManager.UpdateGestureData("HandDetectionStatus", Vector2.zero, detected ? 1.0f : 0.0f, detectionData);
+        }
+
+        // 与手势类型消息相同的处理；PlayerManager 对相同的阴影类型不重复更新
+        if (state.TryGetValue("gesture", out string gesture) && !string.IsNullOrEmpty(gesture))
+        {
+            Dictionary<string, float> gestureData = new Dictionary<string, float> { { "is_gesture_type", 1.0f } };
+            inputManager.UpdateGestureData(gesture, Vector2.zero, 1.0f, gestureData);
+        }
+    }
+
     private void ProcessPositionMessageInMainThread(string message)
     {
         // 期望格式: "position|hand_idx|x|y|z"
@@ -298,6 +394,27 @@ public class GestureReceiver : MonoBehaviour
             // 2. "Bird|0.95|..."          - 第一个部分直接是手势类型
 
             string messageType = parts[0];
+
+            // 识别端状态消息: "status|Ready" 或没有模型时的 "status|NoModels"，不是手势
+            if (messageType == "status")
+            {
+                if (parts.Length > 1 && inputManager != null)
+                {
+                    inputManager.UpdateRecognizerStatus(parts[1]);
+                }
+                return;
+            }
+
+            // 动态手势消息: "motion|名称"（如扇动翅膀），与当前的静态手势无关
+            if (messageType == "motion")
+            {
+                if (parts.Length > 1 && inputManager != null)
+                {
+                    inputManager.UpdateMotion(parts[1]);
+                }
+                return;
+            }
+
             string gestureType = (messageType == "gesture" && parts.Length > 1) ? parts[1] : messageType;
             float confidence = 1.0f;
 
@@ -334,10 +451,11 @@ public class GestureReceiver : MonoBehaviour
                 bool detectionStatus = false;
 
                 // 解析检测状态
-                if (parts.Length > 1)
+                // "HandDetectionStatus|True" 或 "gesture|HandDetectionStatus|True"
+                int statusIndex = (messageType == "HandDetectionStatus") ? 1 : 2;
+                if (parts.Length > statusIndex)
                 {
-                    string statusValue = (messageType == "HandDetectionStatus") ? parts[1] : parts[0].Split('|')[1];
-                    detectionStatus = statusValue.ToLower() == "true";
+                    detectionStatus = parts[statusIndex].ToLower() == "true";
                 }
 
                 // 添加到附加数据